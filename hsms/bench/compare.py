@@ -0,0 +1,150 @@
+"""
+Compare two `hsm_bench` result files and flag significant changes.
+
+A change is significant only if the median moved by more than the relative
+threshold *and* the interquartile ranges of the two runs don't overlap, so
+a noisy benchmark needs a bigger shift before it's reported.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 0.1
+
+REGRESSION = "regression"
+IMPROVEMENT = "improvement"
+UNCHANGED = "~"
+NEW = "new"
+MISSING = "missing"
+
+
+@dataclass
+class Timing:
+    median: float
+    q1: float
+    q3: float
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: Optional[Timing]
+    current: Optional[Timing]
+    status: str
+
+    def change(self) -> Optional[float]:
+        if self.baseline is None or self.current is None:
+            return None
+        return self.current.median / self.baseline.median - 1
+
+
+def load_timings(path: str) -> Dict[str, Timing]:
+    with open(path) as f:
+        d = json.load(f)
+    return {_["name"]: Timing(_["median"], _["q1"], _["q3"]) for _ in d["benchmarks"]}
+
+
+def status_for_timings(baseline: Timing, current: Timing, threshold: float) -> str:
+    change = current.median / baseline.median - 1
+    if change > threshold and current.q1 > baseline.q3:
+        return REGRESSION
+    if change < -threshold and current.q3 < baseline.q1:
+        return IMPROVEMENT
+    return UNCHANGED
+
+
+def compare_timings(
+    baseline: Dict[str, Timing],
+    current: Dict[str, Timing],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Comparison]:
+    comparisons = []
+    for name, timing in baseline.items():
+        new_timing = current.get(name)
+        if new_timing is None:
+            comparisons.append(Comparison(name, timing, None, MISSING))
+        else:
+            status = status_for_timings(timing, new_timing, threshold)
+            comparisons.append(Comparison(name, timing, new_timing, status))
+    for name, timing in current.items():
+        if name not in baseline:
+            comparisons.append(Comparison(name, None, timing, NEW))
+    return comparisons
+
+
+def format_time(timing: Optional[Timing]) -> str:
+    if timing is None:
+        return "-"
+    t = timing.median
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if t >= scale:
+            break
+    return f"{t / scale:.3g} {unit}"
+
+
+def markdown_table(comparisons: List[Comparison]) -> str:
+    lines = [
+        "| benchmark | baseline | current | change | |",
+        "|---|---:|---:|---:|---|",
+    ]
+    for c in comparisons:
+        change = c.change()
+        change_text = "-" if change is None else f"{change:+.1%}"
+        status = "" if c.status == UNCHANGED else f"**{c.status}**"
+        lines.append(
+            f"| {c.name} | {format_time(c.baseline)} | {format_time(c.current)} "
+            f"| {change_text} | {status} |"
+        )
+    return "\n".join(lines)
+
+
+def hsm_bench_compare(args, parser):
+    comparisons = compare_timings(
+        load_timings(args.baseline), load_timings(args.current), args.threshold
+    )
+    if args.regressions_only:
+        comparisons = [_ for _ in comparisons if _.status == REGRESSION]
+    print(markdown_table(comparisons))
+    return 1 if any(_.status == REGRESSION for _ in comparisons) else 0
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare two `hsm_bench` JSON result files, printing a Markdown "
+            "table. Exits nonzero if any benchmark regressed significantly."
+        )
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=(
+            "relative change in median to consider significant, provided the "
+            f"interquartile ranges also don't overlap (default: {DEFAULT_THRESHOLD})"
+        ),
+    )
+    parser.add_argument(
+        "-r",
+        "--regressions-only",
+        action="store_true",
+        help="only list regressed benchmarks",
+    )
+    parser.add_argument("baseline", help="JSON results to compare against")
+    parser.add_argument("current", help="JSON results to check")
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    return hsm_bench_compare(args, parser)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
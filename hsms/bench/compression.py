@@ -0,0 +1,105 @@
+"""
+Compare compression backends on sample spends built like `hsm_test_spend`
+builds them, reporting compressed size and QR chunk count.
+
+    python -m hsms.bench.compression [-m max-chunk-size ...]
+"""
+
+from typing import Iterable, List, Tuple
+
+import argparse
+import sys
+import zlib
+
+from chia_base.bls12_381 import BLSSecretExponent
+
+from hsms.cmds.hsm_test_spend import unsigned_spend_for_public_keys
+from hsms.core.envelope import envelope_for_item
+from hsms.core.unsigned_spend import UnsignedSpend
+from hsms.util.byte_chunks import (
+    create_chunks_for_blob,
+    optimal_chunk_size_for_max_chunk_size,
+)
+from hsms.util.compression import COMPRESSIONS
+
+DEFAULT_MAX_CHUNK_SIZES = [200, 800]
+
+
+def sample_unsigned_spends() -> Iterable[Tuple[str, UnsignedSpend]]:
+    """
+    Spends from `hsm_test_spend` for 1 to 5 signers, and spends of several
+    such coins at once.
+    """
+    public_keys = [BLSSecretExponent.from_int(_).public_key() for _ in range(1, 6)]
+    for signer_count in range(1, 6):
+        yield (
+            f"{signer_count} signer",
+            unsigned_spend_for_public_keys(public_keys[:signer_count]),
+        )
+    for coin_count in (2, 5):
+        unsigned_spends = [
+            unsigned_spend_for_public_keys([pk]) for pk in public_keys[:coin_count]
+        ]
+        unsigned_spend = unsigned_spends[0]
+        for _ in unsigned_spends[1:]:
+            unsigned_spend.coin_spends.extend(_.coin_spends)
+            unsigned_spend.sum_hints.extend(_.sum_hints)
+            unsigned_spend.path_hints.extend(_.path_hints)
+        yield f"{coin_count} coins", unsigned_spend
+
+
+def chunk_count(blob: bytes, max_chunk_size: int) -> int:
+    chunk_size = optimal_chunk_size_for_max_chunk_size(len(blob), max_chunk_size)
+    return len(create_chunks_for_blob(blob, chunk_size))
+
+
+def blobs_for_unsigned_spend(
+    unsigned_spend: UnsignedSpend,
+) -> List[Tuple[str, bytes]]:
+    """
+    What `hsm_test_spend` sends without an envelope, then an envelope for
+    each available backend.
+    """
+    r = [("legacy-zlib", zlib.compress(bytes(unsigned_spend)))]
+    for compression in COMPRESSIONS:
+        r.append((compression.name, envelope_for_item(unsigned_spend, compression.tag)))
+    return r
+
+
+def compression_table(max_chunk_sizes: List[int], f=sys.stdout) -> None:
+    columns = ["sample", "raw", "backend", "bytes"] + [
+        f"chunks@{_}" for _ in max_chunk_sizes
+    ]
+    print("\t".join(columns), file=f)
+    for name, unsigned_spend in sample_unsigned_spends():
+        raw_size = len(bytes(unsigned_spend))
+        for backend, blob in blobs_for_unsigned_spend(unsigned_spend):
+            counts = [str(chunk_count(blob, _)) for _ in max_chunk_sizes]
+            print(
+                "\t".join([name, str(raw_size), backend, str(len(blob))] + counts),
+                file=f,
+            )
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description="Compare compressed sizes and QR chunk counts of sample spends"
+    )
+    parser.add_argument(
+        "-m",
+        "--max-chunk-size",
+        type=int,
+        action="append",
+        help=f"maximum bytes per chunk (default: {DEFAULT_MAX_CHUNK_SIZES})",
+    )
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    compression_table(args.max_chunk_size or DEFAULT_MAX_CHUNK_SIZES, sys.stdout)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,141 @@
+"""
+Measure how long each command module takes to import, using
+`python -X importtime` in a fresh interpreter per sample.
+
+Commands should only pay for what they use: `qrint` doesn't need BLS, and
+none of them should load `segno` or `chialisp_puzzles` until a QR code is
+shown or a puzzle is needed.
+
+    python -m hsms.bench.import_time [-c command ...] [-n rounds] [-o results.json]
+
+The JSON output has the same shape as `hsm_bench` output, so two runs can
+be compared with `hsm_bench_compare`.
+"""
+
+from typing import Dict, List, Tuple
+
+import argparse
+import json
+import pkgutil
+import statistics
+import subprocess
+import sys
+
+import hsms.cmds
+
+DEFAULT_ROUNDS = 7
+
+# self µs, cumulative µs, module name
+ImportTime = Tuple[int, int, str]
+
+
+def command_names() -> List[str]:
+    return sorted(_.name for _ in pkgutil.iter_modules(hsms.cmds.__path__))
+
+
+def parse_importtime(text: str) -> List[ImportTime]:
+    r = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # the header
+            continue
+        r.append((int(parts[0]), int(parts[1]), parts[2].strip()))
+    return r
+
+
+def import_times(module: str) -> List[ImportTime]:
+    r = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if r.returncode != 0:
+        raise ValueError(f"can't import {module}: {r.stderr.strip()}")
+    return parse_importtime(r.stderr)
+
+
+def cumulative_time(times: List[ImportTime], module: str) -> float:
+    for _self_us, cumulative_us, name in times:
+        if name == module:
+            return cumulative_us * 1e-6
+    raise ValueError(f"{module} not found in importtime output")
+
+
+def measure_command(command: str, rounds: int) -> Tuple[List[float], List[str]]:
+    """
+    Return the cumulative import time of each round, and the modules loaded
+    in the last round, slowest (by self time) first.
+    """
+    module = f"hsms.cmds.{command}"
+    samples = []
+    for _ in range(rounds):
+        times = import_times(module)
+        samples.append(cumulative_time(times, module))
+    slowest = sorted(times, key=lambda _: -_[0])
+    return samples, [_[2] for _ in slowest]
+
+
+def result_for_samples(name: str, samples: List[float]) -> Dict:
+    if len(samples) > 1:
+        q1, median, q3 = statistics.quantiles(samples, n=4, method="inclusive")
+    else:
+        q1 = median = q3 = samples[0]
+    return dict(name=name, group="import", samples=samples, median=median, q1=q1, q3=q3)
+
+
+def import_time(args, parser):
+    results = []
+    for command in args.command or command_names():
+        samples, modules = measure_command(command, args.rounds)
+        result = result_for_samples(f"import {command}", samples)
+        results.append(result)
+        line = f"{command:20} {result['median'] * 1e3:9.1f} ms"
+        if args.top:
+            line += "  " + " ".join(modules[: args.top])
+        print(line, file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(dict(benchmarks=results), f, indent=2)
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description="Measure import time of each hsms command with `-X importtime`"
+    )
+    parser.add_argument(
+        "-c",
+        "--command",
+        action="append",
+        help="only measure the named command, like `qrint`; may be repeated",
+    )
+    parser.add_argument(
+        "-n",
+        "--rounds",
+        type=int,
+        default=DEFAULT_ROUNDS,
+        help=f"fresh interpreters per command (default: {DEFAULT_ROUNDS})",
+    )
+    parser.add_argument(
+        "-t",
+        "--top",
+        type=int,
+        default=0,
+        help="also list this many of the slowest modules each command loads",
+    )
+    parser.add_argument(
+        "-o", "--output", help="path to write JSON results to, for `hsm_bench_compare`"
+    )
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    return import_time(args, parser)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
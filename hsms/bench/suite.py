@@ -0,0 +1,282 @@
+"""
+Time the hot paths of signing-request handling on synthetic `UnsignedSpend`
+objects of various sizes, and write the results as JSON so runs can be
+compared with `hsm_bench_compare`.
+
+Each sample is the wall-clock time of one call. Any setup, like
+deserializing a fresh `UnsignedSpend` so cached conditions aren't reused,
+happens outside the timed region.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import argparse
+import hashlib
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import zlib
+
+from chia_base.bls12_381 import BLSSecretExponent
+from chia_base.core import Coin, CoinSpend
+
+from hsms.clvm.disasm import disassemble
+from hsms.cmds.hsm_test_spend import unsigned_spend_for_public_keys
+from hsms.core.unsigned_spend import TO_PROGRAM, UnsignedSpend
+from hsms.process.sign import generate_synthetic_offset_signatures, sign
+from hsms.util.byte_chunks import ChunkAssembler, chunks_for_zlib_blob
+from hsms.util.qrint_encoding import a2b_qrint, b2a_qrint
+
+DEFAULT_SIZES = [1, 10, 100, 1000]
+
+SIGNER_COUNT = 2
+
+MAX_CHUNK_COUNT = 255
+
+
+@dataclass
+class Benchmark:
+    group: str
+    # returns the argument for `f`; not timed
+    setup: Callable[[], Any]
+    f: Callable[[Any], Any]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    group: str
+    coin_count: int
+    samples: List[float]
+    median: float = field(init=False)
+    q1: float = field(init=False)
+    q3: float = field(init=False)
+
+    def __post_init__(self):
+        if len(self.samples) > 1:
+            self.q1, self.median, self.q3 = statistics.quantiles(
+                self.samples, n=4, method="inclusive"
+            )
+        else:
+            self.q1 = self.median = self.q3 = self.samples[0]
+
+
+def secret_exponents(signer_count: int = SIGNER_COUNT) -> List[BLSSecretExponent]:
+    return [BLSSecretExponent.from_int(_ + 1) for _ in range(signer_count)]
+
+
+def synthetic_unsigned_spend(
+    coin_count: int, secrets: List[BLSSecretExponent]
+) -> UnsignedSpend:
+    """
+    A spend of `coin_count` coins, each like the one from `hsm_test_spend`
+    but with its own parent.
+    """
+    unsigned_spend = unsigned_spend_for_public_keys([_.public_key() for _ in secrets])
+    coin_spend = unsigned_spend.coin_spends[0]
+    coin = coin_spend.coin
+    unsigned_spend.coin_spends = [
+        CoinSpend(
+            Coin(
+                hashlib.sha256(b"parent %d" % index).digest(),
+                coin.puzzle_hash,
+                coin.amount,
+            ),
+            coin_spend.puzzle_reveal,
+            coin_spend.solution,
+        )
+        for index in range(coin_count)
+    ]
+    return unsigned_spend
+
+
+def chunk_size_for_blob(blob: bytes) -> int:
+    compressed_size = len(zlib.compress(blob, level=9))
+    return max(1000, -(-compressed_size // MAX_CHUNK_COUNT) + 2)
+
+
+def assemble_chunks(chunks: List[bytes]) -> bytes:
+    chunk_assembler = ChunkAssembler()
+    for chunk in chunks:
+        chunk_assembler.add_chunk(chunk)
+    return chunk_assembler.assemble()
+
+
+def benchmarks_for_size(coin_count: int) -> Dict[str, Benchmark]:
+    secrets = secret_exponents()
+    unsigned_spend = synthetic_unsigned_spend(coin_count, secrets)
+    blob = bytes(unsigned_spend)
+    chunk_size = chunk_size_for_blob(blob)
+    chunks = chunks_for_zlib_blob(blob, chunk_size)
+    shuffled_chunks = random.Random(coin_count).sample(chunks, len(chunks))
+    qrint = b2a_qrint(blob)
+    program = TO_PROGRAM(unsigned_spend)
+
+    def fresh_unsigned_spend():
+        return UnsignedSpend.from_bytes(blob)
+
+    def same(item):
+        return lambda: item
+
+    return {
+        "bytes": Benchmark("serialization", same(unsigned_spend), bytes),
+        "from_bytes": Benchmark("serialization", same(blob), UnsignedSpend.from_bytes),
+        "from_bytes_zero_copy": Benchmark(
+            "serialization",
+            same(blob),
+            lambda b: UnsignedSpend.from_bytes(b, zero_copy=True),
+        ),
+        "sign": Benchmark(
+            "signing", fresh_unsigned_spend, lambda us: sign(us, secrets)
+        ),
+        "generate_synthetic_offset_signatures": Benchmark(
+            "signing", fresh_unsigned_spend, generate_synthetic_offset_signatures
+        ),
+        "chunks_for_zlib_blob": Benchmark(
+            "chunking", same(blob), lambda b: chunks_for_zlib_blob(b, chunk_size)
+        ),
+        "ChunkAssembler": Benchmark("chunking", same(shuffled_chunks), assemble_chunks),
+        "b2a_qrint": Benchmark("qrint", same(blob), b2a_qrint),
+        "a2b_qrint": Benchmark("qrint", same(qrint), a2b_qrint),
+        "disassemble": Benchmark("disassembly", same(program), disassemble),
+    }
+
+
+def run_benchmark(
+    benchmark: Benchmark, min_rounds: int, max_rounds: int, min_time: float
+) -> List[float]:
+    """
+    Time at least `min_rounds` calls, continuing until `min_time` seconds
+    have been spent in calls or `max_rounds` is reached.
+    """
+    samples: List[float] = []
+    total = 0.0
+    while len(samples) < max_rounds and (len(samples) < min_rounds or total < min_time):
+        arg = benchmark.setup()
+        start = time.perf_counter()
+        benchmark.f(arg)
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        total += elapsed
+    return samples
+
+
+def run_suite(
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    names: Optional[List[str]] = None,
+    min_rounds: int = 5,
+    max_rounds: int = 1000,
+    min_time: float = 0.5,
+    progress_f=None,
+) -> List[BenchmarkResult]:
+    results = []
+    for coin_count in sizes:
+        for name, benchmark in benchmarks_for_size(coin_count).items():
+            if names and name not in names:
+                continue
+            samples = run_benchmark(benchmark, min_rounds, max_rounds, min_time)
+            result = BenchmarkResult(
+                f"{name}[{coin_count}]", benchmark.group, coin_count, samples
+            )
+            if progress_f:
+                print(
+                    f"{result.name:45} {result.median * 1e3:12.3f} ms"
+                    f"  ({len(samples)} rounds)",
+                    file=progress_f,
+                )
+            results.append(result)
+    return results
+
+
+def machine_info() -> Dict[str, str]:
+    try:
+        from importlib.metadata import version
+
+        hsms_version = version("hsms")
+    except Exception:
+        hsms_version = "unknown"
+    return dict(
+        hsms=hsms_version,
+        python=platform.python_version(),
+        implementation=platform.python_implementation(),
+        machine=platform.machine(),
+        system=platform.system(),
+    )
+
+
+def results_as_json(results: List[BenchmarkResult]) -> str:
+    d = dict(
+        machine_info=machine_info(),
+        datetime=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        benchmarks=[asdict(_) for _ in results],
+    )
+    return json.dumps(d, indent=2)
+
+
+def hsm_bench(args, parser):
+    results = run_suite(
+        args.size or DEFAULT_SIZES,
+        args.benchmark,
+        args.min_rounds,
+        args.max_rounds,
+        args.min_time,
+        sys.stderr,
+    )
+    text = results_as_json(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark serialization, signing, chunking, qrint and disassembly "
+            "on synthetic `UnsignedSpend` objects, writing JSON results."
+        )
+    )
+    parser.add_argument(
+        "-s",
+        "--size",
+        type=int,
+        action="append",
+        help=f"number of coin spends; may be repeated (default: {DEFAULT_SIZES})",
+    )
+    parser.add_argument(
+        "-b",
+        "--benchmark",
+        action="append",
+        help="only run the named benchmark, like `sign`; may be repeated",
+    )
+    parser.add_argument(
+        "--min-rounds", type=int, default=5, help="minimum timed calls per benchmark"
+    )
+    parser.add_argument(
+        "--max-rounds", type=int, default=1000, help="maximum timed calls per benchmark"
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="keep timing calls until this many seconds are spent",
+    )
+    parser.add_argument(
+        "-o", "--output", help="path to write JSON results to (default: stdout)"
+    )
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    return hsm_bench(args, parser)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
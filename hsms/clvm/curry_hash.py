@@ -0,0 +1,54 @@
+from hashlib import sha256
+
+from clvm_rs import Program  # type: ignore
+
+
+def shatree_atom(atom: bytes) -> bytes:
+    return sha256(b"\1" + atom).digest()
+
+
+def shatree_pair(left_hash: bytes, right_hash: bytes) -> bytes:
+    return sha256(b"\2" + left_hash + right_hash).digest()
+
+
+Q_KW_TREEHASH = shatree_atom(b"\1")
+A_KW_TREEHASH = shatree_atom(b"\2")
+C_KW_TREEHASH = shatree_atom(b"\4")
+ONE_TREEHASH = shatree_atom(b"\1")
+NULL_TREEHASH = shatree_atom(b"")
+
+# `(1)`: the tail of the curried environment, after the last argument
+ONE_LIST_TREEHASH = shatree_pair(ONE_TREEHASH, NULL_TREEHASH)
+
+
+class CurriedTreeHasher:
+    """
+    Calculate the tree hash of `mod.curry(*args)` from the tree hashes of
+    `args`, without building the curried `Program`.
+
+    Currying produces `(a (q . MOD) (c (q . ARG1) (c (q . ARG2) ... 1)))`. The
+    parts that don't depend on the arguments are hashed once, here, so a
+    one-argument curry costs a handful of `sha256` calls.
+    """
+
+    def __init__(self, mod: Program):
+        self.mod_hash = mod.tree_hash()
+        self.quoted_mod_hash = shatree_pair(Q_KW_TREEHASH, self.mod_hash)
+
+    def curry_hash(self, *arg_hashes: bytes) -> bytes:
+        env_list_hash = ONE_LIST_TREEHASH
+        for arg_hash in reversed(arg_hashes):
+            env_hash = shatree_pair(
+                C_KW_TREEHASH,
+                shatree_pair(shatree_pair(Q_KW_TREEHASH, arg_hash), env_list_hash),
+            )
+            env_list_hash = shatree_pair(env_hash, NULL_TREEHASH)
+        return shatree_pair(
+            A_KW_TREEHASH, shatree_pair(self.quoted_mod_hash, env_list_hash)
+        )
+
+    def curry_atom_hash(self, *atoms: bytes) -> bytes:
+        """
+        Like `curry_hash`, for the common case where every argument is an atom.
+        """
+        return self.curry_hash(*[shatree_atom(_) for _ in atoms])
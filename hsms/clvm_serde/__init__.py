@@ -1,15 +1,34 @@
 from dataclasses import MISSING, fields, is_dataclass
 from types import UnionType
-from typing import Any, Callable, Optional, Tuple, Type, Union, get_type_hints
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_origin,
+    get_type_hints,
+)
+
+import sys
 
 from chia_base.meta.type_tree import ArgsType, CompoundLookup, OriginArgsType, TypeTree
 from chia_base.meta.typing import GenericAlias
 
 from clvm_rs import Program  # type: ignore
+from clvm_rs.clvm_tree import CLVMTree  # type: ignore
+
+from hsms.util.type_tree import Steps, TypeMemo, stepped_or_plain
 
 ToProgram = Callable[[Any], Program]
 FromProgram = Callable[[Program], Any]
 
+T = TypeVar("T")
+
 
 class EncodingError(ValueError):
     pass
@@ -28,67 +47,167 @@ class Frugal:
     pass
 
 
+class MemoTypeTree(TypeTree[T]):
+    """
+    A `TypeTree` memoized with `hsms.util.type_tree.TypeMemo`, so each type is
+    built once and self-referential types don't recurse forever.
+
+    The callables for compound types are written as steps (see
+    `hsms.util.type_tree.Stepped`), so a recursive type is (de)serialized on
+    an explicit stack and values may nest to any depth.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.memo: TypeMemo[T] = TypeMemo()
+
+    def __call__(self, t: Any) -> T:
+        return self.memo(t, super().__call__)
+
+
+class ViewTree(CLVMTree):
+    """
+    A `CLVMTree` whose atoms are `memoryview` slices of the serialized blob
+    rather than `bytes` copies.
+
+    This sets `CLVMTree`'s non-public attributes itself, so `clvm_rs` is
+    pinned in `pyproject.toml` and `test_clvm_tree_internals` checks them.
+    """
+
+    def __init__(
+        self,
+        blob: memoryview,
+        int_tuples: List[Tuple[int, int, int]],
+        tree_hashes: Optional[List[bytes]],
+        index: int,
+    ):
+        self.blob = blob
+        self.int_tuples = int_tuples
+        self.tree_hashes = tree_hashes
+        self.index = index
+        if tree_hashes:
+            self._cached_sha256_treehash = tree_hashes[index]
+        start, end, atom_offset = int_tuples[index]
+        if blob[start] == 0xFF:
+            self.atom = None
+        else:
+            self.atom = blob[start + atom_offset : end]
+            self._pair = None
+
+
+def program_from_view(blob: bytes) -> Program:
+    """
+    Parse a serialized `Program` without copying atoms out of `blob`. Atoms
+    are `memoryview` slices that keep `blob` alive; they are only copied
+    when deserialized as `bytes` or `str`.
+    """
+    return Program.wrap(ViewTree.from_bytes(blob))
+
+
 # some helper methods to implement chia serialization
 #
-def read_bytes(p: Program) -> bytes:
+def read_atom(p: Program) -> Union[bytes, memoryview]:
     if p.atom is None:
         raise EncodingError("expected atom")
     return p.atom
 
 
+def read_bytes(p: Program) -> bytes:
+    atom = read_atom(p)
+    return atom if isinstance(atom, bytes) else bytes(atom)
+
+
 def read_str(p: Program) -> str:
-    return read_bytes(p).decode()
+    return str(read_atom(p), "utf8")
 
 
 def read_int(p: Program) -> int:
-    return Program.int_from_bytes(read_bytes(p))
+    return Program.int_from_bytes(read_atom(p))
 
 
-def serialize_for_list(origin, args, type_tree: TypeTree) -> Program:
+def serialize_for_list(origin, args, type_tree: TypeTree) -> ToProgram:
     write_item = type_tree(args[0])
 
-    def serialize_list(items):
-        return Program.to([write_item(_) for _ in items])
+    def serialize_list(items) -> Steps:
+        r = []
+        for item in items:
+            r.append((yield write_item, item))
+        return Program.to(r)
 
-    return serialize_list
+    return stepped_or_plain(serialize_list, [write_item])
 
 
-def serialize_for_optional(origin, args, type_tree: TypeTree) -> Program:
+def serialize_for_optional(origin, args, type_tree: TypeTree) -> ToProgram:
     if len(args) == 2 and type(None) is args[1]:
         write_item = type_tree(args[0])
 
-        def serialize_optional(item):
+        def serialize_optional(item) -> Steps:
             if item is None:
                 return Program.to((Program.null(), Program.null()))
             else:
-                return Program.to((1, write_item(item)))
+                return Program.to((1, (yield write_item, item)))
 
-        return serialize_optional
+        return stepped_or_plain(serialize_optional, [write_item])
     else:
-        raise ValueError("No serialization support for Union types (besides Optional)")
+        return ser_for_tagged_union(args, type_tree)
+
+
+def classes_for_union(args: ArgsType) -> List[type]:
+    """
+    The run-time class for each variant of a `Union`. Variants must be
+    distinguishable by class, so `Union[List[int], List[str]]` can't work.
+    """
+    classes = [get_origin(_) or _ for _ in args]
+    if len(set(classes)) != len(classes):
+        raise ValueError(f"Union variants {args} can't be told apart at run time")
+    return classes
 
 
-def serialize_for_tuple(origin, args, type_tree: TypeTree) -> Program:
+def ser_for_tagged_union(args: ArgsType, type_tree: TypeTree) -> ToProgram:
+    """
+    A `Union` other than `Optional` is serialized as `(tag . value)`, where
+    `tag` is the index of the value's variant in the `Union`. Add new
+    variants at the end to keep existing tags stable.
+    """
+    classes = classes_for_union(args)
+    entries = [
+        (tag, (lambda _: Program.null()) if t is type(None) else type_tree(t))
+        for tag, t in enumerate(args)
+    ]
+    by_class = dict(zip(classes, entries))
+
+    def ser(item) -> Steps:
+        entry = by_class.get(type(item))
+        if entry is None:
+            # a subclass of one of the variants
+            for cls, e in zip(classes, entries):
+                if isinstance(item, cls):
+                    entry = by_class[type(item)] = e
+                    break
+            else:
+                raise EncodingError(f"{type(item)} is not a variant of {args}")
+        tag, write_item = entry
+        return Program.to((tag, (yield write_item, item)))
+
+    return stepped_or_plain(ser, [_ for tag, _ in entries])
+
+
+def serialize_for_tuple(origin, args, type_tree: TypeTree) -> ToProgram:
     write_items = [type_tree(_) for _ in args]
 
-    def serialize_tuple(items):
+    def serialize_tuple(items) -> Steps:
         item_list = list(items)
         if len(item_list) != len(write_items):
             raise EncodingError("incorrect number of items in tuple")
-        return Program.to(
-            [
-                write_f(item)
-                for write_f, item in zip(
-                    write_items,
-                    items,
-                )
-            ]
-        )
+        r = []
+        for write_f, item in zip(write_items, item_list):
+            r.append((yield write_f, item))
+        return Program.to(r)
 
-    return serialize_tuple
+    return stepped_or_plain(serialize_tuple, write_items)
 
 
-def ser_for_tuple_frugal(origin, args, type_tree: TypeTree) -> Program:
+def ser_for_tuple_frugal(origin, args, type_tree: TypeTree) -> ToProgram:
     streaming_calls = [
         type_tree(
             _,
@@ -96,19 +215,19 @@ def ser_for_tuple_frugal(origin, args, type_tree: TypeTree) -> Program:
         for _ in args
     ]
 
-    def ser(item):
+    def ser(item) -> Steps:
         if len(item) != len(streaming_calls):
             raise EncodingError("incorrect number of items in tuple")
 
         values = list(zip(streaming_calls, item))
         sc, v = values.pop()
-        t = sc(v)
+        t = yield sc, v
         while values:
             sc, v = values.pop()
-            t = (sc(v), t)
+            t = ((yield sc, v), t)
         return Program.to(t)
 
-    return ser
+    return stepped_or_plain(ser, streaming_calls)
 
 
 SERIALIZER_COMPOUND_TYPE_LOOKUP: CompoundLookup[ToProgram] = {
@@ -120,12 +239,29 @@ SERIALIZER_COMPOUND_TYPE_LOOKUP: CompoundLookup[ToProgram] = {
 }
 
 
+def local_names_for_hints(t: type, type_tree: TypeTree) -> Dict[str, type]:
+    """
+    The classes `type_tree` has built or is building, by name, except where
+    `t`'s module already has something of that name, and `t` itself.
+    """
+    module = sys.modules.get(t.__module__)
+    global_names = vars(module) if module else {}
+    memo: Optional[TypeMemo] = getattr(type_tree, "memo", None)
+    classes = memo.classes() if memo else {}
+    r = {k: v for k, v in classes.items() if k not in global_names}
+    r[t.__name__] = t
+    return r
+
+
 def types_for_fields(t: type, call_morpher, type_tree: TypeTree):
     # split into key-based and location-based
 
     key_based = []
     location_based = []
-    type_hints = get_type_hints(t)
+    # resolved now rather than at class creation, so fields may refer to
+    # classes defined later, or (for classes defined in a function) to `t`
+    # or any other class being built, like one that refers back to `t`
+    type_hints = get_type_hints(t, localns=local_names_for_hints(t, type_tree))
     for f in fields(t):
         type_hint = type_hints[f.name]
         default_value = (
@@ -144,16 +280,16 @@ def types_for_fields(t: type, call_morpher, type_tree: TypeTree):
     return location_based, key_based
 
 
-def ser_dataclass(origin: Type, args_type: ArgsType, type_tree: TypeTree) -> Program:
+def ser_dataclass(origin: Type, args_type: ArgsType, type_tree: TypeTree) -> ToProgram:
     def morph_call(call, f):
         alt_serde_type = f.metadata.get("alt_serde_type")
         if alt_serde_type:
             _type, from_storage, _to_storage = alt_serde_type
 
-            def f(x):
-                return call(from_storage(x))
+            def f(x) -> Steps:
+                return (yield call, from_storage(x))
 
-            return f
+            return stepped_or_plain(f, [call])
         return call
 
     location_based, key_based = types_for_fields(origin, morph_call, type_tree)
@@ -171,7 +307,7 @@ def ser_dataclass(origin: Type, args_type: ArgsType, type_tree: TypeTree) -> Pro
 
     ser_tuple = type_tree(tuple_type)
 
-    def ser(item):
+    def ser(item) -> Steps:
         # convert to a tuple
         v = []
         for name in names:
@@ -182,12 +318,12 @@ def ser_dataclass(origin: Type, args_type: ArgsType, type_tree: TypeTree) -> Pro
                 a = getattr(item, name)
                 if a == default_value:
                     continue
-                d.append((key, call(a)))
+                d.append((key, (yield call, a)))
             v.append(d)
 
-        return ser_tuple(v)
+        return (yield ser_tuple, v)
 
-    return ser
+    return stepped_or_plain(ser, [ser_tuple] + [_[2] for _ in key_based])
 
 
 def fail_ser(
@@ -211,10 +347,10 @@ def deser_dataclass(origin: Type, args_type: ArgsType, type_tree: TypeTree):
         if alt_serde_type:
             _type, _from_storage, to_storage = alt_serde_type
 
-            def f(x):
-                return to_storage(call(x))
+            def f(x) -> Steps:
+                return to_storage((yield call, x))
 
-            return f
+            return stepped_or_plain(f, [call])
         return call
 
     location_based, key_based = types_for_fields(origin, morph_call, type_tree)
@@ -232,14 +368,14 @@ def deser_dataclass(origin: Type, args_type: ArgsType, type_tree: TypeTree):
 
     if key_based:
 
-        def de(p: Program):
-            the_tuple = de_tuple(p)
+        def de(p: Program) -> Steps:
+            the_tuple = yield de_tuple, p
             args = the_tuple[:-1]
             d = dict((k, v) for k, v in the_tuple[-1])
             kwargs = {}
             for key, name, call, default_value in key_based:
                 if key in d:
-                    kwargs[name] = call(d[key])
+                    kwargs[name] = yield call, d[key]
                 else:
                     if default_value == MISSING:
                         raise EncodingError(
@@ -251,11 +387,11 @@ def deser_dataclass(origin: Type, args_type: ArgsType, type_tree: TypeTree):
 
     else:
 
-        def de(p: Program):
-            the_tuple = de_tuple(p)
+        def de(p: Program) -> Steps:
+            the_tuple = yield de_tuple, p
             return origin(*the_tuple)
 
-    return de
+    return stepped_or_plain(de, [de_tuple] + [_[2] for _ in key_based])
 
 
 def fail_deser(origin: Type, args_type: ArgsType, type_tree: TypeTree):
@@ -272,44 +408,53 @@ def fail_deser(origin: Type, args_type: ArgsType, type_tree: TypeTree):
         return deser_dataclass(origin, args_type, type_tree)
 
     if hasattr(origin, "from_bytes"):
-        return lambda p: origin.from_bytes(read_bytes(p))
+        return lambda p: origin.from_bytes(read_atom(p))
 
     return None
 
 
+SERIALIZER_TYPE_TREE: MemoTypeTree[ToProgram] = MemoTypeTree(
+    {(Program, None): lambda x: x},
+    SERIALIZER_COMPOUND_TYPE_LOOKUP,
+    fail_ser,
+)
+
+
 def to_program_for_type(t: type) -> Callable[[Any], Program]:
-    return TypeTree(
-        {(Program, None): lambda x: x},
-        SERIALIZER_COMPOUND_TYPE_LOOKUP,
-        fail_ser,
-    )(t)
+    return SERIALIZER_TYPE_TREE(t)
 
 
 def deser_for_list(origin, args, type_tree: TypeTree):
     read_item = type_tree(args[0])
 
-    def deserialize_list(p: Program) -> list:
-        return [read_item(_) for _ in p.as_iter()]
+    def deserialize_list(p: Program) -> Steps:
+        r = []
+        for _ in p.as_iter():
+            r.append((yield read_item, _))
+        return r
 
-    return deserialize_list
+    return stepped_or_plain(deserialize_list, [read_item])
 
 
 def deser_for_tuple(origin, args, type_tree: TypeTree):
     read_items = [type_tree(_) for _ in args]
 
-    def deserialize_tuple(p: Program) -> Tuple[Any, ...]:
+    def deserialize_tuple(p: Program) -> Steps:
         items = list(p.as_iter())
         if len(items) != len(read_items):
             raise EncodingError("wrong size program")
-        return tuple(f(_) for f, _ in zip(read_items, items))
+        r = []
+        for f, _ in zip(read_items, items):
+            r.append((yield f, _))
+        return tuple(r)
 
-    return deserialize_tuple
+    return stepped_or_plain(deserialize_tuple, read_items)
 
 
 def de_for_tuple_frugal(origin, args, type_tree: TypeTree):
     read_items = [type_tree(_) for _ in args]
 
-    def de(p: Program) -> Tuple[Any, ...]:
+    def de(p: Program) -> Steps:
         args = []
         todo = list(reversed(read_items))
         while todo:
@@ -319,24 +464,41 @@ def de_for_tuple_frugal(origin, args, type_tree: TypeTree):
                 p = p.pair[1]
             else:
                 v = p
-            args.append(des(Program.to(v)))
+            args.append((yield des, Program.to(v)))
         return tuple(args)
 
-    return de
+    return stepped_or_plain(de, read_items)
+
 
 def deser_for_optional(origin, args, type_tree: TypeTree):
     if len(args) == 2 and type(None) is args[1]:
         read_item = type_tree(args[0])
 
-        def deserialize_optional(p: Program):
+        def deserialize_optional(p: Program) -> Steps:
             if p.first() == Program.null():
                 return None
             else:
-                return read_item(p.rest())
+                return (yield read_item, p.rest())
 
-        return deserialize_optional
+        return stepped_or_plain(deserialize_optional, [read_item])
     else:
-        raise ValueError("No serialization support for Union types (besides Optional)")
+        return de_for_tagged_union(args, type_tree)
+
+
+def de_for_tagged_union(args: ArgsType, type_tree: TypeTree) -> FromProgram:
+    classes_for_union(args)
+    read_items = [(lambda p: None) if t is type(None) else type_tree(t) for t in args]
+
+    def de(p: Program) -> Steps:
+        if p.pair is None:
+            raise EncodingError("expected pair")
+        tag_p, value = p.pair
+        tag = read_int(tag_p)
+        if not 0 <= tag < len(read_items):
+            raise EncodingError(f"bad tag {tag} for {args}")
+        return (yield read_items[tag], value)
+
+    return stepped_or_plain(de, read_items)
 
 
 DESERIALIZER_COMPOUND_TYPE_LOOKUP: CompoundLookup[FromProgram] = {
@@ -348,12 +510,17 @@ DESERIALIZER_COMPOUND_TYPE_LOOKUP: CompoundLookup[FromProgram] = {
 }
 
 
+DESERIALIZER_SIMPLE_TYPE_LOOKUP: Dict[OriginArgsType, FromProgram] = {
+    (Program, None): lambda x: x,
+}
+
+
+DESERIALIZER_TYPE_TREE: MemoTypeTree[FromProgram] = MemoTypeTree(
+    DESERIALIZER_SIMPLE_TYPE_LOOKUP,
+    DESERIALIZER_COMPOUND_TYPE_LOOKUP,
+    fail_deser,
+)
+
+
 def from_program_for_type(t: type) -> FromProgram:
-    simple_lookup: dict[OriginArgsType, FromProgram] = {
-        (Program, None): lambda x: x,
-    }
-    return TypeTree(
-        simple_lookup,
-        DESERIALIZER_COMPOUND_TYPE_LOOKUP,
-        fail_deser,
-    )(t)
+    return DESERIALIZER_TYPE_TREE(t)
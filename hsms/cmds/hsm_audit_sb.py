@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import argparse
+import json
+import os
+import sys
+
+from chia_base.cbincode import from_bytes
+from chia_base.core import SpendBundle
+
+from hsms.debug.audit_spend_bundle import SpendBundleAudit, audit_spend_bundle
+from hsms.debug.debug_spend_bundle import AGG_SIG_ME_ADDITIONAL_DATA
+from hsms.util.executor import windowed_map
+
+
+def hex_for_line(line: str) -> str:
+    """
+    A line is either bare hex, a JSON string of hex, or a JSON object with
+    a `spend_bundle` hex value.
+    """
+    if line.startswith(("{", '"')):
+        item = json.loads(line)
+        if isinstance(item, dict):
+            item = item["spend_bundle"]
+        return item
+    return line
+
+
+def spend_bundle_hex_items(paths: List[str]) -> Iterable[Tuple[str, str]]:
+    """
+    Yield `(name, hex)` pairs. Each file in a directory holds one bundle,
+    other files hold one bundle per line.
+    """
+    for path in paths:
+        p = Path(path)
+        if p.is_dir():
+            for child in sorted(p.iterdir()):
+                if child.is_file() and not child.name.startswith("."):
+                    yield str(child), child.read_text().strip()
+            continue
+        with open(p) as f:
+            for idx, line in enumerate(f, start=1):
+                line = line.strip()
+                if line:
+                    yield f"{p}:{idx}", line
+
+
+def audit_item(item: Tuple[str, str, bytes]) -> SpendBundleAudit:
+    name, text, agg_sig_additional_data = item
+    try:
+        spend_bundle = from_bytes(SpendBundle, bytes.fromhex(hex_for_line(text)))
+    except Exception as ex:
+        return SpendBundleAudit(name, error=f"can't parse: {ex}")
+    return audit_spend_bundle(spend_bundle, name, agg_sig_additional_data)
+
+
+def audit_items(
+    items: Iterable[Tuple[str, str, bytes]], workers: Optional[int]
+) -> Iterable[SpendBundleAudit]:
+    if workers == 1:
+        yield from map(audit_item, items)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # only a few bundles per worker are held at once, however many there are
+        yield from windowed_map(executor, audit_item, items, 4 * workers)
+
+
+def print_audit_table(audits: Iterable[SpendBundleAudit], f=sys.stdout) -> int:
+    """
+    Print one row per audit, then a totals line. Return the failure count.
+    """
+    header = f"{'cost':>12} {'spent':>6} {'created':>7} {'ok':>3} {'ms':>9}  name"
+    print(header, file=f)
+    print("-" * len(header), file=f)
+    count = failures = total_cost = 0
+    total_time = 0.0
+    for audit in audits:
+        count += 1
+        total_cost += audit.cost
+        total_time += audit.run_time
+        ok = "yes" if audit.validates else "NO"
+        print(
+            f"{audit.cost:>12} {audit.coins_spent:>6} {audit.coins_created:>7}"
+            f" {ok:>3} {audit.run_time * 1000:>9.2f}  {audit.name}",
+            file=f,
+        )
+        if not audit.validates:
+            failures += 1
+            print(f"    *** {audit.error}", file=f)
+    print("-" * len(header), file=f)
+    print(
+        f"{count} spend bundles, {failures} failed, total cost {total_cost}, "
+        f"{total_time:0.3f}s wall time (summed over bundles)",
+        file=f,
+    )
+    return failures
+
+
+def hsm_audit_sb(args, parser):
+    items = (
+        (name, text, args.network_id)
+        for name, text in spend_bundle_hex_items(args.path)
+    )
+    failures = print_audit_table(audit_items(items, args.workers), sys.stdout)
+    return 1 if failures else 0
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Run puzzles and check signatures for many `SpendBundle` objects "
+            "in parallel. Exits nonzero if any fail."
+        )
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: one per cpu)",
+    )
+    parser.add_argument(
+        "--network-id",
+        type=bytes.fromhex,
+        default=AGG_SIG_ME_ADDITIONAL_DATA,
+        help="hex of `AGG_SIG_ME` additional data (default: mainnet)",
+    )
+    parser.add_argument(
+        "path",
+        nargs="+",
+        metavar="path-to-spend-bundles",
+        help=(
+            "directory with one hex-encoded `SpendBundle` per file, or a file "
+            "with one per line (hex or JSONL)"
+        ),
+    )
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    return hsm_audit_sb(args, parser)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
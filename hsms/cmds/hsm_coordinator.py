@@ -0,0 +1,216 @@
+"""
+Collect partial signatures from several `hsms` instances as they arrive,
+over a unix socket or through a watched directory, and emit each
+`SpendBundle` once every signer has contributed.
+
+Requests are lines of text, answered one line each:
+
+    us <unsigned-spend>
+        => pending <spend-id> <signer-count>
+    sig <spend-id> <signature> [<signer> ...]
+        => ok <spend-id> <signed>/<total>, or complete <spend-id>
+    status
+        => pending <spend-id> <signed>/<total> ...
+
+Unsigned spends and signatures are qrint or hex, as `hsmmerge` takes them.
+A signature may also be the `SignatureInfo` list from
+`hsms --signature-infos`, which needs no signer. A signer is a bech32m root
+public key, as printed by `hsmpk`; an `hsms` holding several keys names them
+all, or they're worked out from the signature. Anything that goes wrong is answered
+with `error <reason>`.
+
+A file dropped in the watched directory is read as request lines, answers
+are printed, and the file is renamed with a `.done` suffix. Write each file
+under a temporary name (ending `.tmp`, or starting with `.`) and rename it
+into place once it's complete, or it may be read half written.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import argparse
+import asyncio
+import sys
+
+from chia_base.atoms import bytes32
+from chia_base.bls12_381 import BLSPublicKey
+from chia_base.cbincode import to_bytes
+from chia_base.core import SpendBundle
+
+from hsms.cmds.hsmmerge import file_or_string, signature_from_blob
+from hsms.cmds.hsms import unsigned_spend_from_blob
+from hsms.core.envelope import is_envelope, item_for_envelope
+from hsms.process.coordinator import Coordinator
+from hsms.util.qrint_encoding import a2b_qrint_or_hex
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+DONE_SUFFIX = ".done"
+
+# files still being written, which are skipped
+TEMP_SUFFIX = ".tmp"
+
+
+def progress(coordinator: Coordinator, spend_id: bytes32) -> str:
+    pending_spend = coordinator.pending_spend(spend_id)
+    total = len(pending_spend.expected)
+    signed = total - len(pending_spend.missing_signers())
+    return f"{spend_id.hex()} {signed}/{total}"
+
+
+async def handle_request(coordinator: Coordinator, line: str) -> str:
+    words = line.split()
+    try:
+        if words[:1] == ["us"] and len(words) == 2:
+            unsigned_spend = unsigned_spend_from_blob(a2b_qrint_or_hex(words[1]))
+            pending_spend = await coordinator.add_unsigned_spend(unsigned_spend)
+            spend_id = pending_spend.spend_id.hex()
+            if pending_spend.spend_bundle.done():
+                return f"complete {spend_id}"
+            return f"pending {spend_id} {len(pending_spend.expected)}"
+        if words[:1] == ["sig"] and len(words) >= 3:
+            spend_id = bytes32.fromhex(words[1])
+            blob = a2b_qrint_or_hex(words[2])
+            item = item_for_envelope(blob) if is_envelope(blob) else None
+            if isinstance(item, list):
+                await coordinator.add_signature_infos(spend_id, item)
+            else:
+                signature = signature_from_blob(blob)
+                signers = [BLSPublicKey.from_bech32m(_) for _ in words[3:]] or None
+                await coordinator.add_partial_signature(spend_id, signature, signers)
+            if spend_id not in coordinator.pending:
+                return f"complete {spend_id.hex()}"
+            return f"ok {progress(coordinator, spend_id)}"
+        if words == ["status"]:
+            return " ".join(
+                ["pending"] + [progress(coordinator, _) for _ in coordinator.pending]
+            )
+    except Exception as ex:
+        return f"error {ex}"
+    return f"error can't parse {line.strip()!r}"
+
+
+async def serve_socket(coordinator: Coordinator, path: str):
+    async def handle_client(reader, writer):
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    reply = await handle_request(coordinator, line.decode())
+                    writer.write(reply.encode() + b"\n")
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_unix_server(handle_client, path)
+
+
+def is_request_file(p: Path) -> bool:
+    return (
+        p.is_file()
+        and not p.name.startswith(".")
+        and not p.name.endswith((DONE_SUFFIX, TEMP_SUFFIX))
+    )
+
+
+async def process_directory(coordinator: Coordinator, path: Path, f=sys.stdout):
+    for p in sorted(path.iterdir()):
+        if not is_request_file(p):
+            continue
+        for line in p.read_text().splitlines():
+            if line.strip():
+                reply = await handle_request(coordinator, line)
+                print(f"{p.name}: {reply}", file=f)
+        p.rename(p.with_name(p.name + DONE_SUFFIX))
+
+
+async def watch_directory(
+    coordinator: Coordinator, path: Path, poll_interval: float, f=sys.stdout
+):
+    while True:
+        await process_directory(coordinator, path, f)
+        await asyncio.sleep(poll_interval)
+
+
+def spend_bundle_writer(output_dir: Optional[Path], f=sys.stdout):
+    def on_spend_bundle(spend_id: bytes32, spend_bundle: SpendBundle) -> None:
+        blob = to_bytes(spend_bundle).hex()
+        if output_dir is None:
+            print(f"spend_bundle {spend_id.hex()} {blob}", file=f)
+        else:
+            output_path = output_dir / f"{spend_id.hex()}.hex"
+            output_path.write_text(blob + "\n")
+            print(f"spend_bundle {spend_id.hex()} {output_path}", file=f)
+        f.flush()
+
+    return on_spend_bundle
+
+
+async def run_coordinator(args, parser):
+    output_dir = Path(args.output_dir) if args.output_dir else None
+    coordinator = Coordinator(spend_bundle_writer(output_dir))
+    for path in args.unsigned_spend:
+        reply = await handle_request(coordinator, f"us {file_or_string(path)}")
+        print(f"{path}: {reply}")
+    tasks = []
+    if args.socket:
+        server = await serve_socket(coordinator, args.socket)
+        tasks.append(server.serve_forever())
+    if args.watch:
+        tasks.append(watch_directory(coordinator, Path(args.watch), args.poll_interval))
+    await asyncio.gather(*tasks)
+
+
+def hsm_coordinator(args, parser):
+    if not (args.socket or args.watch):
+        parser.error("give a socket, a directory to watch, or both")
+    try:
+        asyncio.run(run_coordinator(args, parser))
+    except KeyboardInterrupt:
+        pass
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Collect partial signatures for many unsigned spends as they arrive, "
+            "writing each `SpendBundle` once all its signers have signed."
+        )
+    )
+    parser.add_argument("-s", "--socket", help="path of a unix socket to listen on")
+    parser.add_argument(
+        "-w",
+        "--watch",
+        help=(
+            "directory to watch for files of request lines; write each under "
+            f"a name ending `{TEMP_SUFFIX}` and rename it when it's complete"
+        ),
+    )
+    parser.add_argument(
+        "-p",
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help=f"seconds between directory scans (default: {DEFAULT_POLL_INTERVAL})",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="write each spend bundle as hex to `<spend-id>.hex` in this directory",
+    )
+    parser.add_argument(
+        "unsigned_spend",
+        metavar="path-to-unsigned-spend",
+        nargs="*",
+        help="qrint or hex-encoded `UnsignedSpend` to start with",
+    )
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    return hsm_coordinator(args, parser)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -1,10 +1,8 @@
 import argparse
 import sys
-import zlib
 
-from hsms.cmds.hsms import summarize_unsigned_spend
-from hsms.core.unsigned_spend import UnsignedSpend
-from hsms.util.qrint_encoding import a2b_qrint
+from hsms.cmds.hsms import summarize_unsigned_spend, unsigned_spend_from_blob
+from hsms.util.qrint_encoding import a2b_qrint_or_hex
 
 
 def file_or_string(p) -> str:
@@ -16,25 +14,14 @@ def file_or_string(p) -> str:
     return text
 
 
-def fromhex_or_qrint(s: str) -> bytes:
-    try:
-        return a2b_qrint(s)
-    except ValueError:
-        pass
-    return bytes.fromhex(s)
-
-
 def hsms_dump_us(args, parser):
     """
-    Try to handle input in qrint or hex, with or without zlib compression
+    Handle input in qrint or hex, as an envelope or with or without zlib
+    compression
     """
-    blob = fromhex_or_qrint(file_or_string(args.unsigned_spend))
-    try:
-        blob = zlib.decompress(blob)
-    except zlib.error:
-        pass
-    unsigned_spend = UnsignedSpend.from_bytes(blob)
-    summarize_unsigned_spend(unsigned_spend)
+    blob = a2b_qrint_or_hex(file_or_string(args.unsigned_spend))
+    unsigned_spend = unsigned_spend_from_blob(blob)
+    summarize_unsigned_spend(unsigned_spend, sys.stdout)
 
 
 def create_parser():
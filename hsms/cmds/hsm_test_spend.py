@@ -1,3 +1,5 @@
+from typing import List
+
 import argparse
 import hashlib
 import sys
@@ -8,11 +10,13 @@ from clvm_rs import Program  # type: ignore
 from chia_base.bls12_381 import BLSPublicKey
 from chia_base.core import Coin, CoinSpend
 
+from hsms.core.envelope import envelope_for_item
 from hsms.core.signing_hints import SumHint, PathHint
 from hsms.core.unsigned_spend import UnsignedSpend
 from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
     DEFAULT_HIDDEN_PUZZLE,
     puzzle_for_public_key_and_hidden_puzzle,
+    puzzle_hash_for_public_key_and_hidden_puzzle_hash,
     solution_for_conditions,
     calculate_synthetic_offset,
 )
@@ -21,6 +25,8 @@ from hsms.util.byte_chunks import (
     create_chunks_for_blob,
     optimal_chunk_size_for_max_chunk_size,
 )
+from hsms.util.compression import COMPRESSION_FOR_NAME, compression_for_name
+from hsms.util.qr import add_qr_arguments, qr_settings_for_args, show_qr_sequence
 from hsms.util.qrint_encoding import b2a_qrint
 
 MAINNET_AGG_SIG_ME_ADDITIONAL_DATA = bytes.fromhex(
@@ -31,9 +37,9 @@ MAINNET_AGG_SIG_ME_ADDITIONAL_DATA = bytes.fromhex(
 DEFAULT_HIDDEN_PUZZLE_HASH = DEFAULT_HIDDEN_PUZZLE.tree_hash()
 
 
-def hsm_test_spend(args, parser):
-    root_public_keys = [BLSPublicKey.from_bech32m(_) for _ in args.public_key]
-
+def unsigned_spend_for_public_keys(
+    root_public_keys: List[BLSPublicKey],
+) -> UnsignedSpend:
     paths = [[index, index + 1] for index in range(len(root_public_keys))]
 
     public_keys = [
@@ -48,7 +54,10 @@ def hsm_test_spend(args, parser):
 
     # make the coin
     FAKE_PARENT = hashlib.sha256(b"parent").digest()
-    coin = Coin(FAKE_PARENT, puzzle.tree_hash(), 1)
+    puzzle_hash = puzzle_hash_for_public_key_and_hidden_puzzle_hash(
+        sum_pk, DEFAULT_HIDDEN_PUZZLE_HASH
+    )
+    coin = Coin(FAKE_PARENT, puzzle_hash, 1)
 
     synthetic_secret_exponent = calculate_synthetic_offset(
         sum_pk, DEFAULT_HIDDEN_PUZZLE_HASH
@@ -74,24 +83,47 @@ def hsm_test_spend(args, parser):
 
     coin_spend = CoinSpend(coin, puzzle, solution)
 
-    unsigned_spend = UnsignedSpend(
+    return UnsignedSpend(
         [coin_spend], sum_hints, path_hints, MAINNET_AGG_SIG_ME_ADDITIONAL_DATA
     )
 
+
+def hsm_test_spend(args, parser):
+    root_public_keys = [BLSPublicKey.from_bech32m(_) for _ in args.public_key]
+    unsigned_spend = unsigned_spend_for_public_keys(root_public_keys)
+
     b = bytes(unsigned_spend)
+    # what's sent: an envelope if asked for, otherwise the bare spend
+    if args.envelope:
+        blob = envelope_for_item(unsigned_spend, args.compression.tag)
+    else:
+        blob = b
     if args.hex:
-        print(b.hex())
+        print(blob.hex())
     else:
         if args.no_chunks:
-            chunks = [b]
+            chunks = [blob]
         else:
-            cb = zlib.compress(b)
+            # an envelope is already compressed
+            cb = blob if args.envelope else zlib.compress(blob)
             optimal_size = optimal_chunk_size_for_max_chunk_size(
                 len(cb), args.max_chunk_size
             )
             chunks = create_chunks_for_blob(cb, optimal_size)
-        for chunk in chunks:
-            print(b2a_qrint(chunk))
+        texts = [b2a_qrint(_) for _ in chunks]
+        if args.qr or args.apng:
+            show_qr_sequence(
+                texts,
+                sys.stdout,
+                args.fps,
+                args.apng,
+                # no secrets here, so encoding can be spread across processes
+                workers=None,
+                settings=qr_settings_for_args(args),
+            )
+        else:
+            for text in texts:
+                print(text)
 
     us = UnsignedSpend.from_bytes(b)
     assert bytes(us) == b
@@ -115,12 +147,33 @@ def create_parser():
         action="store_true",
         help="hex output",
     )
+    parser.add_argument(
+        "--qr",
+        action="store_true",
+        help="show chunks as QR codes, cycling through them until interrupted",
+    )
     parser.add_argument(
         "-n",
         "--no-chunks",
         action="store_true",
         help="don't compress or chunk output",
     )
+    parser.add_argument(
+        "-e",
+        "--envelope",
+        action="store_true",
+        help="wrap output in a self-describing envelope",
+    )
+    parser.add_argument(
+        "-z",
+        "--compression",
+        default="zlib-dict",
+        type=compression_for_name,
+        help=(
+            "compression for envelopes: one of "
+            f"{', '.join(COMPRESSION_FOR_NAME)} (default: zlib-dict)"
+        ),
+    )
     parser.add_argument(
         "public_key",
         metavar="public-key",
@@ -128,6 +181,7 @@ def create_parser():
         help="bech32m-encoded public key",
         type=str,
     )
+    add_qr_arguments(parser)
     return parser
 
 
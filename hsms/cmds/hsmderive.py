@@ -0,0 +1,100 @@
+from typing import List
+
+import argparse
+import sys
+
+from chia_base.bls12_381 import BLSPublicKey
+
+from hsms.process.derivation import DEFAULT_BATCH_SIZE, derive_rows
+from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    DEFAULT_HIDDEN_PUZZLE_HASH,
+)
+
+
+def parse_path(s: str) -> List[int]:
+    """
+    Parse a derivation path like `12381/8444/2`. An empty string is the root.
+    """
+    return [int(_) for _ in s.replace(",", "/").split("/") if _.strip()]
+
+
+def hsmderive(args, parser):
+    root_public_key = BLSPublicKey.from_bech32m(args.public_key)
+    rows = derive_rows(
+        root_public_key,
+        args.path_prefix,
+        args.start,
+        args.count,
+        args.hidden_puzzle_hash,
+        args.prefix,
+        args.workers,
+        args.batch_size,
+    )
+    for row in rows:
+        print(
+            f"{row.index}\t{row.public_key.hex()}\t{row.synthetic_public_key.hex()}"
+            f"\t{row.puzzle_hash.hex()}\t{row.address}"
+        )
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Derive public keys, standard puzzle hashes and addresses for a range "
+            "of child indices of a public key. Prints one tab-separated line "
+            "per index: index, public key, synthetic public key, puzzle hash, "
+            "address."
+        )
+    )
+    parser.add_argument(
+        "-p",
+        "--path-prefix",
+        type=parse_path,
+        default=[],
+        help="derivation path to the parent of the range, like `12381/8444/2`",
+    )
+    parser.add_argument(
+        "-s", "--start", type=int, default=0, help="first child index to derive"
+    )
+    parser.add_argument(
+        "-c", "--count", type=int, default=100, help="number of indices to derive"
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: one per cpu)",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="number of indices handed to a worker at a time",
+    )
+    parser.add_argument(
+        "--hidden-puzzle-hash",
+        type=bytes.fromhex,
+        default=DEFAULT_HIDDEN_PUZZLE_HASH,
+        help="hex of hidden puzzle hash for the standard puzzle",
+    )
+    parser.add_argument(
+        "--prefix", default="xch", help="address prefix, like `xch` or `txch`"
+    )
+    parser.add_argument(
+        "public_key",
+        metavar="public-key",
+        help="bech32m-encoded root public key",
+    )
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    return hsmderive(args, parser)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
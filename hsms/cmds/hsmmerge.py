@@ -1,17 +1,75 @@
 from typing import List
 
 import argparse
+import sys
 
 from chia_base.bls12_381 import BLSSignature
 from chia_base.core import SpendBundle
 from chia_base.cbincode import to_bytes
 
+from hsms.cmds.hsms import unsigned_spend_from_blob
+from hsms.core.envelope import is_envelope, item_for_envelope
 from hsms.core.unsigned_spend import UnsignedSpend
-from hsms.process.sign import generate_synthetic_offset_signatures
+from hsms.process.sign import (
+    generate_synthetic_offset_signatures,
+    signature_metadata_by_signer,
+    verify_partial_signature,
+)
 from hsms.util.qrint_encoding import a2b_qrint
 
 
-def create_spend_bundle(unsigned_spend: UnsignedSpend, signatures: List[BLSSignature]):
+def check_partial_signatures(
+    unsigned_spend: UnsignedSpend, signatures: List[BLSSignature]
+) -> None:
+    """
+    Check the sum of `signatures` against everything the signers are
+    expected to sign, however it's split between them (one `hsms` may hold
+    several keys). That's a single multi-pairing.
+
+    Only if the sum is wrong is each signature matched against each signer,
+    so a bad partial is pinned on its signer rather than showing up as an
+    invalid aggregate. Raises `ValueError` naming the signatures and signers
+    at fault.
+    """
+    expected = signature_metadata_by_signer(unsigned_spend)
+    signers = list(expected)
+    total_signature = sum(signatures, start=BLSSignature.zero())
+    everything = [_ for signer in signers for _ in expected[signer]]
+    if verify_partial_signature(total_signature, everything):
+        return
+
+    matches = [
+        [
+            index
+            for index, signer in enumerate(signers)
+            if verify_partial_signature(signature, expected[signer])
+        ]
+        for signature in signatures
+    ]
+    matched = sorted(_ for match in matches for _ in match)
+    problems = [
+        f"signature {index + 1} doesn't match any signer"
+        for index, match in enumerate(matches)
+        if not match
+    ]
+    for signer_index, signer in enumerate(signers):
+        count = matched.count(signer_index)
+        if count != 1:
+            reason = "is missing" if count == 0 else f"was given {count} times"
+            problems.append(f"signature from {signer.as_bech32m()} {reason}")
+    raise ValueError("; ".join(problems) or "signatures don't add up")
+
+
+def create_spend_bundle(
+    unsigned_spend: UnsignedSpend, signatures: List[BLSSignature]
+) -> SpendBundle:
+    """
+    Raises `ValueError` if `signatures` don't sign `unsigned_spend` (see
+    `check_partial_signatures`), rather than returning a `SpendBundle` that
+    would be rejected.
+    """
+    check_partial_signatures(unsigned_spend, signatures)
+
     extra_signatures = generate_synthetic_offset_signatures(unsigned_spend)
 
     # now let's try adding them all together and creating a `SpendBundle`
@@ -31,13 +89,32 @@ def file_or_string(p) -> str:
     return text
 
 
+def signature_from_blob(blob: bytes) -> BLSSignature:
+    """
+    Accepts a bare signature, or an envelope holding a signature or the
+    `SignatureInfo` list from `hsms --signature-infos`, which is summed.
+    """
+    if not is_envelope(blob):
+        return BLSSignature.from_bytes(blob)
+    item = item_for_envelope(blob)
+    if isinstance(item, list):
+        return sum([_.signature for _ in item], start=BLSSignature.zero())
+    if not isinstance(item, BLSSignature):
+        raise ValueError(f"expected a signature, got {type(item).__name__}")
+    return item
+
+
 def hsmsmerge(args, parser):
     blob = a2b_qrint(file_or_string(args.unsigned_spend))
-    unsigned_spend = UnsignedSpend.from_bytes(blob)
+    unsigned_spend = unsigned_spend_from_blob(blob)
     signatures = [
-        BLSSignature.from_bytes(a2b_qrint(file_or_string(_))) for _ in args.signature
+        signature_from_blob(a2b_qrint(file_or_string(_))) for _ in args.signature
     ]
-    spend_bundle = create_spend_bundle(unsigned_spend, signatures)
+    try:
+        spend_bundle = create_spend_bundle(unsigned_spend, signatures)
+    except ValueError as ex:
+        print(f"error: {ex}", file=sys.stderr)
+        return 1
     print(to_bytes(spend_bundle).hex())
 
 
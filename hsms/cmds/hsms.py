@@ -1,41 +1,64 @@
-from decimal import Decimal
-from typing import BinaryIO, Iterable, List, TextIO
+from itertools import islice
+from typing import Iterable, List, Optional
 
 import argparse
-import io
-import readline  # noqa: F401  this allows long lines on stdin
-import subprocess
 import sys
 import zlib
 
-from chia_base.atoms import bytes32
-from chia_base.bls12_381 import BLSSecretExponent, BLSSignature
-from chia_base.util.bech32 import bech32_encode
-
-
-import segno
-
-from hsms.consensus.conditions import conditions_by_opcode
-from hsms.core.unsigned_spend import UnsignedSpend
-from hsms.process.sign import conditions_for_coin_spend, sign
-from hsms.puzzles import conlang
-from hsms.util.byte_chunks import ChunkAssembler
+from chia_base.bls12_381 import BLSSignature
+
+from hsms.core.envelope import envelope_for_item, is_envelope, item_for_envelope
+from hsms.core.spend_diff import UnsignedSpendDiff, unsigned_spend_for_diff
+from hsms.core.unsigned_spend import SignatureInfo, UnsignedSpend
+from hsms.process.key_files import load_key_files
+from hsms.process.keystore import Keystore, parse_path_range
+from hsms.process.sign import sign
+from hsms.process.spend_cache import ReviewedSpendCache
+from hsms.process.summary import coin_details, summary_for_unsigned_spend
+from hsms.util import trace
+from hsms.util.byte_chunks import (
+    ChunkAssembler,
+    create_chunks_for_blob,
+    optimal_chunk_size_for_max_chunk_size,
+)
+from hsms.util.qr import add_qr_arguments, qr_settings_for_args, show_qr_sequence
 from hsms.util.qrint_encoding import a2b_qrint, b2a_qrint
 
-
-XCH_PER_MOJO = Decimal("1e12")
+DEFAULT_PAGE_SIZE = 20
 
 
 def unsigned_spend_from_blob(blob: bytes) -> UnsignedSpend:
-    try:
-        uncompressed_blob = zlib.decompress(blob)
-        return UnsignedSpend.from_bytes(uncompressed_blob)
-    except Exception:
-        return UnsignedSpend.from_bytes(blob)
+    """
+    Accepts an envelope, or, from older tools, a serialized `UnsignedSpend`
+    (which is a pair, so starts with 0xff) either bare or zlib-compressed.
+    """
+    if is_envelope(blob):
+        return item_for_envelope(blob, UnsignedSpend)
+    if blob[:1] != b"\xff":
+        blob = zlib.decompress(blob)
+    return UnsignedSpend.from_bytes(blob, zero_copy=True)
+
+
+def unsigned_spend_for_request(
+    blob: bytes, reviewed: Optional[ReviewedSpendCache] = None
+) -> UnsignedSpend:
+    """
+    Like `unsigned_spend_from_blob`, but also accepts an envelope holding an
+    `UnsignedSpendDiff`, filled in from the spends in `reviewed`.
+    """
+    if is_envelope(blob):
+        item = item_for_envelope(blob)
+        if isinstance(item, UnsignedSpendDiff):
+            lookup = reviewed.get if reviewed is not None else lambda _: None
+            return unsigned_spend_for_diff(item, lookup)
+        if not isinstance(item, UnsignedSpend):
+            raise ValueError(f"expected a signing request, got {type(item).__name__}")
+        return item
+    return unsigned_spend_from_blob(blob)
 
 
 def create_unsigned_spend_pipeline(
-    nochunks: bool, f=sys.stdout
+    nochunks: bool, f=sys.stdout, reviewed: Optional[ReviewedSpendCache] = None
 ) -> Iterable[UnsignedSpend]:
     print("waiting for qrint-encoded signing requests", file=f)
     partial_encodings = {}
@@ -48,7 +71,7 @@ def create_unsigned_spend_pipeline(
             blob = a2b_qrint(line)
 
             if nochunks:
-                yield unsigned_spend_from_blob(blob)
+                yield unsigned_spend_for_request(blob, reviewed)
                 break
 
             part_count = blob[-1]
@@ -59,61 +82,30 @@ def create_unsigned_spend_pipeline(
             if ca.is_assembled():
                 del partial_encodings[part_count]
                 blob = ca.assemble()
-                yield unsigned_spend_from_blob(blob)
+                yield unsigned_spend_for_request(blob, reviewed)
         except EOFError:
             break
         except Exception as ex:
             print(ex, file=f)
 
 
-def replace_with_gpg_pipe(args, f: BinaryIO) -> TextIO:
-    gpg_args = ["gpg", "-d"]
-    if args.gpg_argument:
-        gpg_args.extend(args.gpg_argument.split())
-    gpg_args.append(f.name)
-    popen = subprocess.Popen(gpg_args, stdout=subprocess.PIPE)
-    if popen is None or popen.stdout is None:
-        raise ValueError("couldn't launch gpg")
-    return io.TextIOWrapper(popen.stdout)
-
-
-def parse_private_key_file(args) -> List[BLSSecretExponent]:
-    secret_exponents = []
-    for f in args.private_key_file:
-        if f.name.endswith(".gpg"):
-            f = replace_with_gpg_pipe(args, f)
-        for line in f.readlines():
-            try:
-                secret_exponent = BLSSecretExponent.from_bech32m(line.strip())
-                secret_exponents.append(secret_exponent)
-            except ValueError:
-                pass
-    return secret_exponents
+def parse_private_key_file(args) -> Keystore:
+    gpg_args = [args.gpg_program, "-d"] + args.gpg_argument.split()
+    keystore, loads = load_key_files(args.private_key_file, gpg_args)
+    for load in loads:
+        if load.added == 0:
+            print(f"warning: no new secret exponents in {load.path}", file=sys.stderr)
+        if args.trace:
+            ms = load.seconds * 1e3
+            print(f"read {load.path} in {ms:.1f} ms", file=sys.stderr)
+    for path_prefix, indices in args.derive:
+        keystore.derive(path_prefix, indices)
+    return keystore
 
 
 def summarize_unsigned_spend(unsigned_spend: UnsignedSpend, f=sys.stdout):
     print(file=f)
-    for coin_spend in unsigned_spend.coin_spends:
-        xch_amount = Decimal(coin_spend.coin.amount) / XCH_PER_MOJO
-        address = address_for_puzzle_hash(coin_spend.coin.puzzle_hash)
-        print(f"COIN SPENT: {xch_amount:0.12f} xch at address {address}", file=f)
-        conditions = conditions_for_coin_spend(coin_spend)
-
-    print(file=f)
-    for coin_spend in unsigned_spend.coin_spends:
-        conditions = conditions_for_coin_spend(coin_spend)
-        conditions_lookup = conditions_by_opcode(conditions)
-        for create_coin in conditions_lookup.get(conlang.CREATE_COIN, []):
-            puzzle_hash = create_coin.at("rf").atom
-            address = address_for_puzzle_hash(puzzle_hash)
-            amount = int(create_coin.at("rrf"))
-            xch_amount = Decimal(amount) / XCH_PER_MOJO
-            print(f"COIN CREATED: {xch_amount:0.12f} xch to {address}", file=f)
-    print(file=f)
-
-
-def address_for_puzzle_hash(puzzle_hash: bytes32) -> str:
-    return bech32_encode("xch", puzzle_hash)
+    print("\n".join(summary_for_unsigned_spend(unsigned_spend).lines()), file=f)
 
 
 def check_ok():
@@ -121,30 +113,98 @@ def check_ok():
     return text.lower() == "ok"
 
 
-def hsms(args, parser):
-    wallet = parse_private_key_file(args)
-    f = sys.stderr
-    unsigned_spend_pipeline = create_unsigned_spend_pipeline(args.nochunks, f)
-    for unsigned_spend in unsigned_spend_pipeline:
-        if not args.yes:
-            summarize_unsigned_spend(unsigned_spend, f)
-            if not check_ok():
-                continue
-        signature_info = sign(unsigned_spend, wallet)
-        if signature_info:
-            signature = sum(
-                [_.signature for _ in signature_info], start=BLSSignature.zero()
+def review_unsigned_spend(unsigned_spend: UnsignedSpend, page_size: int, f) -> bool:
+    """
+    A spend of at most `page_size` coins is shown in full. Anything bigger
+    is shown as an overview, and the operator can page through the coins
+    `page_size` at a time before deciding.
+    """
+    if len(unsigned_spend.coin_spends) <= page_size:
+        summarize_unsigned_spend(unsigned_spend, f)
+        return check_ok()
+    summary = summary_for_unsigned_spend(unsigned_spend)
+    print(file=f)
+    print("\n".join(summary.overview_lines()), file=f)
+    details = coin_details(unsigned_spend)
+    while True:
+        text = input(
+            'if this looks reasonable, enter "ok" to generate signature, '
+            'or "d" for coin details> '
+        )
+        if text.lower() != "d":
+            return text.lower() == "ok"
+        page = [line for _ in islice(details, page_size) for line in _]
+        print("\n".join(page or ["no more coins"]), file=f)
+
+
+def process_unsigned_spend(args, unsigned_spend, wallet, f, reviewed=None) -> None:
+    if not args.yes:
+        if not review_unsigned_spend(unsigned_spend, args.page_size, f):
+            return
+    signature_info = sign(unsigned_spend, wallet)
+    if reviewed is not None:
+        # later requests may refer to these by hash
+        reviewed.add(unsigned_spend.coin_spends)
+    if signature_info:
+        encoded_sigs = encoded_signatures(args, signature_info)
+        if args.qr or args.apng:
+            show_qr_sequence(
+                encoded_sigs,
+                sys.stdout,
+                args.fps,
+                args.apng,
+                settings=qr_settings_for_args(args),
             )
-            encoded_sig = b2a_qrint(bytes(signature))
-            if args.qr:
-                qr = segno.make_qr(encoded_sig)
-                print()
-                qr.terminal(compact=True)
-                print()
-            else:
+        else:
+            for encoded_sig in encoded_sigs:
                 print(encoded_sig)
 
 
+def encoded_signatures(args, signature_info: List[SignatureInfo]) -> List[str]:
+    """
+    By default, one aggregate signature, which makes the smallest QR code.
+    With `--signature-infos`, an envelope holding each `SignatureInfo`, so
+    the coordinator can check them one by one, split into chunks if
+    `--max-chunk-size` is given.
+    """
+    if not args.signature_infos:
+        signature = sum(
+            [_.signature for _ in signature_info], start=BLSSignature.zero()
+        )
+        return [b2a_qrint(bytes(signature))]
+    blob = envelope_for_item(signature_info)
+    if args.max_chunk_size:
+        chunk_size = optimal_chunk_size_for_max_chunk_size(
+            len(blob), args.max_chunk_size
+        )
+        return [b2a_qrint(_) for _ in create_chunks_for_blob(blob, chunk_size)]
+    return [b2a_qrint(blob)]
+
+
+def hsms(args, parser):
+    import readline  # noqa: F401  this allows long lines on stdin
+
+    if args.trace:
+        trace.enable(args.trace)
+    try:
+        wallet = parse_private_key_file(args)
+    except (OSError, ValueError) as ex:
+        parser.error(str(ex))
+    f = sys.stderr
+    reviewed = ReviewedSpendCache()
+    unsigned_spend_pipeline = create_unsigned_spend_pipeline(args.nochunks, f, reviewed)
+    for index, unsigned_spend in enumerate(unsigned_spend_pipeline):
+        process_unsigned_spend(args, unsigned_spend, wallet, f, reviewed)
+        trace.report(f"request {index}")
+
+
+def parse_page_size(s: str) -> int:
+    page_size = int(s)
+    if page_size < 1:
+        raise ValueError("page size must be at least 1")
+    return page_size
+
+
 def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Manage private keys and process signing requests"
@@ -155,32 +215,85 @@ def create_parser() -> argparse.ArgumentParser:
         help="skip confirmations",
         action="store_true",
     )
+    parser.add_argument(
+        "--page-size",
+        metavar="coin-count",
+        type=parse_page_size,
+        default=DEFAULT_PAGE_SIZE,
+        help=(
+            "show spends of more coins than this as an overview, with coin "
+            f"details this many at a time on request (default: {DEFAULT_PAGE_SIZE})"
+        ),
+    )
     parser.add_argument(
         "--qr",
-        help="show signature as QR code",
+        help=(
+            "show signature as QR code; if it's in several chunks, cycle "
+            "through them until interrupted"
+        ),
         action="store_true",
     )
+    parser.add_argument(
+        "--signature-infos",
+        help=(
+            "output each signature with its public keys and message, rather "
+            "than one aggregate signature"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max-chunk-size",
+        metavar="maximum-bytes-per-chunk",
+        type=int,
+        help="with --signature-infos, split output into chunks of at most this size",
+    )
     parser.add_argument(
         "--nochunks",
         help="read the spend in its entirety rather than as chunks (testing only)",
         action="store_true",
     )
     parser.add_argument(
-        "-g", "--gpg-argument", help="argument to pass to gpg (besides -d).", default=""
+        "--trace",
+        metavar="path-or-dash",
+        help=(
+            "report a timing breakdown for each request to stderr (`-`) or as "
+            "JSON lines appended to a file. The `HSMS_TRACE` environment "
+            "variable does the same."
+        ),
+    )
+    parser.add_argument(
+        "-d",
+        "--derive",
+        metavar="path-range",
+        action="append",
+        default=[],
+        type=parse_path_range,
+        help=(
+            "derive child keys ahead of time for a range of paths, like "
+            "`12381/8444/2:0-1000`; may be repeated"
+        ),
+    )
+    parser.add_argument(
+        "-g",
+        "--gpg-argument",
+        help="argument to pass to gpg (besides gpg's own -d).",
+        default="",
+    )
+    parser.add_argument(
+        "--gpg-program", help="gpg executable to run (default: gpg)", default="gpg"
     )
     parser.add_argument(
         # "-f",
         "private_key_file",
         metavar="path-to-private-keys",
-        action="append",
-        default=[],
+        nargs="+",
         help=(
-            "file containing bech32m-encoded secret exponents. "
+            "file containing bech32m-encoded secret exponents, one per line. "
             """If file name ends with .gpg, "gpg -d" will be invoked """
-            "automatically. File is read one line at a time."
+            "automatically. Several files are decrypted at once."
         ),
-        type=argparse.FileType("r"),
     )
+    add_qr_arguments(parser)
     return parser
 
 
@@ -5,8 +5,6 @@ import os
 import secrets
 import time
 
-import segno
-
 from chia_base.bls12_381 import BLSSecretExponent
 
 import hsms.cmds.hsms
@@ -56,6 +54,8 @@ def generate_secret(wallet_path):
     public_key = secret_exponent.public_key().as_bech32m()
     print(f"your public key is {public_key}")
     print("Take a photo of it and share with your coordinator:")
+    import segno
+
     qr = segno.make_qr(public_key)
     print()
     qr.terminal(compact=True)
@@ -99,6 +99,8 @@ def create_parser():
 
 
 def main():
+    import readline  # noqa: F401  this allows long lines on stdin
+
     parser = create_parser()
     args = parser.parse_args()
     wallet_path = Path(args.path_to_secret_exponent_file)
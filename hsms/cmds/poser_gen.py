@@ -9,6 +9,7 @@ from chia_base.core import Coin, CoinSpend
 from hsms.core.unsigned_spend import UnsignedSpend
 from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
     puzzle_for_synthetic_public_key,
+    puzzle_hash_for_synthetic_public_key,
     solution_for_conditions,
 )
 from hsms.util.byte_chunks import chunks_for_zlib_blob
@@ -66,7 +67,7 @@ def main():
 
     public_key = BLSPublicKey.from_bech32m(args.bech32m_public_key)
     puzzle = puzzle_for_synthetic_public_key(public_key)
-    puzzle_hash = puzzle.tree_hash()
+    puzzle_hash = puzzle_hash_for_synthetic_public_key(public_key)
 
     coin = Coin(args.parent_coin_id, puzzle_hash, 1)
     coin_spend = CoinSpend(coin, puzzle, solution_for_conditions(args.message))
@@ -48,9 +48,7 @@ def qrint(args, parser):
     with open(args.path, "rb") as f:
         blob = f.read()
 
-    is_qrint = (
-        all(c in b"0123456789" for c in blob.strip()) and not args.encode_to_qrint
-    )
+    is_qrint = blob.strip().isdigit() and not args.encode_to_qrint
 
     if is_qrint:
         return decode(args.path, args.hex_output)
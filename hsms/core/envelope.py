@@ -0,0 +1,127 @@
+"""
+A self-describing wrapper for blobs passed across the air gap.
+
+An envelope is `MAGIC` followed by a serialized `Envelope`, which carries a
+format version, a tag for the payload type, a tag for the compression
+algorithm and the uncompressed length of the payload. A reader can decode
+one in a single pass, without guessing at formats.
+
+Tags are part of the wire format. Never renumber them; add new ones at the
+end.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from chia_base.bls12_381 import BLSSignature
+
+from hsms.clvm_serde import (
+    Frugal,
+    from_program_for_type,
+    program_from_view,
+    to_program_for_type,
+)
+from hsms.util.compression import (
+    COMPRESSION_FOR_TAG,
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB_DICT,
+)
+from hsms.util.lazy import lazy_getattr
+
+from .spend_diff import UnsignedSpendDiff
+from .unsigned_spend import SignatureInfo, UnsignedSpend
+
+MAGIC = b"hsm"
+
+VERSION = 1
+
+
+PAYLOAD_UNSIGNED_SPEND = 0
+PAYLOAD_SIGNATURE = 1
+PAYLOAD_SIGNATURE_INFOS = 2
+PAYLOAD_UNSIGNED_SPEND_DIFF = 3
+
+PAYLOAD_TYPES: Dict[int, Any] = {
+    PAYLOAD_UNSIGNED_SPEND: UnsignedSpend,
+    PAYLOAD_SIGNATURE: BLSSignature,
+    PAYLOAD_SIGNATURE_INFOS: List[SignatureInfo],
+    PAYLOAD_UNSIGNED_SPEND_DIFF: UnsignedSpendDiff,
+}
+
+PAYLOAD_TAGS: Dict[Any, int] = {v: k for k, v in PAYLOAD_TYPES.items()}
+
+
+@dataclass
+class Envelope(Frugal):
+    version: int
+    payload_type: int
+    compression: int
+    length: int
+    payload: bytes
+
+
+# the serializers are built (and cached) on first use rather than at import
+__getattr__ = lazy_getattr(
+    __name__,
+    dict(
+        ENVELOPE_TO_PROGRAM=lambda: to_program_for_type(Envelope),
+        ENVELOPE_FROM_PROGRAM=lambda: from_program_for_type(Envelope),
+    ),
+)
+
+
+def is_envelope(blob: bytes) -> bool:
+    return blob[: len(MAGIC)] == MAGIC
+
+
+def payload_tag_for_item(item: Any) -> int:
+    t = type(item)
+    if t is list and item:
+        # payload types for lists are keyed by item type, like `List[SignatureInfo]`
+        t = List[type(item[0])]  # type: ignore
+    tag = PAYLOAD_TAGS.get(t)
+    if tag is None:
+        for t, tag in PAYLOAD_TAGS.items():
+            if isinstance(t, type) and isinstance(item, t):
+                return tag
+        raise ValueError(f"no envelope payload type for {type(item)}")
+    return tag
+
+
+def envelope_for_item(item: Any, compression: int = COMPRESSION_ZLIB_DICT) -> bytes:
+    """
+    Wrap `item` in an envelope, compressed with the backend tagged
+    `compression` (see `hsms.util.compression`). If compression doesn't make
+    the payload smaller, it's stored uncompressed.
+    """
+    payload_type = payload_tag_for_item(item)
+    blob = bytes(to_program_for_type(PAYLOAD_TYPES[payload_type])(item))
+    payload = COMPRESSION_FOR_TAG[compression].compress(blob)
+    if len(payload) >= len(blob):
+        compression, payload = COMPRESSION_NONE, blob
+    envelope = Envelope(VERSION, payload_type, compression, len(blob), payload)
+    return MAGIC + bytes(to_program_for_type(Envelope)(envelope))
+
+
+def item_for_envelope(blob: bytes, expected_type: Optional[Any] = None) -> Any:
+    """
+    Unwrap the item in an envelope, checking it's an `expected_type` if given.
+    """
+    if not is_envelope(blob):
+        raise ValueError("not an envelope")
+    from_program = from_program_for_type(Envelope)
+    envelope = from_program(program_from_view(blob[len(MAGIC) :]))
+    if not 1 <= envelope.version <= VERSION:
+        raise ValueError(f"unsupported envelope version {envelope.version}")
+    t = PAYLOAD_TYPES.get(envelope.payload_type)
+    if t is None:
+        raise ValueError(f"unknown payload type {envelope.payload_type}")
+    if expected_type is not None and t != expected_type:
+        raise ValueError(f"expected {expected_type.__name__}, got {t.__name__}")
+    compression = COMPRESSION_FOR_TAG.get(envelope.compression)
+    if compression is None:
+        raise ValueError(f"compression {envelope.compression} not available")
+    payload = compression.decompress(envelope.payload, envelope.length)
+    if len(payload) != envelope.length:
+        raise ValueError("payload length doesn't match envelope")
+    return from_program_for_type(t)(program_from_view(payload))
@@ -0,0 +1,113 @@
+"""
+Signing requests that refer to coin spends the HSM has already reviewed.
+
+Re-signing a large spend (after a fee bump, say) usually changes only a
+few coin spends. Rather than send every puzzle reveal and solution across
+the air gap again, the coordinator sends an `UnsignedSpendDiff`: each coin
+spend the HSM has seen before is replaced by its `coin_spend_hash`. The HSM
+fills those in from its cache of spends it has signed, whose conditions it
+has already computed, so it only runs the puzzles that changed.
+
+A hash only stands in for a coin spend the HSM has itself reviewed; an
+unknown hash is an error, never something to sign blindly.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Union
+
+import hashlib
+
+from chia_base.atoms import bytes32
+from chia_base.core import CoinSpend
+
+from hsms.clvm_serde import (
+    from_program_for_type,
+    program_from_view,
+    to_program_for_type,
+)
+
+from .signing_hints import PathHint, SumHint
+from .unsigned_spend import CSTuple, UnsignedSpend, from_storage, to_storage
+
+# a `coin_spend_hash`, or a coin spend as `UnsignedSpend` stores it
+CoinSpendOrHash = Union[bytes, CSTuple]
+
+
+def coin_spend_hash(coin_spend: CoinSpend) -> bytes32:
+    """
+    The coin id commits to the puzzle (through its puzzle hash), so this
+    and the solution determine the conditions.
+    """
+    blob = coin_spend.coin.name() + coin_spend.solution.tree_hash()
+    return bytes32(hashlib.sha256(blob).digest())
+
+
+@dataclass
+class UnsignedSpendDiff:
+    coin_spends: List[CoinSpendOrHash] = field(metadata=dict(key="c"))
+    sum_hints: List[SumHint] = field(
+        default_factory=list,
+        metadata=dict(key="s"),
+    )
+    path_hints: List[PathHint] = field(
+        default_factory=list,
+        metadata=dict(key="p"),
+    )
+    agg_sig_me_network_suffix: bytes = field(
+        default=b"",
+        metadata=dict(key="a"),
+    )
+
+    def __bytes__(self):
+        return bytes(to_program_for_type(UnsignedSpendDiff)(self))
+
+    @classmethod
+    def from_bytes(cls, blob: bytes):
+        return from_program_for_type(UnsignedSpendDiff)(program_from_view(blob))
+
+
+def diff_for_unsigned_spend(
+    unsigned_spend: UnsignedSpend, known_hashes: Iterable[bytes]
+) -> UnsignedSpendDiff:
+    """
+    Replace each coin spend whose hash is in `known_hashes` (typically
+    those of the last request the HSM signed) with its hash.
+    """
+    known = set(known_hashes)
+    coin_spends: List[CoinSpendOrHash] = []
+    for coin_spend in unsigned_spend.coin_spends:
+        spend_hash = coin_spend_hash(coin_spend)
+        if spend_hash in known:
+            coin_spends.append(bytes(spend_hash))
+        else:
+            coin_spends.extend(from_storage([coin_spend]))
+    return UnsignedSpendDiff(
+        coin_spends,
+        unsigned_spend.sum_hints,
+        unsigned_spend.path_hints,
+        unsigned_spend.agg_sig_me_network_suffix,
+    )
+
+
+def unsigned_spend_for_diff(
+    diff: UnsignedSpendDiff, lookup: Callable[[bytes], Optional[CoinSpend]]
+) -> UnsignedSpend:
+    """
+    Fill in hashed coin spends with `lookup`. Raises `ValueError` for a hash
+    it doesn't know.
+    """
+    coin_spends = []
+    for item in diff.coin_spends:
+        if isinstance(item, tuple):
+            coin_spends.extend(to_storage([item]))
+            continue
+        coin_spend = lookup(bytes(item))
+        if coin_spend is None:
+            raise ValueError(
+                f"coin spend {bytes(item).hex()} hasn't been reviewed here; "
+                "send the full spend"
+            )
+        coin_spends.append(coin_spend)
+    return UnsignedSpend(
+        coin_spends, diff.sum_hints, diff.path_hints, diff.agg_sig_me_network_suffix
+    )
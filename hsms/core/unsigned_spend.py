@@ -7,9 +7,13 @@ from chia_base.core import Coin, CoinSpend
 from clvm_rs import Program  # type: ignore
 
 from hsms.clvm_serde import (
+    Frugal,
+    program_from_view,
     to_program_for_type,
     from_program_for_type,
 )
+from hsms.util.lazy import lazy_getattr
+from hsms.util.trace import traced
 from .signing_hints import PathHint, SumHint
 
 
@@ -45,7 +49,7 @@ def from_storage(
 
 
 @dataclass
-class SignatureInfo:
+class SignatureInfo(Frugal):
     signature: BLSSignature
     partial_public_key: BLSPublicKey
     final_public_key: BLSPublicKey
@@ -78,12 +82,26 @@ class UnsignedSpend:
     )
 
     def __bytes__(self):
-        return bytes(TO_PROGRAM(self))
+        return bytes(to_program_for_type(UnsignedSpend)(self))
 
     @classmethod
-    def from_bytes(cls, blob: bytes):
-        return FROM_PROGRAM(Program.from_bytes(blob))
-
-
-TO_PROGRAM = to_program_for_type(UnsignedSpend)
-FROM_PROGRAM = from_program_for_type(UnsignedSpend)
+    @traced("UnsignedSpend.from_bytes")
+    def from_bytes(cls, blob: bytes, zero_copy: bool = False):
+        """
+        With `zero_copy`, atoms in puzzle reveals and solutions are views into
+        `blob` rather than copies of it.
+        """
+        from_program = from_program_for_type(UnsignedSpend)
+        if zero_copy:
+            return from_program(program_from_view(blob))
+        return from_program(Program.from_bytes(blob))
+
+
+# the serializers are built (and cached) on first use rather than at import
+__getattr__ = lazy_getattr(
+    __name__,
+    dict(
+        TO_PROGRAM=lambda: to_program_for_type(UnsignedSpend),
+        FROM_PROGRAM=lambda: from_program_for_type(UnsignedSpend),
+    ),
+)
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import time
+
+from chia_base.bls12_381 import BLSPublicKey
+from chia_base.core import SpendBundle
+
+from hsms.consensus.conditions import conditions_by_opcode
+from hsms.debug.debug_spend_bundle import AGG_SIG_ME_ADDITIONAL_DATA, MAX_COST
+from hsms.process.sign import verify_pairs_for_conditions
+from hsms.puzzles import conlang
+
+
+@dataclass
+class SpendBundleAudit:
+    name: str
+    cost: int = 0
+    coins_spent: int = 0
+    coins_created: int = 0
+    validates: bool = False
+    run_time: float = 0.0
+    error: Optional[str] = None
+
+
+def audit_spend_bundle(
+    spend_bundle: SpendBundle,
+    name: str = "",
+    agg_sig_additional_data: bytes = AGG_SIG_ME_ADDITIONAL_DATA,
+) -> SpendBundleAudit:
+    """
+    Run every puzzle in a `SpendBundle` and check the aggregated signature,
+    like `debug_spend_bundle`, but quietly, returning a `SpendBundleAudit`.
+    """
+    start_time = time.perf_counter()
+    audit = SpendBundleAudit(name)
+    pairs: List[Tuple[BLSPublicKey, bytes]] = []
+    try:
+        for coin_spend in spend_bundle.coin_spends:
+            coin = coin_spend.coin
+            if coin_spend.puzzle_reveal.tree_hash() != coin.puzzle_hash:
+                raise ValueError(f"bad puzzle reveal for coin {coin.name().hex()}")
+            cost, conditions = coin_spend.puzzle_reveal.run_with_cost(
+                coin_spend.solution, max_cost=MAX_COST
+            )
+            audit.cost += cost
+            audit.coins_spent += 1
+            d = conditions_by_opcode(conditions)
+            audit.coins_created += len(d.get(conlang.CREATE_COIN, []))
+            pairs.extend(
+                verify_pairs_for_conditions(
+                    conditions, coin.name() + agg_sig_additional_data
+                )
+            )
+        audit.validates = spend_bundle.aggregated_signature.verify(pairs)
+        if not audit.validates:
+            audit.error = "aggregated signature check failed"
+    except Exception as ex:
+        audit.validates = False
+        audit.error = str(ex) or ex.__class__.__name__
+    audit.run_time = time.perf_counter() - start_time
+    return audit
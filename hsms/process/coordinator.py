@@ -0,0 +1,257 @@
+"""
+Collect partial signatures for many pending `UnsignedSpend` objects at once,
+producing each `SpendBundle` as soon as every signer has contributed.
+
+A pending spend is identified by the sha256 of its serialized form. Each
+signer is a root public key (see `signature_metadata_by_signer`), and a
+partial signature is what one `hsms` instance returns: the sum of its
+signatures for that spend. Partials are checked as they arrive, so a bad
+one is rejected, naming the signer, without spoiling the rest. Signatures
+can also arrive as `SignatureInfo` lists (from `hsms --signature-infos`),
+which are checked one message at a time and kept until each signer's set is
+complete.
+
+Working out what each signer must sign and verification both run in an
+executor, so the event loop stays free to accept more requests, and a
+pending spend costs only its memory.
+"""
+
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import asyncio
+import hashlib
+import itertools
+
+from chia_base.atoms import bytes32
+from chia_base.bls12_381 import BLSPublicKey, BLSSignature
+from chia_base.core import SpendBundle
+
+from hsms.core.unsigned_spend import SignatureInfo, UnsignedSpend
+from hsms.process.sign import (
+    SignatureMetadata,
+    generate_synthetic_offset_signatures,
+    signature_metadata_by_signer,
+    verify_partial_signature,
+)
+
+# trying every set of this many missing signers takes 255 verifications
+MAX_SIGNER_SEARCH = 8
+
+# partial public key, final public key, message
+MetadataKey = Tuple[bytes, bytes, bytes]
+
+
+def spend_id_for_unsigned_spend(unsigned_spend: UnsignedSpend) -> bytes32:
+    return bytes32(hashlib.sha256(bytes(unsigned_spend)).digest())
+
+
+def metadata_key(m: SignatureMetadata) -> MetadataKey:
+    return (bytes(m.partial_public_key), bytes(m.final_public_key), bytes(m.message))
+
+
+@dataclass
+class PendingSpend:
+    spend_id: bytes32
+    unsigned_spend: UnsignedSpend
+    expected: Dict[BLSPublicKey, List[SignatureMetadata]]
+    partials: Dict[BLSPublicKey, BLSSignature] = field(default_factory=dict)
+    # verified signatures from `SignatureInfo` objects, which may arrive
+    # a few at a time
+    signatures_by_metadata: Dict[MetadataKey, BLSSignature] = field(
+        default_factory=dict
+    )
+    spend_bundle: "asyncio.Future[SpendBundle]" = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+    def missing_signers(self) -> List[BLSPublicKey]:
+        return [_ for _ in self.expected if _ not in self.partials]
+
+    def metadata(self, signers: Sequence[BLSPublicKey]) -> List[SignatureMetadata]:
+        return [m for _ in signers for m in self.expected[_]]
+
+
+def signer_sets(
+    signers: List[BLSPublicKey],
+) -> Iterator[List[Tuple[BLSPublicKey, ...]]]:
+    """
+    Yield the nonempty subsets of `signers`, grouped by size, smallest first.
+    Past `MAX_SIGNER_SEARCH` signers, only single signers and all of them.
+    """
+    if len(signers) > MAX_SIGNER_SEARCH:
+        sizes: Iterable[int] = sorted({1, len(signers)})
+    else:
+        sizes = range(1, len(signers) + 1)
+    for size in sizes:
+        yield list(itertools.combinations(signers, size))
+
+
+def spend_bundle_for_pending_spend(pending_spend: PendingSpend) -> SpendBundle:
+    unsigned_spend = pending_spend.unsigned_spend
+    signatures = list(pending_spend.partials.values()) + [
+        _.signature for _ in generate_synthetic_offset_signatures(unsigned_spend)
+    ]
+    total_signature = sum(signatures, start=BLSSignature.zero())
+    return SpendBundle(unsigned_spend.coin_spends, total_signature)
+
+
+class Coordinator:
+    def __init__(
+        self,
+        on_spend_bundle: Optional[Callable[[bytes32, SpendBundle], None]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.pending: Dict[bytes32, PendingSpend] = {}
+        self.on_spend_bundle = on_spend_bundle
+        self.executor = executor
+
+    async def add_unsigned_spend(self, unsigned_spend: UnsignedSpend) -> PendingSpend:
+        """
+        Start collecting partials for `unsigned_spend`. Adding a spend that's
+        already pending returns the existing entry.
+        """
+        spend_id = spend_id_for_unsigned_spend(unsigned_spend)
+        pending_spend = self.pending.get(spend_id)
+        if pending_spend is None:
+            # this runs every puzzle, so keep it off the event loop
+            loop = asyncio.get_running_loop()
+            expected = await loop.run_in_executor(
+                self.executor, signature_metadata_by_signer, unsigned_spend
+            )
+            pending_spend = self.pending.get(spend_id)
+            if pending_spend is not None:
+                # added by someone else while we were working it out
+                return pending_spend
+            pending_spend = PendingSpend(spend_id, unsigned_spend, expected)
+            self.pending[spend_id] = pending_spend
+            if not expected:
+                self.complete(pending_spend)
+        return pending_spend
+
+    def pending_spend(self, spend_id: bytes32) -> PendingSpend:
+        pending_spend = self.pending.get(spend_id)
+        if pending_spend is None:
+            raise ValueError(f"no pending spend {spend_id.hex()}")
+        return pending_spend
+
+    async def verify(
+        self, signature: BLSSignature, signature_metadata: List[SignatureMetadata]
+    ) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, verify_partial_signature, signature, signature_metadata
+        )
+
+    async def add_partial_signature(
+        self,
+        spend_id: bytes32,
+        signature: BLSSignature,
+        signers: Optional[Sequence[BLSPublicKey]] = None,
+    ) -> List[BLSPublicKey]:
+        """
+        Check `signature` and record it, returning the signers it covers.
+
+        `signers` are those whose keys the sending `hsms` holds. Without
+        them, the signature is tried against every set of missing signers,
+        smallest first (only single signers and all of them together once
+        more than `MAX_SIGNER_SEARCH` are missing). Raises `ValueError` if
+        it doesn't verify.
+        """
+        pending_spend = self.pending_spend(spend_id)
+        if signers is not None:
+            signers = list(signers)
+            for _ in signers:
+                if _ not in pending_spend.expected:
+                    raise ValueError(f"{_.as_bech32m()} isn't a signer")
+            if all(_ in pending_spend.partials for _ in signers):
+                return signers
+            candidate_sets = [[signers]]
+        else:
+            candidate_sets = signer_sets(pending_spend.missing_signers())
+
+        matched: List[BLSPublicKey] = []
+        for candidates in candidate_sets:
+            oks = await asyncio.gather(
+                *[self.verify(signature, pending_spend.metadata(_)) for _ in candidates]
+            )
+            matched = next((list(_) for _, ok in zip(candidates, oks) if ok), [])
+            if matched:
+                break
+        if not matched:
+            if signers is not None:
+                names = ", ".join(_.as_bech32m() for _ in signers)
+                raise ValueError(f"bad signature from {names}")
+            raise ValueError(
+                f"signature doesn't match any missing signers of {spend_id.hex()}"
+            )
+
+        if pending_spend.spend_bundle.done() or any(
+            _ in pending_spend.partials for _ in matched
+        ):
+            # another partial for these signers arrived while we were verifying
+            return matched
+        # if one signature covers several signers, count it only once
+        for index, _ in enumerate(matched):
+            pending_spend.partials[_] = signature if index == 0 else BLSSignature.zero()
+        if not pending_spend.missing_signers():
+            self.complete(pending_spend)
+        return matched
+
+    async def add_signature_infos(
+        self, spend_id: bytes32, signature_infos: List[SignatureInfo]
+    ) -> List[BLSPublicKey]:
+        """
+        Check each `SignatureInfo` on its own, then record a partial for each
+        signer whose signatures have all arrived, returning those signers.
+        Raises `ValueError` naming the partial public key of any signature
+        that's unexpected or doesn't verify, and records none of them.
+        """
+        pending_spend = self.pending_spend(spend_id)
+        expected_keys = {
+            metadata_key(m) for _ in pending_spend.expected.values() for m in _
+        }
+        metadata = [
+            SignatureMetadata(_.partial_public_key, _.final_public_key, _.message)
+            for _ in signature_infos
+        ]
+        for m in metadata:
+            if metadata_key(m) not in expected_keys:
+                raise ValueError(
+                    f"unexpected signature by {m.partial_public_key.as_bech32m()}"
+                )
+        oks = await asyncio.gather(
+            *[self.verify(i.signature, [m]) for i, m in zip(signature_infos, metadata)]
+        )
+        for ok, m in zip(oks, metadata):
+            if not ok:
+                raise ValueError(
+                    f"bad signature by {m.partial_public_key.as_bech32m()}"
+                )
+
+        if pending_spend.spend_bundle.done():
+            return []
+        for i, m in zip(signature_infos, metadata):
+            pending_spend.signatures_by_metadata[metadata_key(m)] = i.signature
+        signers = []
+        for signer in pending_spend.missing_signers():
+            signatures = [
+                pending_spend.signatures_by_metadata.get(metadata_key(_))
+                for _ in pending_spend.expected[signer]
+            ]
+            if all(signatures):
+                pending_spend.partials[signer] = sum(
+                    signatures, start=BLSSignature.zero()
+                )
+                signers.append(signer)
+        if not pending_spend.missing_signers():
+            self.complete(pending_spend)
+        return signers
+
+    def complete(self, pending_spend: PendingSpend) -> None:
+        spend_bundle = spend_bundle_for_pending_spend(pending_spend)
+        del self.pending[pending_spend.spend_id]
+        pending_spend.spend_bundle.set_result(spend_bundle)
+        if self.on_spend_bundle:
+            self.on_spend_bundle(pending_spend.spend_id, spend_bundle)
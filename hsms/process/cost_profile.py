@@ -0,0 +1,110 @@
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Iterable, List, Union
+
+import csv
+import io
+import json
+import time
+
+from chia_base.atoms import bytes32
+from chia_base.core import CoinSpend
+
+from clvm_rs import Program  # type: ignore
+
+from hsms.process.sign import CONDITIONS_FOR_COIN_SPEND, MAX_COST
+
+
+@dataclass
+class CoinSpendProfile:
+    coin_name: bytes32
+    module_hash: bytes32
+    cost: int
+    run_time: float
+    puzzle_size: int
+    solution_size: int
+    condition_count: int
+
+
+@dataclass
+class ModuleProfile:
+    module_hash: bytes32
+    coin_spend_count: int = 0
+    cost: int = 0
+    run_time: float = 0.0
+    puzzle_size: int = 0
+    solution_size: int = 0
+    condition_count: int = 0
+
+
+def module_hash_for_puzzle(puzzle: Program) -> bytes32:
+    """
+    The tree hash of the uncurried module, so all standard puzzles (for
+    instance) land in the same bucket no matter what key is curried in.
+    """
+    mod, _args = puzzle.uncurry()
+    return bytes32(mod.tree_hash())
+
+
+def profile_coin_spend(coin_spend: CoinSpend) -> CoinSpendProfile:
+    """
+    Run the puzzle, timing it. The result is left in the
+    `conditions_for_coin_spend` cache, so signing won't run it again.
+    """
+    puzzle, solution = coin_spend.puzzle_reveal, coin_spend.solution
+    start_time = time.perf_counter()
+    cost, conditions = puzzle.run_with_cost(solution, max_cost=MAX_COST)
+    run_time = time.perf_counter() - start_time
+    CONDITIONS_FOR_COIN_SPEND[coin_spend] = (cost, conditions)
+    return CoinSpendProfile(
+        coin_spend.coin.name(),
+        module_hash_for_puzzle(puzzle),
+        cost,
+        run_time,
+        len(bytes(puzzle)),
+        len(bytes(solution)),
+        conditions.list_len(),
+    )
+
+
+def profile_coin_spends(coin_spends: Iterable[CoinSpend]) -> List[CoinSpendProfile]:
+    return [profile_coin_spend(_) for _ in coin_spends]
+
+
+def aggregate_by_module(profiles: Iterable[CoinSpendProfile]) -> List[ModuleProfile]:
+    """
+    Sum the profiles for each puzzle module. Most expensive module first.
+    """
+    d: Dict[bytes32, ModuleProfile] = {}
+    for p in profiles:
+        mp = d.setdefault(p.module_hash, ModuleProfile(p.module_hash))
+        mp.coin_spend_count += 1
+        mp.cost += p.cost
+        mp.run_time += p.run_time
+        mp.puzzle_size += p.puzzle_size
+        mp.solution_size += p.solution_size
+        mp.condition_count += p.condition_count
+    return sorted(d.values(), key=lambda _: (-_.cost, _.module_hash))
+
+
+Profile = Union[CoinSpendProfile, ModuleProfile]
+
+
+def profile_as_dict(profile: Profile) -> dict:
+    return {
+        k: v.hex() if isinstance(v, bytes) else v for k, v in asdict(profile).items()
+    }
+
+
+def profiles_as_json(profiles: Iterable[Profile]) -> str:
+    return json.dumps([profile_as_dict(_) for _ in profiles], indent=2)
+
+
+def profiles_as_csv(profiles: Iterable[Profile]) -> str:
+    profiles = list(profiles)
+    f = io.StringIO()
+    if profiles:
+        field_names = [_.name for _ in fields(profiles[0])]
+        writer = csv.DictWriter(f, field_names, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(profile_as_dict(_) for _ in profiles)
+    return f.getvalue()
@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+import os
+
+from chia_base.atoms import bytes32
+from chia_base.bls12_381 import BLSPublicKey
+
+from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    DEFAULT_HIDDEN_PUZZLE_HASH,
+    calculate_synthetic_public_key,
+    puzzle_hash_for_synthetic_public_key,
+)
+from hsms.util.address import address_for_puzzle_hash
+from hsms.util.executor import windowed_map
+
+DERIVATION_CACHE_SIZE = 1 << 12
+
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class DerivationRow:
+    index: int
+    public_key: bytes
+    synthetic_public_key: bytes
+    puzzle_hash: bytes32
+    address: str
+
+
+# `BLSPublicKey` can't be pickled, so batches sent to worker processes carry
+# the serialized root public key instead
+DerivationBatch = Tuple[bytes, Tuple[int, ...], int, int, bytes32, str]
+
+
+@lru_cache(maxsize=DERIVATION_CACHE_SIZE)
+def public_key_for_path(root_public_key: bytes, path: Tuple[int, ...]) -> BLSPublicKey:
+    """
+    Memoized, so each worker derives a shared path prefix only once.
+    """
+    if not path:
+        return BLSPublicKey.from_bytes(root_public_key)
+    return public_key_for_path(root_public_key, path[:-1]).child(path[-1])
+
+
+def rows_for_batch(batch: DerivationBatch) -> List[DerivationRow]:
+    root_public_key, path_prefix, start, stop, hidden_puzzle_hash, prefix = batch
+    prefix_public_key = public_key_for_path(root_public_key, path_prefix)
+    rows = []
+    for index in range(start, stop):
+        public_key = prefix_public_key.child(index)
+        synthetic_public_key = calculate_synthetic_public_key(
+            public_key, hidden_puzzle_hash
+        )
+        puzzle_hash = puzzle_hash_for_synthetic_public_key(synthetic_public_key)
+        rows.append(
+            DerivationRow(
+                index,
+                bytes(public_key),
+                bytes(synthetic_public_key),
+                puzzle_hash,
+                address_for_puzzle_hash(puzzle_hash, prefix),
+            )
+        )
+    return rows
+
+
+def derive_rows(
+    root_public_key: BLSPublicKey,
+    path_prefix: List[int],
+    start: int,
+    count: int,
+    hidden_puzzle_hash: bytes32 = DEFAULT_HIDDEN_PUZZLE_HASH,
+    prefix: str = "xch",
+    workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[DerivationRow]:
+    """
+    Yield a `DerivationRow` for each index in `[start, start + count)`, using
+    the public key at `path_prefix + [index]` in a standard puzzle.
+
+    Batches are spread across `workers` processes (default: one per cpu)
+    when there is more than one batch.
+    """
+    stop = start + count
+    batches: Iterator[DerivationBatch] = (
+        (
+            bytes(root_public_key),
+            tuple(path_prefix),
+            batch_start,
+            min(batch_start + batch_size, stop),
+            hidden_puzzle_hash,
+            prefix,
+        )
+        for batch_start in range(start, stop, batch_size)
+    )
+    if workers == 1 or count <= batch_size:
+        for batch in batches:
+            yield from rows_for_batch(batch)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in windowed_map(executor, rows_for_batch, batches, 2 * workers):
+            yield from rows
@@ -0,0 +1,65 @@
+"""
+Read key files into a `Keystore`, decrypting `.gpg` files with `gpg -d`.
+
+Every file is read on its own thread, so all the `gpg` processes run at
+once and startup waits for the slowest decrypt rather than the sum of them.
+Files are added to the keystore in the order given, each as soon as it and
+those before it are read, and every `gpg` process is waited on.
+"""
+
+from dataclasses import dataclass
+from time import perf_counter
+from typing import List, Optional, Sequence, Tuple
+
+from hsms.process.keystore import Keystore
+
+DEFAULT_GPG_ARGS = ("gpg", "-d")
+
+
+@dataclass
+class KeyFileLoad:
+    path: str
+    seconds: float
+    added: int
+
+
+def read_key_file(path: str, gpg_args: Sequence[str]) -> Tuple[List[str], float]:
+    """
+    Return the lines of `path`, decrypted if it ends with `.gpg`, and how
+    long that took.
+    """
+    start = perf_counter()
+    if path.endswith(".gpg"):
+        import subprocess
+
+        r = subprocess.run(list(gpg_args) + [path], stdout=subprocess.PIPE, text=True)
+        if r.returncode != 0:
+            raise ValueError(f"{path}: {gpg_args[0]} exited with status {r.returncode}")
+        text = r.stdout
+    else:
+        with open(path) as f:
+            text = f.read()
+    return text.splitlines(), perf_counter() - start
+
+
+def load_key_files(
+    paths: Sequence[str],
+    gpg_args: Sequence[str] = DEFAULT_GPG_ARGS,
+    keystore: Optional[Keystore] = None,
+) -> Tuple[Keystore, List[KeyFileLoad]]:
+    """
+    Read all of `paths` at once, adding their secrets to `keystore` (a new
+    one by default). Returns the keystore and, for each file, how long it
+    took to read and how many new secrets it held.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if keystore is None:
+        keystore = Keystore()
+    loads = []
+    with ThreadPoolExecutor(max_workers=max(len(paths), 1)) as executor:
+        futures = [executor.submit(read_key_file, _, gpg_args) for _ in paths]
+        for path, future in zip(paths, futures):
+            lines, seconds = future.result()
+            loads.append(KeyFileLoad(path, seconds, keystore.add_lines(lines, path)))
+    return keystore, loads
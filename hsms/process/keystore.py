@@ -0,0 +1,129 @@
+"""
+The secret exponents an `hsms` instance signs with, loaded once.
+
+Each secret's public key is computed as it's added, so finding the secret
+for a public key while signing is a dictionary lookup rather than a scan
+that recomputes every public key. Child keys can be derived ahead of time
+for declared path ranges (like `12381/8444/2:0-1000`); a child found by
+following a path hint is remembered too, so it's derived only once.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from chia_base.bls12_381 import BLSPublicKey, BLSSecretExponent
+
+from hsms.util.trace import count
+
+# path prefix, indices
+PathRange = Tuple[List[int], range]
+
+
+def parse_path_range(s: str) -> PathRange:
+    """
+    Parse a path range like `12381/8444/2:0-1000`, the children of
+    `12381/8444/2` with index 0 up to (but not including) 1000.
+    """
+    prefix, sep, indices = s.rpartition(":")
+    start, dash, stop = indices.partition("-")
+    try:
+        path = [int(_) for _ in prefix.split("/") if _ != ""]
+        r = range(int(start), int(stop))
+    except ValueError:
+        r = range(0)
+    if not (sep and dash and r):
+        raise ValueError(f"bad path range {s!r}: expected like `12381/8444/2:0-1000`")
+    return path, r
+
+
+class Keystore:
+    def __init__(self, secrets: Iterable[BLSSecretExponent] = ()):
+        # root secrets, in the order they were added
+        self.secrets: List[BLSSecretExponent] = []
+        self.by_public_key: Dict[BLSPublicKey, BLSSecretExponent] = {}
+        # children, keyed by their public key
+        self.derived: Dict[BLSPublicKey, BLSSecretExponent] = {}
+        for secret in secrets:
+            self.add(secret)
+
+    def __len__(self) -> int:
+        return len(self.secrets)
+
+    def add(self, secret: BLSSecretExponent) -> bool:
+        """
+        Add a root secret, returning `False` if it's already here.
+        """
+        public_key = secret.public_key()
+        if public_key in self.by_public_key:
+            return False
+        self.secrets.append(secret)
+        self.by_public_key[public_key] = secret
+        return True
+
+    def add_lines(self, lines: Iterable[str], name: str = "<keys>") -> int:
+        """
+        Add one bech32m secret exponent per line, skipping blank lines and
+        `#` comments, and return how many were new. Anything else raises
+        `ValueError` naming the line (but not repeating it, since it may be
+        a mangled secret).
+        """
+        added = 0
+        for line_number, line in enumerate(lines, start=1):
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            try:
+                secret = BLSSecretExponent.from_bech32m(text)
+            except ValueError:
+                raise ValueError(
+                    f"{name}:{line_number}: not a bech32m secret exponent"
+                ) from None
+            added += self.add(secret)
+        return added
+
+    def derive(self, path_prefix: Sequence[int], indices: Iterable[int]) -> int:
+        """
+        Derive the children at `path_prefix + [index]` of every root secret
+        ahead of time, returning how many were derived.
+        """
+        indices = list(indices)
+        for secret in self.secrets:
+            prefix_secret = secret.child_for_path(list(path_prefix))
+            for index in indices:
+                child = prefix_secret.child(index)
+                self.derived[child.public_key()] = child
+        count("derivations", len(self.secrets) * len(indices))
+        return len(self.secrets) * len(indices)
+
+    def secret_for_public_key(
+        self,
+        public_key: BLSPublicKey,
+        root_public_key: Optional[BLSPublicKey] = None,
+        path: Sequence[int] = (),
+    ) -> Optional[BLSSecretExponent]:
+        """
+        Find the secret for `public_key`: a root or pre-derived key, or else
+        the child at `path` of `root_public_key` (from a path hint), which is
+        then remembered.
+        """
+        secret = self.by_public_key.get(public_key)
+        if secret is None:
+            secret = self.derived.get(public_key)
+        if secret is not None:
+            return secret
+        root = self.by_public_key.get(root_public_key) if root_public_key else None
+        if root is None:
+            return None
+        count("derivations")
+        secret = root.child_for_path(list(path))
+        if secret.public_key() != public_key:
+            return None
+        self.derived[public_key] = secret
+        return secret
+
+
+def keystore_for_secrets(
+    secrets: Union[Keystore, Iterable[BLSSecretExponent]],
+) -> Keystore:
+    if isinstance(secrets, Keystore):
+        return secrets
+    return Keystore(secrets)
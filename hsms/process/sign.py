@@ -1,9 +1,11 @@
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from weakref import WeakKeyDictionary
 
+import chia_rs  # type: ignore
+
 from chia_base.atoms import hexbytes
-from chia_base.bls12_381 import BLSPublicKey, BLSSecretExponent
+from chia_base.bls12_381 import BLSPublicKey, BLSSecretExponent, BLSSignature
 from chia_base.core import CoinSpend
 
 from clvm_rs import Program  # type: ignore
@@ -11,10 +13,14 @@ from clvm_rs import Program  # type: ignore
 from hsms.core.signing_hints import SumHint, SumHints, PathHint, PathHints
 from hsms.core.unsigned_spend import SignatureInfo, UnsignedSpend
 from hsms.consensus.conditions import conditions_by_opcode
+from hsms.process.keystore import Keystore, keystore_for_secrets
 from hsms.puzzles.conlang import AGG_SIG_ME, AGG_SIG_UNSAFE
+from hsms.util.trace import count, span, traced
 
 MAX_COST = 1 << 34
 
+Secrets = Union[Keystore, List[BLSSecretExponent]]
+
 
 @dataclass
 class SignatureMetadata:
@@ -26,13 +32,22 @@ class SignatureMetadata:
 CONDITIONS_FOR_COIN_SPEND: WeakKeyDictionary = WeakKeyDictionary()
 
 
-def conditions_for_coin_spend(coin_spend: CoinSpend) -> Program:
-    if coin_spend not in CONDITIONS_FOR_COIN_SPEND:
-        _cost, r = coin_spend.puzzle_reveal.run_with_cost(
-            coin_spend.solution, max_cost=MAX_COST
-        )
+def cost_and_conditions_for_coin_spend(coin_spend: CoinSpend) -> Tuple[int, Program]:
+    r = CONDITIONS_FOR_COIN_SPEND.get(coin_spend)
+    if r is None:
+        count("puzzle_runs")
+        with span("run_puzzle"):
+            r = coin_spend.puzzle_reveal.run_with_cost(
+                coin_spend.solution, max_cost=MAX_COST
+            )
         CONDITIONS_FOR_COIN_SPEND[coin_spend] = r
-    return CONDITIONS_FOR_COIN_SPEND[coin_spend]
+    else:
+        count("conditions_cache_hits")
+    return r
+
+
+def conditions_for_coin_spend(coin_spend: CoinSpend) -> Program:
+    return cost_and_conditions_for_coin_spend(coin_spend)[1]
 
 
 def build_sum_hints_lookup(sum_hints: List[SumHint]) -> SumHints:
@@ -43,13 +58,15 @@ def build_path_hints_lookup(path_hints: List[PathHint]) -> PathHints:
     return {_.public_key(): _ for _ in path_hints}
 
 
-def sign(us: UnsignedSpend, secrets: List[BLSSecretExponent]) -> List[SignatureInfo]:
+@traced("sign")
+def sign(us: UnsignedSpend, secrets: Secrets) -> List[SignatureInfo]:
+    keystore = keystore_for_secrets(secrets)
     sigs = []
     sum_hints = build_sum_hints_lookup(us.sum_hints)
     path_hints = build_path_hints_lookup(us.path_hints)
     for coin_spend in us.coin_spends:
         more_sigs = sign_for_coin_spend(
-            coin_spend, secrets, sum_hints, path_hints, us.agg_sig_me_network_suffix
+            coin_spend, keystore, sum_hints, path_hints, us.agg_sig_me_network_suffix
         )
         sigs.extend(more_sigs)
     return sigs
@@ -57,7 +74,7 @@ def sign(us: UnsignedSpend, secrets: List[BLSSecretExponent]) -> List[SignatureI
 
 def sign_for_coin_spend(
     coin_spend: CoinSpend,
-    secrets: List[BLSSecretExponent],
+    keystore: Keystore,
     sum_hints: SumHints,
     path_hints: PathHints,
     agg_sig_me_network_suffix: bytes,
@@ -75,7 +92,7 @@ def sign_for_coin_spend(
             partial_public_key, []
         )
         secret_key = secret_key_for_public_key(
-            secrets, path_hint.path, path_hint.root_public_key, partial_public_key
+            keystore, path_hint.path, path_hint.root_public_key, partial_public_key
         )
         if secret_key is None:
             continue
@@ -90,6 +107,7 @@ def sign_for_coin_spend(
     return sigs
 
 
+@traced("generate_synthetic_offset_signatures")
 def generate_synthetic_offset_signatures(us: UnsignedSpend) -> List[SignatureInfo]:
     sig_infos = []
     sum_hints = build_sum_hints_lookup(us.sum_hints)
@@ -140,14 +158,9 @@ def verify_pairs_for_conditions(
 
 
 def secret_key_for_public_key(
-    secrets: List[BLSSecretExponent], path, root_public_key, public_key
+    keystore: Keystore, path, root_public_key, public_key
 ) -> Optional[BLSSecretExponent]:
-    for secret in secrets:
-        if secret.public_key() == root_public_key:
-            s = secret.child_for_path(path)
-            if s.public_key() == public_key:
-                return s
-    return None
+    return keystore.secret_for_public_key(public_key, root_public_key, path)
 
 
 def partial_signature_metadata_for_hsm(
@@ -167,3 +180,51 @@ def partial_signature_metadata_for_hsm(
         for partial_public_key in sum_hint.public_keys:
             metadata = SignatureMetadata(partial_public_key, final_public_key, message)
             yield metadata
+
+
+def signature_metadata_by_signer(
+    us: UnsignedSpend,
+) -> Dict[BLSPublicKey, List[SignatureMetadata]]:
+    """
+    Everything an `hsms` instance holding one root key is expected to sign,
+    keyed by that root public key (from the path hints; a partial public key
+    without a path hint is its own root).
+    """
+    r: Dict[BLSPublicKey, List[SignatureMetadata]] = {}
+    sum_hints = build_sum_hints_lookup(us.sum_hints)
+    path_hints = build_path_hints_lookup(us.path_hints)
+    for coin_spend in us.coin_spends:
+        conditions = conditions_for_coin_spend(coin_spend)
+        agg_sig_me_message_suffix = (
+            coin_spend.coin.name() + us.agg_sig_me_network_suffix
+        )
+        for signature_metadata in partial_signature_metadata_for_hsm(
+            conditions, sum_hints, path_hints, agg_sig_me_message_suffix
+        ):
+            partial_public_key = signature_metadata.partial_public_key
+            path_hint = path_hints.get(partial_public_key)
+            signer = path_hint.root_public_key if path_hint else partial_public_key
+            r.setdefault(signer, []).append(signature_metadata)
+    return r
+
+
+@traced("verify_partial_signature")
+def verify_partial_signature(
+    signature: BLSSignature, signature_metadata: Iterable[SignatureMetadata]
+) -> bool:
+    """
+    Check `signature` is the sum of signatures over each `message` by its
+    partial public key, augmented with the final public key as `sign` does.
+    `BLSSignature.verify` can't check this, since it augments each message
+    with the public key that verifies it.
+    """
+    expected = None
+    for _ in signature_metadata:
+        g1 = chia_rs.G1Element.from_bytes(bytes(_.partial_public_key))
+        g2 = chia_rs.AugSchemeMPL.g2_from_message(bytes(_.final_public_key) + _.message)
+        pairing = g1.pair(g2)
+        expected = pairing if expected is None else expected * pairing
+    if expected is None:
+        return signature == BLSSignature.zero()
+    g2 = chia_rs.G2Element.from_bytes(bytes(signature))
+    return chia_rs.G1Element.generator().pair(g2) == expected
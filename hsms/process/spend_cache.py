@@ -0,0 +1,47 @@
+"""
+The coin spends an HSM has signed, so later requests can refer to them by
+hash (see `hsms.core.spend_diff`).
+
+Holding on to a `CoinSpend` also keeps its conditions in the cache used by
+`conditions_for_coin_spend`, so a re-sign round that refers back to it
+doesn't run its puzzle again.
+"""
+
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from chia_base.core import CoinSpend
+
+from hsms.core.spend_diff import coin_spend_hash
+from hsms.process.sign import conditions_for_coin_spend
+
+DEFAULT_MAX_SIZE = 1 << 12
+
+
+class ReviewedSpendCache:
+    """
+    A least-recently-used map of `coin_spend_hash` to `CoinSpend`.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.coin_spends: OrderedDict[bytes, CoinSpend] = OrderedDict()
+
+    def add(self, coin_spends: Iterable[CoinSpend]) -> None:
+        for coin_spend in coin_spends:
+            # make sure the conditions are cached along with it
+            conditions_for_coin_spend(coin_spend)
+            spend_hash = bytes(coin_spend_hash(coin_spend))
+            self.coin_spends[spend_hash] = coin_spend
+            self.coin_spends.move_to_end(spend_hash)
+        while len(self.coin_spends) > self.max_size:
+            self.coin_spends.popitem(last=False)
+
+    def get(self, spend_hash: bytes) -> Optional[CoinSpend]:
+        coin_spend = self.coin_spends.get(spend_hash)
+        if coin_spend is not None:
+            self.coin_spends.move_to_end(spend_hash)
+        return coin_spend
+
+    def __len__(self) -> int:
+        return len(self.coin_spends)
@@ -0,0 +1,196 @@
+"""
+What an `UnsignedSpend` does, worked out in one pass so the review screen
+appears at once even for spends of many coins.
+
+Each coin's conditions are indexed once, each puzzle hash is encoded as an
+address once, and outputs are grouped by where they go. Coins spent are
+listed one by one, and counted by the address they're spent from. An output
+to an address that's also spent from is marked as change.
+
+A spend of thousands of coins is reviewed from its overview (where the
+money goes, how many coins it comes from, and the fee), and the details of
+each coin are produced by `coin_details` only as far as they're read.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from chia_base.atoms import bytes32
+from chia_base.core import CoinSpend
+
+from hsms.consensus.conditions import conditions_by_opcode
+from hsms.core.unsigned_spend import UnsignedSpend
+from hsms.process.sign import conditions_for_coin_spend
+from hsms.puzzles import conlang
+from hsms.util.address import address_for_puzzle_hash
+
+MOJO_PER_XCH = 10**12
+
+
+def xch_for_mojos(amount: int) -> str:
+    """
+    Like `f"{Decimal(amount) / Decimal('1e12'):0.12f}"`, with integer math.
+    """
+    sign = "-" if amount < 0 else ""
+    xch, mojos = divmod(abs(amount), MOJO_PER_XCH)
+    return f"{sign}{xch}.{mojos:012d}"
+
+
+def address_cache(prefix: str = "xch") -> Callable[[bytes], str]:
+    """
+    An `address_for_puzzle_hash` that encodes each puzzle hash only once.
+    """
+    addresses: Dict[bytes, str] = {}
+
+    def address_for(puzzle_hash: bytes) -> str:
+        address = addresses.get(puzzle_hash)
+        if address is None:
+            address = address_for_puzzle_hash(bytes32(puzzle_hash), prefix)
+            addresses[puzzle_hash] = address
+        return address
+
+    return address_for
+
+
+def created_coins(coin_spend: CoinSpend) -> List[Tuple[bytes, int]]:
+    """
+    The puzzle hash and amount of each coin `coin_spend` creates.
+    """
+    conditions = conditions_by_opcode(conditions_for_coin_spend(coin_spend))
+    return [
+        (_.at("rf").atom, int(_.at("rrf")))
+        for _ in conditions.get(conlang.CREATE_COIN, [])
+    ]
+
+
+@dataclass
+class AddressTotal:
+    address: str
+    amount: int = 0
+    coin_count: int = 0
+    is_change: bool = False
+
+    def suffix(self) -> str:
+        s = f" ({self.coin_count} coins)" if self.coin_count > 1 else ""
+        return s + (" (change)" if self.is_change else "")
+
+
+@dataclass
+class SpendSummary:
+    # address and amount of each coin spent
+    spent: List[Tuple[str, int]] = field(default_factory=list)
+    inputs: List[AddressTotal] = field(default_factory=list)
+    outputs: List[AddressTotal] = field(default_factory=list)
+    total_spent: int = 0
+    total_created: int = 0
+    coins_spent: int = 0
+    coins_created: int = 0
+
+    @property
+    def fee(self) -> int:
+        return self.total_spent - self.total_created
+
+    @property
+    def change(self) -> int:
+        return sum(_.amount for _ in self.outputs if _.is_change)
+
+    def input_lines(self) -> List[str]:
+        return [
+            f"COIN SPENT: {xch_for_mojos(amount)} xch at address {address}"
+            for address, amount in self.spent
+        ]
+
+    def output_lines(self) -> List[str]:
+        return [
+            f"COIN CREATED: {xch_for_mojos(_.amount)} xch to {_.address}{_.suffix()}"
+            for _ in self.outputs
+        ]
+
+    def total_lines(self) -> List[str]:
+        r = [
+            f"TOTAL SPENT: {xch_for_mojos(self.total_spent)} xch "
+            f"in {self.coins_spent} coin(s)",
+            f"TOTAL CREATED: {xch_for_mojos(self.total_created)} xch "
+            f"in {self.coins_created} coin(s)",
+        ]
+        if self.change:
+            r.append(f"CHANGE: {xch_for_mojos(self.change)} xch")
+        if self.fee < 0:
+            r.append(
+                f"WARNING: outputs exceed inputs by {xch_for_mojos(-self.fee)} xch"
+            )
+        else:
+            r.append(f"FEE: {xch_for_mojos(self.fee)} xch")
+        return r
+
+    def lines(self) -> List[str]:
+        return self.input_lines() + [""] + self.outcome_lines()
+
+    def outcome_lines(self) -> List[str]:
+        return self.output_lines() + [""] + self.total_lines() + [""]
+
+    def overview_lines(self) -> List[str]:
+        """
+        Like `lines`, but with the coins spent counted rather than listed.
+        """
+        spent = (
+            f"SPENDING: {xch_for_mojos(self.total_spent)} xch in "
+            f"{self.coins_spent} coin(s) from {len(self.inputs)} address(es)"
+        )
+        return [spent, ""] + self.outcome_lines()
+
+
+def summary_for_unsigned_spend(
+    unsigned_spend: UnsignedSpend, prefix: str = "xch"
+) -> SpendSummary:
+    address_for = address_cache(prefix)
+    summary = SpendSummary()
+    inputs: Dict[bytes, AddressTotal] = {}
+    outputs: Dict[bytes, AddressTotal] = {}
+    for coin_spend in unsigned_spend.coin_spends:
+        coin = coin_spend.coin
+        puzzle_hash = bytes(coin.puzzle_hash)
+        i = inputs.get(puzzle_hash)
+        if i is None:
+            i = inputs[puzzle_hash] = AddressTotal(address_for(puzzle_hash))
+        summary.spent.append((i.address, coin.amount))
+        i.amount += coin.amount
+        i.coin_count += 1
+        summary.total_spent += coin.amount
+        summary.coins_spent += 1
+
+        for puzzle_hash, amount in created_coins(coin_spend):
+            o = outputs.get(puzzle_hash)
+            if o is None:
+                o = outputs[puzzle_hash] = AddressTotal(address_for(puzzle_hash))
+            o.amount += amount
+            o.coin_count += 1
+            summary.total_created += amount
+            summary.coins_created += 1
+
+    for puzzle_hash, o in outputs.items():
+        o.is_change = puzzle_hash in inputs
+    summary.inputs = list(inputs.values())
+    summary.outputs = list(outputs.values())
+    return summary
+
+
+def coin_details(
+    unsigned_spend: UnsignedSpend, prefix: str = "xch"
+) -> Iterator[List[str]]:
+    """
+    Yield the lines describing each coin spent, one coin at a time.
+    """
+    address_for = address_cache(prefix)
+    count = len(unsigned_spend.coin_spends)
+    for index, coin_spend in enumerate(unsigned_spend.coin_spends, start=1):
+        coin = coin_spend.coin
+        lines = [
+            f"COIN {index}/{count}: {xch_for_mojos(coin.amount)} xch at address "
+            f"{address_for(bytes(coin.puzzle_hash))}"
+        ]
+        for puzzle_hash, amount in created_coins(coin_spend):
+            lines.append(
+                f"  CREATES: {xch_for_mojos(amount)} xch to {address_for(puzzle_hash)}"
+            )
+        yield lines
@@ -12,13 +12,18 @@ the doctor ordered.
 
 from clvm_rs import Program  # type: ignore
 
-from chialisp_puzzles import load_puzzle  # type: ignore
+from hsms.util.lazy import lazy_getattr, load_puzzle
 
-MOD = load_puzzle("p2_conditions")
+
+def mod() -> Program:
+    return load_puzzle("p2_conditions")
+
+
+__getattr__ = lazy_getattr(__name__, dict(MOD=mod))
 
 
 def puzzle_for_conditions(conditions) -> Program:
-    return MOD.run_with_cost([conditions], max_cost=1<<32)[1]
+    return mod().run_with_cost([conditions], max_cost=1<<32)[1]
 
 
 def solution_for_conditions(conditions) -> Program:
@@ -51,12 +51,15 @@ following mechanism:
   The second and third arguments are a chialisp program and its corresponding
   arguments, which will be run inside the standard coin puzzle. This interacts with
   sign_coin_spend in that the AGG_SIG_ME condition added by the inner puzzle asks
-  the surrounding system to provide a signature over the provided program with a 
+  the surrounding system to provide a signature over the provided program with a
   synthetic key whose derivation is within. Any wallets which intend to use
   standard coins in this way must try to resolve a public key to a secret key
   via this derivation.
 """
 
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
 import hashlib
 
 from clvm_rs import Program  # type: ignore
@@ -64,7 +67,8 @@ from clvm_rs import Program  # type: ignore
 from chia_base.atoms import bytes32
 from chia_base.bls12_381 import BLSPublicKey, BLSSecretExponent
 
-from chialisp_puzzles import load_puzzle  # type: ignore
+from hsms.clvm.curry_hash import CurriedTreeHasher
+from hsms.util.lazy import lazy_getattr, load_puzzle
 
 from .p2_conditions import puzzle_for_conditions
 
@@ -74,11 +78,33 @@ DEFAULT_HIDDEN_PUZZLE = Program.from_bytes(
 
 DEFAULT_HIDDEN_PUZZLE_HASH = DEFAULT_HIDDEN_PUZZLE.tree_hash()
 
-MOD = load_puzzle("p2_delegated_puzzle_or_hidden_puzzle")
+MAX_COST = 1 << 24
 
-SYNTHETIC_MOD = load_puzzle("calculate_synthetic_public_key")
 
-MAX_COST = 1 << 24
+def mod() -> Program:
+    return load_puzzle("p2_delegated_puzzle_or_hidden_puzzle")
+
+
+@lru_cache(maxsize=None)
+def mod_curried_tree_hasher() -> CurriedTreeHasher:
+    return CurriedTreeHasher(mod())
+
+
+def synthetic_mod() -> Program:
+    return load_puzzle("calculate_synthetic_public_key")
+
+
+__getattr__ = lazy_getattr(
+    __name__,
+    dict(
+        MOD=mod,
+        MOD_CURRIED_TREE_HASHER=mod_curried_tree_hasher,
+        SYNTHETIC_MOD=synthetic_mod,
+    ),
+)
+
+
+SYNTHETIC_PUBLIC_KEY_CACHE_SIZE = 1 << 16
 
 
 def calculate_synthetic_offset(
@@ -90,13 +116,16 @@ def calculate_synthetic_offset(
     return BLSSecretExponent.from_int(offset)
 
 
+@lru_cache(maxsize=SYNTHETIC_PUBLIC_KEY_CACHE_SIZE)
 def calculate_synthetic_public_key(
     public_key: BLSPublicKey, hidden_puzzle_hash: bytes32
 ) -> BLSPublicKey:
-    _cost, r = SYNTHETIC_MOD.run_with_cost(
-        [bytes(public_key), hidden_puzzle_hash], max_cost=MAX_COST
-    )
-    return BLSPublicKey.from_bytes(r.atom)
+    """
+    This is `public_key + offset * G`, the same thing `SYNTHETIC_MOD` calculates,
+    but without running clvm.
+    """
+    synthetic_offset = calculate_synthetic_offset(public_key, hidden_puzzle_hash)
+    return public_key + synthetic_offset.public_key()
 
 
 def calculate_synthetic_secret_key(
@@ -109,7 +138,24 @@ def calculate_synthetic_secret_key(
 
 
 def puzzle_for_synthetic_public_key(synthetic_public_key: BLSPublicKey) -> Program:
-    return MOD.curry(bytes(synthetic_public_key))
+    return mod().curry(bytes(synthetic_public_key))
+
+
+def puzzle_hash_for_synthetic_public_key(synthetic_public_key: BLSPublicKey) -> bytes32:
+    """
+    The same as `puzzle_for_synthetic_public_key(...).tree_hash()`, but faster.
+    """
+    hasher = mod_curried_tree_hasher()
+    return bytes32(hasher.curry_atom_hash(bytes(synthetic_public_key)))
+
+
+def puzzle_hash_for_public_key_and_hidden_puzzle_hash(
+    public_key: BLSPublicKey, hidden_puzzle_hash: bytes32
+) -> bytes32:
+    synthetic_public_key = calculate_synthetic_public_key(
+        public_key, hidden_puzzle_hash
+    )
+    return puzzle_hash_for_synthetic_public_key(synthetic_public_key)
 
 
 def puzzle_for_public_key_and_hidden_puzzle_hash(
@@ -129,6 +175,49 @@ def puzzle_for_public_key_and_hidden_puzzle(
     )
 
 
+def synthetic_public_keys_for_public_keys(
+    public_keys: Iterable[BLSPublicKey],
+    hidden_puzzle_hash: bytes32 = DEFAULT_HIDDEN_PUZZLE_HASH,
+) -> List[BLSPublicKey]:
+    return [calculate_synthetic_public_key(_, hidden_puzzle_hash) for _ in public_keys]
+
+
+def puzzle_hashes_for_public_keys(
+    public_keys: Iterable[BLSPublicKey],
+    hidden_puzzle_hash: bytes32 = DEFAULT_HIDDEN_PUZZLE_HASH,
+) -> List[bytes32]:
+    """
+    Standard puzzle hashes, as used for address-scanning.
+    """
+    return [
+        puzzle_hash_for_synthetic_public_key(_)
+        for _ in synthetic_public_keys_for_public_keys(public_keys, hidden_puzzle_hash)
+    ]
+
+
+def puzzle_hashes_for_paths(
+    root_public_key: BLSPublicKey,
+    paths: Iterable[List[int]],
+    hidden_puzzle_hash: bytes32 = DEFAULT_HIDDEN_PUZZLE_HASH,
+) -> List[bytes32]:
+    """
+    Standard puzzle hashes for many derivation paths from one root public key.
+    Intermediate public keys for shared path prefixes are derived only once.
+    """
+    public_keys: Dict[Tuple[int, ...], BLSPublicKey] = {(): root_public_key}
+
+    def public_key_for_path(path: Tuple[int, ...]) -> BLSPublicKey:
+        public_key = public_keys.get(path)
+        if public_key is None:
+            public_key = public_key_for_path(path[:-1]).child(path[-1])
+            public_keys[path] = public_key
+        return public_key
+
+    return puzzle_hashes_for_public_keys(
+        [public_key_for_path(tuple(_)) for _ in paths], hidden_puzzle_hash
+    )
+
+
 def solution_for_delegated_puzzle(
     delegated_puzzle: Program, solution: Program
 ) -> Program:
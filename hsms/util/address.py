@@ -0,0 +1,6 @@
+from chia_base.atoms import bytes32
+from chia_base.util.bech32 import bech32_encode
+
+
+def address_for_puzzle_hash(puzzle_hash: bytes32, prefix: str = "xch") -> str:
+    return bech32_encode(prefix, puzzle_hash)
@@ -3,6 +3,8 @@ import zlib
 
 from typing import List, Tuple
 
+from hsms.util.trace import count, traced
+
 
 def optimal_chunk_size_for_max_chunk_size(full_size: int, max_chunk_size: int) -> int:
     payload_size = max_chunk_size - 2
@@ -44,6 +46,7 @@ class ChunkAssembler:
             self.add_chunk(chunk)
 
     def add_chunk(self, chunk: bytes):
+        count("chunks_added")
         if chunk in self.chunks:
             return
         if len(self.chunks) > 0 and self.chunks[0][-1] != chunk[-1]:
@@ -67,6 +70,7 @@ class ChunkAssembler:
         else:
             return len(self.chunks), self.chunks[0][-1] + 1
 
+    @traced("ChunkAssembler.assemble")
     def __bytes__(self) -> bytes:
         if not self.is_assembled():
             raise ValueError("insufficient chunks")
@@ -0,0 +1,182 @@
+"""
+Compression backends for blobs sent across the air gap.
+
+Each backend has a tag, which is part of the envelope wire format (see
+`hsms.core.envelope`), so tags must never be renumbered.
+
+The `*-dict` backends prime the compressor with a preset dictionary of
+bytes that show up in nearly every spend we send: the standard puzzle as
+it appears curried into a puzzle reveal, and the shape of a solution for
+it. Puzzle reveals are otherwise incompressible the first time they appear
+in a blob, so this mostly helps small spends, which are the common case.
+zlib stores a checksum of the dictionary in the stream, so a mismatched
+dictionary is detected rather than silently producing garbage.
+
+The dictionary is built from the installed `chialisp_puzzles`, so both sides
+of the air gap must have the same version of it. If they don't, every
+envelope compressed with a `*-dict` backend fails to decode; use `zlib` or
+`none` until they match.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+import importlib.util
+import io
+import zlib
+
+# `zstandard` is only imported once a zstd backend is used
+HAVE_ZSTD = importlib.util.find_spec("zstandard") is not None
+
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSION_ZLIB_DICT = 3
+COMPRESSION_ZSTD_DICT = 4
+
+# the most a payload may decompress to, so a hostile envelope can't claim
+# (or omit) a huge length and exhaust memory
+MAX_DECOMPRESSED_LENGTH = 1 << 25
+
+
+@dataclass(frozen=True)
+class Compression:
+    tag: int
+    name: str
+    compress: Callable[[bytes], bytes]
+    # decompress to at most the given number of bytes
+    decompress: Callable[[bytes, int], bytes]
+
+
+@lru_cache(maxsize=None)
+def preset_dictionary() -> bytes:
+    """
+    Built from `chialisp_puzzles` module bytes the first time it's needed.
+    zlib favours matches near the end of the dictionary, so the most common
+    strings go last.
+    """
+    from clvm_rs import Program  # type: ignore
+
+    from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import MOD
+    from hsms.puzzles.p2_conditions import MOD as P2_CONDITIONS_MOD
+
+    placeholder_public_key = bytes(48)
+    curried = bytes(MOD.curry(placeholder_public_key))
+    prefix, suffix = curried.split(placeholder_public_key)
+
+    placeholder_puzzle_hash = bytes(32)
+    solution = bytes(Program.to([0, (1, [[51, placeholder_puzzle_hash, 1 << 40]]), 0]))
+    solution = solution.replace(placeholder_puzzle_hash, b"")
+
+    return b"".join([bytes(P2_CONDITIONS_MOD), solution, suffix, prefix])
+
+
+def zlib_compress(blob: bytes, zdict: bytes = b"") -> bytes:
+    if zdict:
+        c = zlib.compressobj(level=9, zdict=zdict)
+    else:
+        c = zlib.compressobj(level=9)
+    return c.compress(blob) + c.flush()
+
+
+def check_length(length: int) -> None:
+    """
+    Decompressors treat a limit of zero as no limit at all, so it's rejected
+    along with anything over `MAX_DECOMPRESSED_LENGTH`.
+    """
+    if not 0 < length <= MAX_DECOMPRESSED_LENGTH:
+        raise ValueError(
+            f"declared length {length} is not between 1 and {MAX_DECOMPRESSED_LENGTH}"
+        )
+
+
+def zlib_decompress(blob: bytes, length: int, zdict: bytes = b"") -> bytes:
+    check_length(length)
+    d = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    try:
+        r = d.decompress(blob, length)
+    except zlib.error as ex:
+        raise ValueError(f"bad zlib payload: {ex}")
+    if not d.eof or d.unconsumed_tail:
+        raise ValueError("compressed payload is longer than declared")
+    return r
+
+
+COMPRESSIONS: List[Compression] = [
+    Compression(COMPRESSION_NONE, "none", bytes, lambda blob, length: blob),
+    Compression(COMPRESSION_ZLIB, "zlib", zlib_compress, zlib_decompress),
+    Compression(
+        COMPRESSION_ZLIB_DICT,
+        "zlib-dict",
+        lambda blob: zlib_compress(blob, preset_dictionary()),
+        lambda blob, length: zlib_decompress(blob, length, preset_dictionary()),
+    ),
+]
+
+
+if HAVE_ZSTD:
+
+    @lru_cache(maxsize=None)
+    def zstd_dictionary():
+        import zstandard
+
+        return zstandard.ZstdCompressionDict(
+            preset_dictionary(), dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+
+    def zstd_compress(blob: bytes, use_dict: bool = False) -> bytes:
+        import zstandard
+
+        dict_data = zstd_dictionary() if use_dict else None
+        return zstandard.ZstdCompressor(level=19, dict_data=dict_data).compress(blob)
+
+    def zstd_decompress(blob: bytes, length: int, use_dict: bool = False) -> bytes:
+        """
+        `ZstdDecompressor.decompress` trusts the content size in the frame
+        header over `max_output_size`, so read through a stream instead,
+        never asking for more than one byte past `length`.
+        """
+        import zstandard
+
+        check_length(length)
+        d = zstandard.ZstdDecompressor(
+            dict_data=zstd_dictionary() if use_dict else None
+        )
+        try:
+            with d.stream_reader(io.BytesIO(blob)) as reader:
+                r = reader.read(length + 1)
+        except zstandard.ZstdError as ex:
+            raise ValueError(f"bad zstd payload: {ex}")
+        if len(r) > length:
+            raise ValueError("compressed payload is longer than declared")
+        return r
+
+    COMPRESSIONS += [
+        Compression(
+            COMPRESSION_ZSTD,
+            "zstd",
+            zstd_compress,
+            zstd_decompress,
+        ),
+        Compression(
+            COMPRESSION_ZSTD_DICT,
+            "zstd-dict",
+            lambda blob: zstd_compress(blob, use_dict=True),
+            lambda blob, length: zstd_decompress(blob, length, use_dict=True),
+        ),
+    ]
+
+
+COMPRESSION_FOR_TAG: Dict[int, Compression] = {_.tag: _ for _ in COMPRESSIONS}
+
+COMPRESSION_FOR_NAME: Dict[str, Compression] = {_.name: _ for _ in COMPRESSIONS}
+
+
+def compression_for_name(name: str) -> Compression:
+    r = COMPRESSION_FOR_NAME.get(name)
+    if r is None:
+        names = ", ".join(COMPRESSION_FOR_NAME)
+        raise ValueError(f"unknown or unavailable compression {name}: try {names}")
+    return r
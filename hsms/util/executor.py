@@ -0,0 +1,19 @@
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Deque, Iterable, Iterator
+
+
+def windowed_map(
+    executor: Executor, f: Callable, items: Iterable, window: int
+) -> Iterator:
+    """
+    Like `executor.map`, but with at most `window` items in flight, so results
+    stream out in order without the whole input being submitted up front.
+    """
+    pending: Deque = deque()
+    for item in items:
+        pending.append(executor.submit(f, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
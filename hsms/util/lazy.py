@@ -0,0 +1,38 @@
+"""
+Module attributes that are built the first time they're used.
+
+Puzzles come from `chialisp_puzzles`, which is slow to import, and
+serializers are slow to build, so modules that export them build them on
+demand instead of at import.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict
+
+
+def lazy_getattr(
+    module_name: str, attributes: Dict[str, Callable[[], Any]]
+) -> Callable[[str], Any]:
+    """
+    A module `__getattr__` returning `attributes[name]()`, like
+
+        __getattr__ = lazy_getattr(__name__, dict(MOD=mod))
+    """
+
+    def __getattr__(name: str) -> Any:
+        f = attributes.get(name)
+        if f is None:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        return f()
+
+    return __getattr__
+
+
+@lru_cache(maxsize=None)
+def load_puzzle(name: str) -> Any:
+    """
+    `chialisp_puzzles.load_puzzle`, imported when first called.
+    """
+    from chialisp_puzzles import load_puzzle  # type: ignore
+
+    return load_puzzle(name)
@@ -0,0 +1,352 @@
+"""
+QR codes for qrint strings, shown in the terminal or written to a file.
+
+A blob split into chunks by `byte_chunks` becomes a sequence of QR codes.
+Shown one after another at a fixed frame rate, either cycling in the
+terminal or as an animated PNG, they can be scanned continuously instead
+of paging through them by hand.
+
+Each QR code is kept as its module matrix, cached by the text it encodes
+and the settings it was encoded with, so a cycling display or a repeated
+signature is encoded only once. Matrices are encoded in this process:
+`hsms` holds secrets, which worker processes would inherit, and starting
+them costs more than encoding a few chunks. Tools without keys can ask for
+workers.
+
+Choosing the mask among the eight possible is most of the work of encoding
+a large code, so `QRSettings` can pin it (and the version and error level).
+A pinned version that's too small for a chunk is ignored. The time from
+asking for a display to the first code appearing is traced as
+`qr_time_to_display`.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import perf_counter, sleep
+from typing import Iterable, List, Optional, Sequence, TextIO, Tuple
+
+import argparse
+import io
+import struct
+import zlib
+
+from hsms.util import trace
+
+# rows of modules, 1 for dark
+Matrix = Tuple[bytes, ...]
+
+DEFAULT_BORDER = 4
+
+DEFAULT_FPS = 2.0
+
+# slower than this is no use for scanning
+MIN_FPS = 0.01
+
+MAX_FPS = 1000.0
+
+MATRIX_CACHE_SIZE = 256
+
+ERROR_LEVELS = "LMQH"
+
+
+@dataclass(frozen=True)
+class QRSettings:
+    """
+    `None` lets `segno` choose: the smallest version that fits, the highest
+    error level that fits in it, and the mask that scores best.
+    """
+
+    version: Optional[int] = None
+    error: Optional[str] = None
+    mask: Optional[int] = None
+
+
+DEFAULT_SETTINGS = QRSettings()
+
+# text, version, error level, mask
+MatrixKey = Tuple[str, Optional[int], Optional[str], Optional[int]]
+
+
+def matrix_key(text: str, settings: QRSettings) -> MatrixKey:
+    return (text, settings.version, settings.error, settings.mask)
+
+
+class MatrixCache:
+    """
+    A least-recently-used map of `MatrixKey` to `Matrix`.
+    """
+
+    def __init__(self, max_size: int = MATRIX_CACHE_SIZE):
+        self.max_size = max_size
+        self.matrices: "OrderedDict[MatrixKey, Matrix]" = OrderedDict()
+
+    def get(self, key: MatrixKey) -> Optional[Matrix]:
+        matrix = self.matrices.get(key)
+        if matrix is not None:
+            self.matrices.move_to_end(key)
+        return matrix
+
+    def put(self, key: MatrixKey, matrix: Matrix) -> None:
+        self.matrices[key] = matrix
+        self.matrices.move_to_end(key)
+        while len(self.matrices) > self.max_size:
+            self.matrices.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.matrices)
+
+
+MATRIX_CACHE = MatrixCache()
+
+
+def encode_matrix(text: str, settings: QRSettings = DEFAULT_SETTINGS) -> Matrix:
+    import segno
+
+    kwargs = dict(
+        error=settings.error,
+        mask=settings.mask,
+        boost_error=settings.error is None,
+    )
+    try:
+        qr = segno.make_qr(text, version=settings.version, **kwargs)
+    except segno.DataOverflowError:
+        if settings.version is None:
+            raise
+        qr = segno.make_qr(text, **kwargs)
+    return tuple(bytes(_) for _ in qr.matrix)
+
+
+def matrices_for_texts(
+    texts: Sequence[str],
+    workers: Optional[int] = 1,
+    cache: MatrixCache = MATRIX_CACHE,
+    settings: QRSettings = DEFAULT_SETTINGS,
+) -> List[Matrix]:
+    """
+    The matrix for each of `texts`, from `cache` where possible. Anything
+    missing is encoded and added to `cache`, in `workers` processes (`None`
+    for one per cpu) if there's more than one. Workers are forked from this
+    process, so don't use them in one holding secrets.
+    """
+    missing = [
+        _ for _ in dict.fromkeys(texts) if cache.get(matrix_key(_, settings)) is None
+    ]
+    if len(missing) > 1 and workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            encoded = list(
+                executor.map(encode_matrix, missing, [settings] * len(missing))
+            )
+    else:
+        encoded = [encode_matrix(_, settings) for _ in missing]
+    for text, matrix in zip(missing, encoded):
+        cache.put(matrix_key(text, settings), matrix)
+    matrices = []
+    for text in texts:
+        matrix = cache.get(matrix_key(text, settings))
+        if matrix is None:
+            # `cache` is smaller than `texts`
+            matrix = encode_matrix(text, settings)
+        matrices.append(matrix)
+    return matrices
+
+
+def terminal_text(matrix: Matrix, border: int = DEFAULT_BORDER) -> str:
+    """
+    Half-block characters, as from `segno`'s `QRCode.terminal(compact=True)`.
+    """
+    from segno import writers
+
+    f = io.StringIO()
+    writers.write_terminal_compact(matrix, (len(matrix[0]), len(matrix)), f, border)
+    return f.getvalue()
+
+
+def shown(start: float) -> None:
+    if trace.ENABLED:
+        trace.add_time("qr_time_to_display", perf_counter() - start)
+
+
+def show_cycling(
+    matrices: Sequence[Matrix],
+    f: TextIO,
+    fps: float = DEFAULT_FPS,
+    loops: Optional[int] = None,
+    border: int = DEFAULT_BORDER,
+    start: Optional[float] = None,
+) -> None:
+    """
+    Show `matrices` one at a time in place, `loops` times through (default:
+    until interrupted). If `start` is given, the time from then to the
+    first frame is traced.
+    """
+    frames = [terminal_text(_, border) for _ in matrices]
+    loop = 0
+    while loops is None or loop < loops:
+        for index, frame in enumerate(frames, start=1):
+            # cursor home, clear screen
+            f.write(f"\x1b[H\x1b[J{frame}\n{index}/{len(frames)}\n")
+            f.flush()
+            if start is not None:
+                shown(start)
+                start = None
+            sleep(1 / fps)
+        loop += 1
+
+
+def padded_matrix(matrix: Matrix, size: int) -> Matrix:
+    """
+    Center `matrix` in a square of light modules `size` wide.
+    """
+    before = (size - len(matrix)) // 2
+    after = size - len(matrix) - before
+    blank = bytes(size)
+    rows = [bytes(before) + _ + bytes(after) for _ in matrix]
+    return (blank,) * before + tuple(rows) + (blank,) * after
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    checksum = zlib.crc32(kind + data)
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", checksum)
+
+
+def png_image_data(matrix: Matrix, scale: int, border: int) -> bytes:
+    """
+    Compressed 1-bit grayscale rows, dark modules black.
+    """
+    rows = []
+    width = len(matrix[0]) + 2 * border
+    for row in padded_matrix(matrix, width):
+        bits = "".join("0" if module else "1" for module in row for _ in range(scale))
+        bits += "1" * (-len(bits) % 8)
+        line = b"\0" + int(bits, 2).to_bytes(len(bits) // 8, "big")
+        rows.extend([line] * scale)
+    return zlib.compress(b"".join(rows), 9)
+
+
+def frame_delay(fps: float) -> Tuple[int, int]:
+    """
+    `1 / fps` seconds as the 16-bit numerator and denominator of an APNG
+    frame delay, as fine-grained as fits: milliseconds down to seconds.
+    """
+    for denominator in (1000, 100, 10, 1):
+        numerator = round(denominator / fps)
+        if numerator <= 0xFFFF:
+            return numerator, denominator
+    raise ValueError(f"{fps} frames per second is too slow for an APNG")
+
+
+def apng_for_matrices(
+    matrices: Sequence[Matrix],
+    fps: float = DEFAULT_FPS,
+    scale: int = 4,
+    border: int = DEFAULT_BORDER,
+) -> bytes:
+    """
+    An animated PNG showing each matrix for `1 / fps` seconds, looping
+    forever. Smaller codes are centered in the largest one's frame.
+    """
+    size = max(len(_) for _ in matrices)
+    pixels = (size + 2 * border) * scale
+    delay = struct.pack(">HH", *frame_delay(fps))
+    chunks = [
+        png_chunk(b"IHDR", struct.pack(">IIBBBBB", pixels, pixels, 1, 0, 0, 0, 0)),
+        png_chunk(b"acTL", struct.pack(">II", len(matrices), 0)),
+    ]
+    sequence_number = 0
+    for index, matrix in enumerate(matrices):
+        frame_control = struct.pack(">IIIII", sequence_number, pixels, pixels, 0, 0)
+        chunks.append(png_chunk(b"fcTL", frame_control + delay + b"\0\0"))
+        sequence_number += 1
+        data = png_image_data(padded_matrix(matrix, size), scale, border)
+        if index == 0:
+            chunks.append(png_chunk(b"IDAT", data))
+        else:
+            chunks.append(png_chunk(b"fdAT", struct.pack(">I", sequence_number) + data))
+            sequence_number += 1
+    chunks.append(png_chunk(b"IEND", b""))
+    return b"\x89PNG\r\n\x1a\n" + b"".join(chunks)
+
+
+def show_qr_sequence(
+    texts: Iterable[str],
+    f: TextIO,
+    fps: float = DEFAULT_FPS,
+    apng_path: Optional[str] = None,
+    loops: Optional[int] = None,
+    workers: Optional[int] = 1,
+    settings: QRSettings = DEFAULT_SETTINGS,
+) -> None:
+    """
+    Show `texts` as QR codes: a single one as it is, several cycling at
+    `fps` until interrupted, or, with `apng_path`, written as an animated PNG.
+    """
+    start = perf_counter()
+    texts = list(texts)
+    matrices = matrices_for_texts(texts, workers, settings=settings)
+    if apng_path:
+        with open(apng_path, "wb") as out:
+            out.write(apng_for_matrices(matrices, fps))
+        shown(start)
+        return
+    if len(matrices) == 1:
+        f.write("\n" + terminal_text(matrices[0]) + "\n")
+        f.flush()
+        shown(start)
+        return
+    try:
+        show_cycling(matrices, f, fps, loops, start=start)
+    except KeyboardInterrupt:
+        f.write("\n")
+
+
+def parse_fps(s: str) -> float:
+    fps = float(s)
+    if not MIN_FPS <= fps <= MAX_FPS:
+        raise ValueError(f"fps must be from {MIN_FPS} to {MAX_FPS}")
+    return fps
+
+
+def parse_error_level(s: str) -> str:
+    if s.upper() not in ERROR_LEVELS:
+        raise ValueError(f"error level must be one of {ERROR_LEVELS}")
+    return s.upper()
+
+
+def add_qr_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--fps",
+        type=parse_fps,
+        default=DEFAULT_FPS,
+        help=f"QR codes per second when cycling (default: {DEFAULT_FPS})",
+    )
+    parser.add_argument(
+        "--apng",
+        metavar="path",
+        help="write the QR codes to an animated PNG file instead",
+    )
+    parser.add_argument(
+        "--qr-version",
+        type=int,
+        choices=range(1, 41),
+        metavar="1-40",
+        help="QR code version (size) to use where the data fits",
+    )
+    parser.add_argument(
+        "--qr-error",
+        type=parse_error_level,
+        metavar="L|M|Q|H",
+        help="QR code error correction level",
+    )
+    parser.add_argument(
+        "--qr-mask",
+        type=int,
+        choices=range(8),
+        metavar="0-7",
+        help="QR code mask, which skips choosing the best one (faster)",
+    )
+
+
+def qr_settings_for_args(args) -> QRSettings:
+    return QRSettings(args.qr_version, args.qr_error, args.qr_mask)
@@ -83,6 +83,8 @@ from typing import Tuple
 
 from chia_base.contrib.bech32m import convertbits
 
+from hsms.util.trace import count, traced
+
 
 def b2a_qrint_payload(blob: bytes, grouping_size_bits: int) -> Tuple[int, str]:
     max_value = 1 << grouping_size_bits
@@ -113,7 +115,9 @@ def a2b_qrint_payload(s: str, grouping_size_bits: int) -> bytes:
     return bytes(convertbits(blocks, grouping_size_bits, 8, pad=False))
 
 
+@traced("b2a_qrint")
 def b2a_qrint(blob: bytes) -> str:
+    count("qrint_bytes_encoded", len(blob))
     MAX_SIZE_FOR_3_GROUP = 20
 
     padding_count, s33 = b2a_qrint_payload(blob, 33)
@@ -136,6 +140,7 @@ PREFIX_TABLE = {
 }
 
 
+@traced("a2b_qrint")
 def a2b_qrint(s: str) -> bytes:
     c = s[0]
     if c not in PREFIX_TABLE:
@@ -145,3 +150,10 @@ def a2b_qrint(s: str) -> bytes:
     if padding:
         payload = payload[:-padding]
     return payload
+
+
+def a2b_qrint_or_hex(s: str) -> bytes:
+    """
+    qrint is all digits, so anything else is taken to be hex.
+    """
+    return a2b_qrint(s) if s.isdigit() else bytes.fromhex(s)
@@ -0,0 +1,171 @@
+"""
+Lightweight instrumentation: named spans that accumulate call counts and
+wall-clock time, and named counters.
+
+Everything is off by default, and a disabled hook costs one global flag
+check. Set `HSMS_TRACE` to enable tracing for a whole process: `-` or `1`
+reports to stderr, anything else is the path of a file to append JSON lines
+to. Commands that handle requests one at a time (like `hsms`) call `report`
+after each one; anything left over is reported at exit.
+
+    @traced("sign")
+    def sign(...): ...
+
+    with span("run_puzzle"):
+        ...
+
+    count("puzzle_runs")
+"""
+
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, TextIO, TypeVar
+
+import atexit
+import os
+import sys
+
+ENABLED = False
+
+# `None` means stderr
+DESTINATION: Optional[str] = None
+
+# name => [calls, total seconds]
+SPANS: Dict[str, List[float]] = {}
+
+COUNTERS: Dict[str, int] = {}
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def enable(destination: Optional[str] = None) -> None:
+    global ENABLED, DESTINATION
+    ENABLED = True
+    DESTINATION = None if destination in (None, "-", "1") else destination
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    SPANS.clear()
+    COUNTERS.clear()
+
+
+def add_time(name: str, elapsed: float) -> None:
+    v = SPANS.get(name)
+    if v is None:
+        SPANS[name] = [1, elapsed]
+    else:
+        v[0] += 1
+        v[1] += elapsed
+
+
+def count(name: str, n: int = 1) -> None:
+    if ENABLED:
+        COUNTERS[name] = COUNTERS.get(name, 0) + n
+
+
+class Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        add_time(self.name, perf_counter() - self.start)
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name: str):
+    return Span(name) if ENABLED else NULL_SPAN
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorator that times every call of a function as the span `name`
+    (default: the function's qualified name).
+    """
+
+    def decorator(f: F) -> F:
+        span_name = name or f.__qualname__
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return f(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                add_time(span_name, perf_counter() - start)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def snapshot(label: str = "") -> Dict[str, Any]:
+    return dict(
+        label=label,
+        spans={
+            name: dict(calls=int(calls), seconds=seconds)
+            for name, (calls, seconds) in SPANS.items()
+        },
+        counters=dict(COUNTERS),
+    )
+
+
+def print_report(d: Dict[str, Any], f: TextIO) -> None:
+    print(f"trace: {d['label']}", file=f)
+    spans = sorted(d["spans"].items(), key=lambda _: -_[1]["seconds"])
+    for name, s in spans:
+        ms = s["seconds"] * 1e3
+        print(f"  {name:40} {s['calls']:8d} calls {ms:12.3f} ms", file=f)
+    for name, v in sorted(d["counters"].items()):
+        print(f"  {name:40} {v:8d}", file=f)
+
+
+def report(label: str = "") -> None:
+    """
+    Report what's accumulated since the last report to the configured
+    destination, then reset.
+    """
+    if not ENABLED or not (SPANS or COUNTERS):
+        return
+    d = snapshot(label)
+    reset()
+    if DESTINATION is None:
+        print_report(d, sys.stderr)
+    else:
+        import json
+
+        with open(DESTINATION, "a") as f:
+            f.write(json.dumps(d) + "\n")
+
+
+def report_at_exit() -> None:
+    report("exit")
+
+
+if os.getenv("HSMS_TRACE"):
+    enable(os.getenv("HSMS_TRACE"))
+
+atexit.register(report_at_exit)
@@ -1,8 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from types import GenericAlias
 from typing import (
+    Any,
     Callable,
+    Generator,
+    Iterable,
+    Tuple,
     get_origin,
     get_args,
     Optional,
@@ -19,17 +23,156 @@ CompoundLookup = dict[Type, Callable[[Type, tuple[Type, ...], "TypeTree"], T]]
 OtherHandler = Callable[[Type, "TypeTree"], Optional[T]]
 
 
+class Forward:
+    """
+    A stand-in for the callable for a type that is still being built. It's
+    handed out when a type refers to itself, and forwards calls once the real
+    callable is filled in.
+    """
+
+    def __init__(self, t: Any):
+        self.t = t
+        self.f: Optional[Callable] = None
+
+    def __call__(self, *args, **kwargs):
+        f = self.f
+        if f is None:
+            raise ValueError(f"type {self.t} was never successfully built")
+        return f(*args, **kwargs)
+
+
+# a generator that yields `(f, x)` to ask for `f(x)`, is sent the result,
+# and returns its own
+Steps = Generator[Tuple[Callable, Any], Any, Any]
+
+
+class Stepped:
+    """
+    A callable made of `steps`, run by `trampoline`. The callables for a
+    recursive type reach themselves through a `Forward`, so they're built
+    this way, and a value nests as deeply as memory allows rather than as
+    deeply as the Python stack does.
+    """
+
+    def __init__(self, steps: Callable[[Any], Steps]):
+        self.steps = steps
+
+    def __call__(self, x: Any) -> Any:
+        return trampoline(self.steps(x))
+
+
+def is_stepped(f: Callable) -> bool:
+    """
+    Whether `f` is (or will be) `Stepped`: a callable that must be yielded
+    to the trampoline rather than called, or the stack grows with nesting.
+    """
+    return isinstance(f, (Stepped, Forward))
+
+
+def trampoline(steps: Steps) -> Any:
+    """
+    Run `steps` on an explicit stack, calling anything that isn't `Stepped`
+    directly.
+    """
+    stack = [steps]
+    value = None
+    while True:
+        try:
+            f, x = stack[-1].send(value)
+        except StopIteration as ex:
+            stack.pop()
+            if not stack:
+                return ex.value
+            value = ex.value
+            continue
+        if isinstance(f, Forward) and f.f is not None:
+            f = f.f
+        if isinstance(f, Stepped):
+            stack.append(f.steps(x))
+            value = None
+        else:
+            value = f(x)
+
+
+def run_steps(steps: Steps) -> Any:
+    """
+    Run `steps` calling everything directly, for callables whose children
+    are all plain functions.
+    """
+    value = None
+    try:
+        while True:
+            f, x = steps.send(value)
+            value = f(x)
+    except StopIteration as ex:
+        return ex.value
+
+
+def stepped_or_plain(
+    steps: Callable[[Any], Steps], children: Iterable[Callable]
+) -> Callable[[Any], Any]:
+    """
+    `Stepped` if any of `children` is, so recursion stays on the trampoline;
+    otherwise a plain function, since a type that doesn't recurse can't nest
+    any deeper than it's written.
+    """
+    if any(is_stepped(_) for _ in children):
+        return Stepped(steps)
+    return lambda x: run_steps(steps(x))
+
+
+class TypeMemo(Generic[T]):
+    """
+    Remembers the callable built for each type, and hands out a `Forward`
+    for a type that is still being built, so self-referential types don't
+    recurse forever. Shared by `TypeTree` here and the `clvm_serde` trees.
+    """
+
+    def __init__(self):
+        self.built: dict[Any, T] = {}
+        self.in_progress: dict[Any, Forward] = {}
+
+    def __contains__(self, t: Any) -> bool:
+        return t in self.built
+
+    def classes(self) -> dict[str, type]:
+        """
+        The classes built or being built, by name.
+        """
+        types = list(self.built) + list(self.in_progress)
+        return {_.__name__: _ for _ in types if isinstance(_, type)}
+
+    def __call__(self, t: Any, build: Callable[[Any], T]) -> T:
+        r = self.built.get(t)
+        if r is not None:
+            return r
+        forward = self.in_progress.get(t)
+        if forward is not None:
+            return forward  # type: ignore
+        forward = self.in_progress[t] = Forward(t)
+        try:
+            r = build(t)
+        finally:
+            del self.in_progress[t]
+        forward.f = r  # type: ignore
+        self.built[t] = r
+        return r
+
+
 @dataclass
 class TypeTree(Generic[T]):
     """
     `simple_type_lookup`: a type to callable look-up. Must return a `T` value.
     `compound_type_lookup`: recursively handle compound types like `list` and `tuple`.
     `other_f`: a function to take a type and return a `T` value
+
+    Results are memoized per type in `memo`.
     """
 
     simple_type_lookup: SimpleTypeLookup[T]
     compound_lookup: CompoundLookup[T]
     other_handler: OtherHandler[T]
+    memo: TypeMemo[T] = field(default_factory=TypeMemo)
 
     def __call__(self, t: Type) -> T:
         """
@@ -38,6 +181,9 @@ class TypeTree(Generic[T]):
         This function is helpful for run-time building a complex function that operates
         on a complex type out of simpler functions that operate on base types.
         """
+        return self.memo(t, self.build)
+
+    def build(self, t: Type) -> T:
         origin: None | Type = get_origin(t)
         if origin is not None:
             f = self.compound_lookup.get(origin)
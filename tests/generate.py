@@ -1,8 +1,15 @@
+from typing import List, Sequence
+
 import hashlib
 import hmac
 
 from chia_base.atoms import bytes32
-from chia_base.bls12_381 import BLSPublicKey, BLSSecretExponent
+from chia_base.bls12_381 import BLSPublicKey, BLSSecretExponent, BLSSignature
+from chia_base.core import Coin, CoinSpend
+
+from hsms.cmds.hsm_test_spend import unsigned_spend_for_public_keys
+from hsms.core.unsigned_spend import UnsignedSpend
+from hsms.process.sign import sign
 
 
 def bytes32_generate(nonce: int, namespace: str = "bytes32") -> bytes32:
@@ -23,3 +30,35 @@ def se_generate(nonce: int, namespace: str = "BLSSecretExponent") -> BLSSecretEx
 
 def pk_generate(nonce: int, namespace: str = "BLSPublicKey") -> BLSPublicKey:
     return se_generate(nonce, namespace).public_key()
+
+
+def secrets_generate(count: int) -> List[BLSSecretExponent]:
+    return [se_generate(_) for _ in range(count)]
+
+
+def unsigned_spend_generate(
+    coin_count: int, secrets: Sequence[BLSSecretExponent]
+) -> UnsignedSpend:
+    """
+    An `hsm_test_spend` spend of `coin_count` coins, each locked to every
+    one of `secrets`.
+    """
+    unsigned_spend = unsigned_spend_for_public_keys([_.public_key() for _ in secrets])
+    coin_spend = unsigned_spend.coin_spends[0]
+    coin = coin_spend.coin
+    unsigned_spend.coin_spends = [
+        CoinSpend(
+            Coin(bytes32_generate(_, "parent"), coin.puzzle_hash, coin.amount),
+            coin_spend.puzzle_reveal,
+            coin_spend.solution,
+        )
+        for _ in range(coin_count)
+    ]
+    return unsigned_spend
+
+
+def partial_signature(
+    unsigned_spend: UnsignedSpend, secrets: Sequence[BLSSecretExponent]
+) -> BLSSignature:
+    signature_infos = sign(unsigned_spend, secrets)
+    return sum([_.signature for _ in signature_infos], start=BLSSignature.zero())
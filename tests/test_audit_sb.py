@@ -0,0 +1,118 @@
+import io
+import json
+import pathlib
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from chia_base.bls12_381 import BLSSignature
+from chia_base.cbincode import to_bytes
+from chia_base.core import Coin, CoinSpend, SpendBundle
+
+from hsms.cmds import hsm_audit_sb
+from hsms.cmds.hsmmerge import create_spend_bundle
+from hsms.core.signing_hints import SumHint
+from hsms.core.unsigned_spend import UnsignedSpend
+from hsms.debug.audit_spend_bundle import audit_spend_bundle
+from hsms.debug.debug_spend_bundle import AGG_SIG_ME_ADDITIONAL_DATA
+from hsms.process.sign import sign
+from hsms.puzzles.conlang import CREATE_COIN
+from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    DEFAULT_HIDDEN_PUZZLE_HASH,
+    calculate_synthetic_offset,
+    puzzle_for_public_key_and_hidden_puzzle_hash,
+    solution_for_conditions,
+)
+from hsms.util.executor import windowed_map
+
+from .generate import bytes32_generate, se_generate
+
+
+def make_spend_bundle(nonce: int) -> SpendBundle:
+    se = se_generate(nonce)
+    pk = se.public_key()
+    puzzle = puzzle_for_public_key_and_hidden_puzzle_hash(
+        pk, DEFAULT_HIDDEN_PUZZLE_HASH
+    )
+    coin = Coin(bytes32_generate(nonce), puzzle.tree_hash(), 1000)
+    conditions = [
+        [CREATE_COIN, bytes32_generate(nonce, "dest"), 600],
+        [CREATE_COIN, bytes32_generate(nonce, "change"), 400],
+    ]
+    coin_spend = CoinSpend(coin, puzzle, solution_for_conditions(conditions))
+    sum_hints = [
+        SumHint([pk], calculate_synthetic_offset(pk, DEFAULT_HIDDEN_PUZZLE_HASH))
+    ]
+    us = UnsignedSpend([coin_spend], sum_hints, [], AGG_SIG_ME_ADDITIONAL_DATA)
+    signatures = [_.signature for _ in sign(us, [se])]
+    return create_spend_bundle(us, signatures)
+
+
+def test_audit_spend_bundle():
+    sb = make_spend_bundle(1)
+    audit = audit_spend_bundle(sb, "good")
+    assert audit.validates
+    assert audit.error is None
+    assert audit.coins_spent == 1
+    assert audit.coins_created == 2
+    assert audit.cost > 0
+
+    bad_sb = SpendBundle(sb.coin_spends, BLSSignature.zero())
+    audit = audit_spend_bundle(bad_sb, "bad")
+    assert not audit.validates
+    assert audit.error == "aggregated signature check failed"
+
+
+def run_audit(argv):
+    f = io.StringIO()
+    with redirect_stdout(f):
+        r = hsm_audit_sb.main(argv)
+    return r, f.getvalue()
+
+
+def test_hsm_audit_sb():
+    good = [to_bytes(make_spend_bundle(_)).hex() for _ in range(3)]
+    bad = to_bytes(SpendBundle([], BLSSignature.generator())).hex()
+    with tempfile.TemporaryDirectory() as d:
+        path = pathlib.Path(d)
+        bundles = path / "bundles"
+        bundles.mkdir()
+        for idx, h in enumerate(good):
+            (bundles / f"{idx}.hex").write_text(h)
+        jsonl = path / "day.jsonl"
+        jsonl.write_text(
+            "\n".join(
+                [json.dumps(dict(spend_bundle=good[0])), json.dumps(good[1]), good[2]]
+            )
+        )
+
+        r, output = run_audit(["-j", "1", str(bundles), str(jsonl)])
+        assert r == 0
+        assert "6 spend bundles, 0 failed" in output
+
+        r, output = run_audit(["-j", "2", str(jsonl)])
+        assert r == 0
+        assert "3 spend bundles, 0 failed" in output
+
+        jsonl.write_text(f"{good[0]}\n{bad}\nnot-hex\n")
+        r, output = run_audit(["-j", "1", str(jsonl)])
+        assert r == 1
+        assert "3 spend bundles, 2 failed" in output
+        assert "can't parse" in output
+
+
+def test_windowed_map():
+    taken = []
+
+    def items():
+        for _ in range(100):
+            taken.append(_)
+            yield _
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = windowed_map(executor, lambda x: x * x, items(), 4)
+        assert next(results) == 0
+        # the rest of the input hasn't been read yet
+        assert len(taken) == 4
+        assert list(results) == [_ * _ for _ in range(1, 100)]
@@ -0,0 +1,31 @@
+import json
+
+from hsms.bench.suite import (
+    results_as_json,
+    run_suite,
+    secret_exponents,
+    synthetic_unsigned_spend,
+)
+from hsms.core.unsigned_spend import UnsignedSpend
+
+
+def test_synthetic_unsigned_spend():
+    unsigned_spend = synthetic_unsigned_spend(5, secret_exponents())
+    assert len(unsigned_spend.coin_spends) == 5
+    assert len(set(_.coin.name() for _ in unsigned_spend.coin_spends)) == 5
+    assert UnsignedSpend.from_bytes(bytes(unsigned_spend)) == unsigned_spend
+
+
+def test_run_suite():
+    results = run_suite([1, 3], min_rounds=2, max_rounds=2, min_time=0)
+    assert len(results) == 20
+    d = json.loads(results_as_json(results))
+    names = [_["name"] for _ in d["benchmarks"]]
+    assert "sign[3]" in names
+    assert "a2b_qrint[1]" in names
+    for b in d["benchmarks"]:
+        assert len(b["samples"]) == 2
+        assert b["q1"] <= b["median"] <= b["q3"]
+
+    results = run_suite([1], ["sign"], min_rounds=1, max_rounds=1, min_time=0)
+    assert [_.name for _ in results] == ["sign[1]"]
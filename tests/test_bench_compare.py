@@ -0,0 +1,74 @@
+import json
+
+from hsms.bench.compare import (
+    IMPROVEMENT,
+    MISSING,
+    NEW,
+    REGRESSION,
+    UNCHANGED,
+    Timing,
+    compare_timings,
+    main,
+    markdown_table,
+)
+
+
+def write_results(path, timings):
+    benchmarks = [
+        dict(name=name, median=median, q1=q1, q3=q3, samples=[median])
+        for name, (q1, median, q3) in timings.items()
+    ]
+    with open(path, "w") as f:
+        json.dump(dict(benchmarks=benchmarks), f)
+    return str(path)
+
+
+BASELINE = {
+    "sign[1]": (0.9e-3, 1e-3, 1.1e-3),
+    "from_bytes[1]": (90e-6, 100e-6, 110e-6),
+    "b2a_qrint[1]": (0.9, 1.0, 1.1),
+    "noisy[1]": (0.5, 1.0, 2.0),
+    "dropped[1]": (1.0, 1.0, 1.0),
+}
+
+
+def test_compare_timings():
+    current = {
+        "sign[1]": (1.4e-3, 1.5e-3, 1.6e-3),
+        "from_bytes[1]": (50e-6, 60e-6, 70e-6),
+        "b2a_qrint[1]": (0.95, 1.05, 1.15),
+        "noisy[1]": (1.0, 1.5, 2.5),
+        "added[1]": (1.0, 1.0, 1.0),
+    }
+    comparisons = compare_timings(
+        {k: Timing(m, q1, q3) for k, (q1, m, q3) in BASELINE.items()},
+        {k: Timing(m, q1, q3) for k, (q1, m, q3) in current.items()},
+    )
+    statuses = {_.name: _.status for _ in comparisons}
+    assert statuses == {
+        "sign[1]": REGRESSION,
+        "from_bytes[1]": IMPROVEMENT,
+        "b2a_qrint[1]": UNCHANGED,
+        "noisy[1]": UNCHANGED,
+        "dropped[1]": MISSING,
+        "added[1]": NEW,
+    }
+    table = markdown_table(comparisons)
+    assert "| sign[1] | 1 ms | 1.5 ms | +50.0% | **regression** |" in table
+    assert "| from_bytes[1] | 100 µs | 60 µs | -40.0% | **improvement** |" in table
+    assert "| dropped[1] | 1 s | - | - | **missing** |" in table
+
+
+def test_main(tmp_path, capsys):
+    baseline = write_results(tmp_path / "baseline.json", BASELINE)
+    assert main([baseline, baseline]) == 0
+
+    current = dict(BASELINE)
+    current["sign[1]"] = (2e-3, 2.1e-3, 2.2e-3)
+    current = write_results(tmp_path / "current.json", current)
+    capsys.readouterr()
+    assert main(["-r", baseline, current]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert lines[2].startswith("| sign[1] |")
+    assert main(["-t", "2", baseline, current]) == 0
@@ -1,7 +1,9 @@
 from dataclasses import dataclass, field
 from typing import List, Optional, Union, Tuple
 
+import inspect
 import random
+import tracemalloc
 
 import pytest
 
@@ -16,6 +18,7 @@ from hsms.clvm_serde import (
     tuple_frugal,
     EncodingError,
     Frugal,
+    program_from_view,
 )
 from hsms.core.signing_hints import SumHint, PathHint
 from hsms.core.unsigned_spend import (
@@ -176,7 +179,7 @@ def test_ser(pep604: bool):
 
     @dataclass
     class Bar:
-        a: Union[int, str]
+        a: Union[List[int], List[str]]
 
     with pytest.raises(ValueError):
         _ = to_program_for_type(Bar)
@@ -418,3 +421,187 @@ def test_failures():
     fp = from_program_for_type(Foo)
     with pytest.raises(EncodingError):
         fp(Program.to([]))
+
+
+@dataclass
+class Tree:
+    value: int
+    children: List["Tree"]
+
+
+def test_type_registry():
+    assert to_program_for_type(UnsignedSpend) is to_program_for_type(UnsignedSpend)
+    assert from_program_for_type(List[int]) is from_program_for_type(List[int])
+
+    tp = to_program_for_type(Tree)
+    fp = from_program_for_type(Tree)
+    tree = Tree(1, [Tree(2, []), Tree(3, [Tree(4, [])])])
+    p = tp(tree)
+    assert p == Program.to([1, [[2, []], [3, [[4, []]]]]])
+    assert fp(p) == tree
+
+
+def test_recursive_policy():
+    @dataclass
+    class Policy:
+        m: int
+        public_keys: List[bytes]
+        subpolicies: List["Policy"]
+
+    tp = to_program_for_type(Policy)
+    fp = from_program_for_type(Policy)
+
+    policy = Policy(2, [b"a", b"b"], [Policy(1, [b"c"], []), Policy(1, [], [])])
+    assert fp(tp(policy)) == policy
+
+    def nested(depth):
+        policy = Policy(1, [], [])
+        for _ in range(depth):
+            policy = Policy(1, [], [policy])
+        return policy
+
+    # far deeper than the recursion limit would allow
+    depth = 5000
+    p = Program.from_bytes(bytes(tp(nested(depth))))
+    decoded = fp(p)
+    for _ in range(depth):
+        assert decoded.m == 1
+        (decoded,) = decoded.subpolicies
+    assert decoded == Policy(1, [], [])
+
+
+def test_mutually_recursive():
+    @dataclass
+    class Leaf:
+        value: int
+        branch: Optional["Branch"] = field(default=None, metadata=dict(key="b"))
+
+    @dataclass
+    class Branch:
+        leaves: List[Leaf]
+
+    tp = to_program_for_type(Branch)
+    fp = from_program_for_type(Branch)
+    tree = Branch([Leaf(1), Leaf(2, Branch([Leaf(3)]))])
+    assert fp(tp(tree)) == tree
+
+    depth = 5000
+    for _ in range(depth):
+        tree = Branch([Leaf(0, tree)])
+    decoded = fp(Program.from_bytes(bytes(tp(tree))))
+    for _ in range(depth):
+        (leaf,) = decoded.leaves
+        decoded = leaf.branch
+    assert decoded.leaves[1].branch == Branch([Leaf(3)])
+
+
+def test_zero_copy():
+    r = random.Random(33)
+    big_atom = r.randbytes(1 << 20)
+    puzzle = Program.to(1)
+    solution = Program.to([big_atom, 5])
+    coin = Coin(r.randbytes(32), puzzle.tree_hash(), 1000)
+    unsigned_spend = UnsignedSpend(
+        [CoinSpend(coin, puzzle, solution)],
+        [
+            SumHint(
+                [BLSSecretExponent.from_int(1).public_key()],
+                BLSSecretExponent.from_int(5),
+            )
+        ],
+        [],
+        b"suffix",
+    )
+    blob = bytes(unsigned_spend)
+
+    peaks = []
+    for zero_copy in (False, True):
+        tracemalloc.start()
+        us = UnsignedSpend.from_bytes(blob, zero_copy=zero_copy)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert us == unsigned_spend
+        assert bytes(us) == blob
+    assert peaks[0] > len(big_atom)
+    assert peaks[1] < len(big_atom) // 10
+
+    atom = us.coin_spends[0].solution.first().atom
+    assert isinstance(atom, memoryview)
+    assert atom == big_atom
+    assert isinstance(us.agg_sig_me_network_suffix, bytes)
+
+    p = program_from_view(bytes(Program.to(["hello", 1000, b"\xff"])))
+    assert from_program_for_type(Tuple[str, int, bytes])(p) == ("hello", 1000, b"\xff")
+
+
+def test_clvm_tree_internals():
+    """
+    `ViewTree` relies on these details of `clvm_rs.clvm_tree.CLVMTree`, which
+    aren't public API. If this fails, fix `ViewTree` before relaxing the
+    `clvm_rs` pin in `pyproject.toml`.
+    """
+    from clvm_rs.clvm_tree import CLVMTree  # type: ignore
+
+    program = Program.to([b"abc", 1000])
+    tree = CLVMTree.from_bytes(bytes(program))
+    assert list(inspect.signature(CLVMTree.__init__).parameters) == [
+        "self",
+        "blob",
+        "int_tuples",
+        "tree_hashes",
+        "index",
+    ]
+    for name in ["blob", "int_tuples", "tree_hashes", "index"]:
+        assert hasattr(tree, name), name
+    assert tree._cached_sha256_treehash == program.tree_hash()
+    # children are built with `self.__class__`, so they're `ViewTree`s too
+    view = program_from_view(bytes(program))
+    assert view.pair[0].atom == b"abc"
+    assert isinstance(view.pair[0].atom, memoryview)
+    atom = CLVMTree.from_bytes(bytes(Program.to(5)))
+    assert atom._pair is None
+
+
+def test_tagged_union():
+    @dataclass
+    class Foo:
+        a: int
+
+    @dataclass
+    class Bar:
+        b: str
+        c: List[int]
+
+    class SubFoo(Foo):
+        pass
+
+    Message = Union[Foo, Bar, int, None]
+    tp = to_program_for_type(Message)
+    fp = from_program_for_type(Message)
+
+    for item, p in [
+        (Foo(5), (0, [5])),
+        (Bar("x", [1, 2]), (1, ["x", [1, 2]])),
+        (1000, (2, 1000)),
+        (None, (3, 0)),
+    ]:
+        assert tp(item) == Program.to(p)
+        assert fp(Program.to(p)) == item
+    assert fp(tp(SubFoo(7))) == Foo(7)
+
+    with pytest.raises(EncodingError):
+        tp("not a variant")
+    with pytest.raises(EncodingError):
+        fp(Program.to((4, 0)))
+    with pytest.raises(EncodingError):
+        fp(Program.to(0))
+
+    @dataclass
+    class Envelope:
+        items: List[Union[UnsignedSpend, BLSSecretExponent]]
+
+    se = BLSSecretExponent.from_int(1)
+    us = UnsignedSpend([], [], [], b"")
+    envelope = Envelope([us, se, us])
+    p = to_program_for_type(Envelope)(envelope)
+    assert from_program_for_type(Envelope)(p) == envelope
@@ -0,0 +1,77 @@
+import io
+
+import pytest
+
+from hsms.bench.compression import compression_table, sample_unsigned_spends
+from hsms.util.compression import (
+    COMPRESSION_FOR_NAME,
+    COMPRESSIONS,
+    MAX_DECOMPRESSED_LENGTH,
+    compression_for_name,
+    preset_dictionary,
+)
+
+
+def test_round_trip():
+    blobs = [bytes(us) for _, us in sample_unsigned_spends()] + [b"\0" * 5000]
+    for compression in COMPRESSIONS:
+        for blob in blobs:
+            compressed = compression.compress(blob)
+            assert compression.decompress(compressed, len(blob)) == blob
+            if len(blob) > 0 and compression.name != "none":
+                with pytest.raises(ValueError):
+                    compression.decompress(compressed, len(blob) - 1)
+
+
+def test_declared_length_is_capped():
+    bomb = b"\0" * (MAX_DECOMPRESSED_LENGTH + 1)
+    for compression in COMPRESSIONS:
+        if compression.name == "none":
+            continue
+        compressed = compression.compress(bomb)
+        for length in [0, -1, MAX_DECOMPRESSED_LENGTH + 1]:
+            with pytest.raises(ValueError):
+                compression.decompress(compressed, length)
+        # the whole stream is never inflated
+        with pytest.raises(ValueError):
+            compression.decompress(compressed, MAX_DECOMPRESSED_LENGTH)
+
+
+def test_zstd_ignores_declared_content_size():
+    zstandard = pytest.importorskip("zstandard")
+    blob = b"\0" * 100000
+    for name in ["zstd", "zstd-dict"]:
+        compression = COMPRESSION_FOR_NAME[name]
+        compressed = compression.compress(blob)
+        # the frame header says how big it is; the declared length still wins
+        assert zstandard.frame_content_size(compressed) == len(blob)
+        assert compression.decompress(compressed, len(blob)) == blob
+        with pytest.raises(ValueError):
+            compression.decompress(compressed, 1000)
+
+
+def test_preset_dictionary():
+    assert len(preset_dictionary()) > 0
+    zlib_c = COMPRESSION_FOR_NAME["zlib"]
+    zlib_dict_c = COMPRESSION_FOR_NAME["zlib-dict"]
+    for _, unsigned_spend in sample_unsigned_spends():
+        blob = bytes(unsigned_spend)
+        assert len(zlib_dict_c.compress(blob)) < len(zlib_c.compress(blob))
+
+    # a stream compressed with a dictionary can't be read without it
+    with pytest.raises(ValueError):
+        zlib_c.decompress(zlib_dict_c.compress(blob), len(blob))
+
+
+def test_compression_for_name():
+    assert compression_for_name("zlib-dict") is COMPRESSION_FOR_NAME["zlib-dict"]
+    with pytest.raises(ValueError):
+        compression_for_name("lzma")
+
+
+def test_compression_table():
+    f = io.StringIO()
+    compression_table([200], f)
+    lines = f.getvalue().splitlines()
+    assert lines[0].split("\t") == ["sample", "raw", "backend", "bytes", "chunks@200"]
+    assert len(lines) == 1 + 7 * (1 + len(COMPRESSIONS))
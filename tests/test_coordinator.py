@@ -0,0 +1,231 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import asyncio
+
+from chia_base.bls12_381 import BLSSecretExponent
+
+from hsms.cmds.hsm_coordinator import handle_request, process_directory, serve_socket
+from hsms.cmds.hsm_test_spend import unsigned_spend_for_public_keys
+from hsms.core.envelope import envelope_for_item
+from hsms.core.unsigned_spend import SignatureInfo
+from hsms.process.coordinator import Coordinator
+from hsms.process.sign import (
+    generate_verify_pairs,
+    sign,
+    signature_metadata_by_signer,
+)
+from hsms.util.qrint_encoding import b2a_qrint
+
+from .generate import partial_signature, secrets_generate, unsigned_spend_generate
+
+SECRETS = secrets_generate(3)
+
+
+def test_coordinator():
+    async def run():
+        spend_bundles = []
+        coordinator = Coordinator(lambda *args: spend_bundles.append(args))
+        unsigned_spend = unsigned_spend_for_public_keys(
+            [_.public_key() for _ in SECRETS]
+        )
+        pending_spend = await coordinator.add_unsigned_spend(unsigned_spend)
+        assert (await coordinator.add_unsigned_spend(unsigned_spend)) is pending_spend
+        spend_id = pending_spend.spend_id
+        assert len(pending_spend.missing_signers()) == 3
+
+        # a signature from someone else is rejected, naming the signer
+        stranger = BLSSecretExponent.from_int(999)
+        bad = partial_signature(unsigned_spend, [stranger])
+        for signers in [None, [SECRETS[0].public_key()]]:
+            try:
+                await coordinator.add_partial_signature(spend_id, bad, signers)
+                assert 0
+            except ValueError as ex:
+                if signers:
+                    assert signers[0].as_bech32m() in str(ex)
+
+        # partials are matched to signers without being told who sent them
+        first = partial_signature(unsigned_spend, [SECRETS[1]])
+        signers = await coordinator.add_partial_signature(spend_id, first)
+        assert signers == [SECRETS[1].public_key()]
+        assert not pending_spend.spend_bundle.done()
+
+        # one signature can cover several signers
+        rest = partial_signature(unsigned_spend, [SECRETS[0], SECRETS[2]])
+        signers = await coordinator.add_partial_signature(spend_id, rest)
+        assert len(signers) == 2
+
+        spend_bundle = await pending_spend.spend_bundle
+        assert spend_bundles == [(spend_id, spend_bundle)]
+        assert spend_id not in coordinator.pending
+        pairs = [
+            pair
+            for coin_spend in spend_bundle.coin_spends
+            for pair in generate_verify_pairs(
+                coin_spend, unsigned_spend.agg_sig_me_network_suffix
+            )
+        ]
+        assert spend_bundle.aggregated_signature.verify(pairs)
+
+    asyncio.run(run())
+
+
+def test_hsms_with_several_keys():
+    async def run():
+        public_keys = [_.public_key() for _ in SECRETS]
+        unsigned_spend = unsigned_spend_for_public_keys(public_keys)
+        # one `hsms` holds two of the three keys
+        two = partial_signature(unsigned_spend, [SECRETS[0], SECRETS[2]])
+        for signers in [None, [public_keys[0], public_keys[2]]]:
+            coordinator = Coordinator()
+            spend_id = (await coordinator.add_unsigned_spend(unsigned_spend)).spend_id
+            await coordinator.add_partial_signature(
+                spend_id, partial_signature(unsigned_spend, [SECRETS[1]])
+            )
+            matched = await coordinator.add_partial_signature(spend_id, two, signers)
+            assert set(matched) == {public_keys[0], public_keys[2]}
+            assert spend_id not in coordinator.pending
+
+        # found without being told who sent it, before the other partial
+        coordinator = Coordinator()
+        pending_spend = await coordinator.add_unsigned_spend(unsigned_spend)
+        matched = await coordinator.add_partial_signature(pending_spend.spend_id, two)
+        assert matched == [public_keys[0], public_keys[2]]
+        assert pending_spend.missing_signers() == [public_keys[1]]
+
+    asyncio.run(run())
+
+
+def test_unsigned_spend_off_the_loop():
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, f, *args, **kwargs):
+            calls.append(f)
+            return super().submit(f, *args, **kwargs)
+
+    async def run():
+        with RecordingExecutor() as executor:
+            coordinator = Coordinator(executor=executor)
+            unsigned_spend = unsigned_spend_for_public_keys(
+                [_.public_key() for _ in SECRETS]
+            )
+            await coordinator.add_unsigned_spend(unsigned_spend)
+        assert calls == [signature_metadata_by_signer]
+
+    calls = []
+    asyncio.run(run())
+
+
+def test_many_pending():
+    async def run():
+        coordinator = Coordinator()
+        public_keys = [_.public_key() for _ in SECRETS[:2]]
+        unsigned_spends = []
+        for index in range(100):
+            unsigned_spend = unsigned_spend_for_public_keys(public_keys)
+            unsigned_spend.agg_sig_me_network_suffix = bytes([index])
+            unsigned_spends.append(unsigned_spend)
+            await coordinator.add_unsigned_spend(unsigned_spend)
+        assert len(coordinator.pending) == 100
+        unsigned_spend = unsigned_spends[50]
+        spend_id = (await coordinator.add_unsigned_spend(unsigned_spend)).spend_id
+        await asyncio.gather(
+            *[
+                coordinator.add_partial_signature(
+                    spend_id, partial_signature(unsigned_spend, [_])
+                )
+                for _ in SECRETS[:2]
+            ]
+        )
+        assert len(coordinator.pending) == 99
+
+    asyncio.run(run())
+
+
+def test_requests(tmp_path):
+    async def run():
+        spend_bundles = []
+        coordinator = Coordinator(lambda *args: spend_bundles.append(args))
+        unsigned_spend = unsigned_spend_for_public_keys(
+            [_.public_key() for _ in SECRETS[:2]]
+        )
+        blob = b2a_qrint(envelope_for_item(unsigned_spend))
+        reply = await handle_request(coordinator, f"us {blob}")
+        assert reply.startswith("pending ") and reply.endswith(" 2")
+        spend_id = reply.split()[1]
+        assert (await handle_request(coordinator, "nonsense")).startswith("error")
+        reply = await handle_request(coordinator, f"sig {spend_id} 1234")
+        assert reply.startswith("error")
+
+        sig = bytes(partial_signature(unsigned_spend, [SECRETS[0]])).hex()
+        signer = SECRETS[0].public_key().as_bech32m()
+        reply = await handle_request(coordinator, f"sig {spend_id} {sig} {signer}")
+        assert reply == f"ok {spend_id} 1/2"
+        assert await handle_request(coordinator, "status") == f"pending {spend_id} 1/2"
+
+        # the last one arrives over a socket
+        path = str(tmp_path / "socket")
+        server = await serve_socket(coordinator, path)
+        sig = b2a_qrint(bytes(partial_signature(unsigned_spend, [SECRETS[1]])))
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(f"sig {spend_id} {sig}\n".encode())
+        reply = await reader.readline()
+        assert reply.decode().strip() == f"complete {spend_id}"
+        writer.close()
+        server.close()
+        assert len(spend_bundles) == 1
+
+        # and through a watched directory
+        (tmp_path / "requests").mkdir()
+        (tmp_path / "requests" / "1").write_text(f"us {blob}\n")
+        # still being written
+        (tmp_path / "requests" / "2.tmp").write_text("us ")
+        with open(tmp_path / "out.txt", "w") as f:
+            await process_directory(coordinator, tmp_path / "requests", f)
+        assert (tmp_path / "requests" / "1.done").exists()
+        assert (tmp_path / "requests" / "2.tmp").exists()
+        assert (tmp_path / "out.txt").read_text() == f"1: pending {spend_id} 2\n"
+
+    asyncio.run(run())
+
+
+def test_signature_infos():
+    async def run():
+        coordinator = Coordinator()
+        public_keys = [_.public_key() for _ in SECRETS[:2]]
+        unsigned_spend = unsigned_spend_generate(3, SECRETS[:2])
+        pending_spend = await coordinator.add_unsigned_spend(unsigned_spend)
+        spend_id = pending_spend.spend_id
+
+        signature_infos = sign(unsigned_spend, SECRETS[:1])
+        assert len(signature_infos) == 3
+        bad = signature_infos[1]
+        bad = SignatureInfo(
+            bad.signature, bad.partial_public_key, bad.final_public_key, b"x"
+        )
+        try:
+            await coordinator.add_signature_infos(spend_id, [bad])
+            assert 0
+        except ValueError as ex:
+            assert bad.partial_public_key.as_bech32m() in str(ex)
+
+        # a signer counts once all its messages are signed
+        assert (
+            await coordinator.add_signature_infos(spend_id, signature_infos[:2]) == []
+        )
+        signers = await coordinator.add_signature_infos(spend_id, signature_infos[2:])
+        assert signers == public_keys[:1]
+
+        # the other signer can still send an aggregate
+        signature = partial_signature(unsigned_spend, SECRETS[1:2])
+        await coordinator.add_partial_signature(spend_id, signature)
+        spend_bundle = await pending_spend.spend_bundle
+        pairs = [
+            pair
+            for coin_spend in spend_bundle.coin_spends
+            for pair in generate_verify_pairs(
+                coin_spend, unsigned_spend.agg_sig_me_network_suffix
+            )
+        ]
+        assert spend_bundle.aggregated_signature.verify(pairs)
+
+    asyncio.run(run())
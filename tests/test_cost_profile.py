@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+
+from chia_base.core import Coin, CoinSpend
+
+from clvm_rs import Program  # type: ignore
+
+from hsms.process.cost_profile import (
+    aggregate_by_module,
+    profile_coin_spends,
+    profiles_as_csv,
+    profiles_as_json,
+)
+from hsms.process.sign import cost_and_conditions_for_coin_spend
+from hsms.puzzles.conlang import CREATE_COIN
+from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    MOD,
+    puzzle_for_synthetic_public_key,
+    solution_for_conditions,
+)
+
+from .generate import bytes32_generate, pk_generate
+
+
+def coin_spend_for_puzzle(idx: int, puzzle: Program, solution: Program) -> CoinSpend:
+    coin = Coin(bytes32_generate(idx), puzzle.tree_hash(), 1000 + idx)
+    return CoinSpend(coin, puzzle, solution)
+
+
+def test_cost_profile():
+    conditions = [[CREATE_COIN, bytes32_generate(_, "dest"), 10] for _ in range(3)]
+    coin_spends = [
+        coin_spend_for_puzzle(
+            idx,
+            puzzle_for_synthetic_public_key(pk_generate(idx)),
+            solution_for_conditions(conditions),
+        )
+        for idx in range(4)
+    ]
+    # `(q . conditions)`
+    p2_conditions = Program.to((1, [[CREATE_COIN, bytes32_generate(9), 5]]))
+    coin_spends.append(coin_spend_for_puzzle(9, p2_conditions, Program.to(0)))
+
+    profiles = profile_coin_spends(coin_spends)
+    assert [_.coin_name for _ in profiles] == [_.coin.name() for _ in coin_spends]
+    for profile, coin_spend in zip(profiles, coin_spends):
+        cost, r = cost_and_conditions_for_coin_spend(coin_spend)
+        assert profile.cost == cost
+        assert profile.condition_count == r.list_len()
+        assert profile.puzzle_size == len(bytes(coin_spend.puzzle_reveal))
+        assert profile.solution_size == len(bytes(coin_spend.solution))
+        assert profile.run_time >= 0
+
+    by_module = aggregate_by_module(profiles)
+    assert len(by_module) == 2
+    standard = by_module[0]
+    assert standard.module_hash == MOD.tree_hash()
+    assert standard.coin_spend_count == 4
+    assert standard.cost == sum(_.cost for _ in profiles[:4])
+    assert by_module[1].module_hash == p2_conditions.tree_hash()
+    assert by_module[1].condition_count == 1
+
+    rows = list(csv.DictReader(io.StringIO(profiles_as_csv(by_module))))
+    assert [int(_["coin_spend_count"]) for _ in rows] == [4, 1]
+    assert rows[0]["module_hash"] == MOD.tree_hash().hex()
+
+    items = json.loads(profiles_as_json(profiles))
+    assert items[0]["coin_name"] == coin_spends[0].coin.name().hex()
+    assert items[-1]["cost"] == profiles[-1].cost
+
+    assert profiles_as_csv([]) == ""
@@ -0,0 +1,43 @@
+from clvm_rs import Program  # type: ignore
+
+from hsms.clvm.curry_hash import CurriedTreeHasher
+from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    DEFAULT_HIDDEN_PUZZLE_HASH,
+    MOD,
+    puzzle_for_public_key_and_hidden_puzzle_hash,
+    puzzle_for_synthetic_public_key,
+    puzzle_hash_for_synthetic_public_key,
+    puzzle_hashes_for_paths,
+)
+
+from .generate import pk_generate
+
+
+def test_curry_hash():
+    mod = Program.to([1, (2, 3), "foo"])
+    hasher = CurriedTreeHasher(mod)
+    for args in [[], [5], [b"abc", [1, 2]], [1, 2, 3, (4, 5)]]:
+        arg_hashes = [Program.to(_).tree_hash() for _ in args]
+        assert hasher.curry_hash(*arg_hashes) == mod.curry(*args).tree_hash()
+    atoms = [b"", b"hello", bytes(100)]
+    assert hasher.curry_atom_hash(*atoms) == mod.curry(*atoms).tree_hash()
+
+
+def test_standard_puzzle_hash():
+    for idx in range(10):
+        pk = pk_generate(idx)
+        expected = puzzle_for_synthetic_public_key(pk).tree_hash()
+        assert puzzle_hash_for_synthetic_public_key(pk) == expected
+        assert MOD.curry(bytes(pk)).tree_hash() == expected
+
+
+def test_puzzle_hashes_for_paths():
+    root_public_key = pk_generate(1)
+    paths = [[1, 2, _] for _ in range(5)] + [[1, 3], [], [7, 0, 0]]
+    expected = [
+        puzzle_for_public_key_and_hidden_puzzle_hash(
+            root_public_key.child_for_path(_), DEFAULT_HIDDEN_PUZZLE_HASH
+        ).tree_hash()
+        for _ in paths
+    ]
+    assert puzzle_hashes_for_paths(root_public_key, paths) == expected
@@ -0,0 +1,28 @@
+from hsms.process.derivation import derive_rows
+from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    DEFAULT_HIDDEN_PUZZLE,
+    puzzle_for_public_key_and_hidden_puzzle,
+)
+from hsms.util.address import address_for_puzzle_hash
+
+from .generate import pk_generate
+
+
+def test_derive_rows():
+    root_public_key = pk_generate(1)
+    path_prefix = [12381, 8444, 2]
+    rows = list(derive_rows(root_public_key, path_prefix, 10, 7, workers=1))
+    assert [_.index for _ in rows] == list(range(10, 17))
+    for row in rows:
+        public_key = root_public_key.child_for_path(path_prefix + [row.index])
+        puzzle = puzzle_for_public_key_and_hidden_puzzle(
+            public_key, DEFAULT_HIDDEN_PUZZLE
+        )
+        assert row.public_key == bytes(public_key)
+        assert row.puzzle_hash == puzzle.tree_hash()
+        assert row.address == address_for_puzzle_hash(puzzle.tree_hash())
+
+    parallel_rows = derive_rows(
+        root_public_key, path_prefix, 10, 7, workers=2, batch_size=2
+    )
+    assert list(parallel_rows) == rows
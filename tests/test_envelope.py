@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+from typing import List
+
+import zlib
+
+import pytest
+
+from chia_base.bls12_381 import BLSSignature
+from chia_base.core import Coin, CoinSpend
+from clvm_rs import Program  # type: ignore
+
+from hsms.cmds.hsmmerge import signature_from_blob
+from hsms.cmds.hsms import encoded_signatures, unsigned_spend_from_blob
+from hsms.core.envelope import (
+    ENVELOPE_FROM_PROGRAM,
+    ENVELOPE_TO_PROGRAM,
+    MAGIC,
+    Envelope,
+    envelope_for_item,
+    is_envelope,
+    item_for_envelope,
+)
+from hsms.core.unsigned_spend import SignatureInfo, UnsignedSpend
+from hsms.util.compression import (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB_DICT,
+)
+from hsms.util.byte_chunks import ChunkAssembler
+from hsms.util.qrint_encoding import a2b_qrint, a2b_qrint_or_hex, b2a_qrint
+
+from .generate import bytes32_generate, se_generate
+
+
+def make_unsigned_spend() -> UnsignedSpend:
+    puzzle = Program.to(1)
+    conditions = [[51, bytes32_generate(_), 1000 + _] for _ in range(20)]
+    coin = Coin(bytes32_generate(100), puzzle.tree_hash(), 100000)
+    return UnsignedSpend([CoinSpend(coin, puzzle, Program.to(conditions))], [], [])
+
+
+def test_round_trip():
+    unsigned_spend = make_unsigned_spend()
+    blob = envelope_for_item(unsigned_spend)
+    assert is_envelope(blob)
+    envelope = ENVELOPE_FROM_PROGRAM(Program.from_bytes(blob[len(MAGIC) :]))
+    assert envelope.compression == COMPRESSION_ZLIB_DICT
+    assert envelope.length == len(bytes(unsigned_spend))
+    assert item_for_envelope(blob) == unsigned_spend
+    assert item_for_envelope(blob, UnsignedSpend) == unsigned_spend
+
+    # all legacy formats still work
+    for b in (blob, bytes(unsigned_spend), envelope_for_item(unsigned_spend, 0)):
+        assert unsigned_spend_from_blob(b) == unsigned_spend
+        assert unsigned_spend_from_blob(a2b_qrint_or_hex(b.hex())) == unsigned_spend
+        assert (
+            unsigned_spend_from_blob(a2b_qrint_or_hex(b2a_qrint(b))) == unsigned_spend
+        )
+
+    # a signature doesn't compress, so it's stored as-is
+    signature = se_generate(1).sign(b"foo")
+    blob = envelope_for_item(signature)
+    envelope = ENVELOPE_FROM_PROGRAM(Program.from_bytes(blob[len(MAGIC) :]))
+    assert envelope.compression == COMPRESSION_NONE
+    assert item_for_envelope(blob, BLSSignature) == signature
+
+    with pytest.raises(ValueError):
+        item_for_envelope(blob, UnsignedSpend)
+    with pytest.raises(ValueError):
+        item_for_envelope(bytes(signature))
+    with pytest.raises(ValueError):
+        envelope_for_item(b"not a payload type")
+
+
+def test_bad_envelopes():
+    payload = bytes(Program.to(1))
+
+    def envelope_blob(*args):
+        return MAGIC + bytes(ENVELOPE_TO_PROGRAM(Envelope(*args)))
+
+    for args in [
+        (2, 0, 0, len(payload), payload),
+        (1, 100, 0, len(payload), payload),
+        (1, 0, 100, len(payload), payload),
+        (1, 0, 0, len(payload) + 1, payload),
+        # decompresses to more than the declared length
+        (1, 0, 1, 10, zlib.compress(bytes(Program.to([1] * 50)))),
+        (1, 0, 1, 10, b"not zlib"),
+        # zero would mean "no limit" to zlib
+        (1, 0, 1, 0, zlib.compress(bytes(Program.to([1] * 50)))),
+    ]:
+        with pytest.raises(ValueError):
+            item_for_envelope(envelope_blob(*args))
+
+
+def test_signature_infos():
+    secret = se_generate(7)
+    public_key = secret.public_key()
+    signature_infos = [
+        SignatureInfo(
+            secret.sign(b"message %d" % _, public_key),
+            public_key,
+            public_key,
+            b"message %d" % _,
+        )
+        for _ in range(50)
+    ]
+    blob = envelope_for_item(signature_infos)
+    assert item_for_envelope(blob, List[SignatureInfo]) == signature_infos
+    with pytest.raises(ValueError):
+        item_for_envelope(blob, BLSSignature)
+    total = sum([_.signature for _ in signature_infos], start=BLSSignature.zero())
+    assert signature_from_blob(blob) == total
+
+    # the default is still the aggregate
+    args = SimpleNamespace(signature_infos=False, max_chunk_size=None)
+    assert encoded_signatures(args, signature_infos) == [b2a_qrint(bytes(total))]
+
+    args = SimpleNamespace(signature_infos=True, max_chunk_size=None)
+    assert encoded_signatures(args, signature_infos) == [b2a_qrint(blob)]
+
+    args = SimpleNamespace(signature_infos=True, max_chunk_size=500)
+    chunks = encoded_signatures(args, signature_infos)
+    assert len(chunks) > 1
+    chunk_assembler = ChunkAssembler()
+    for chunk in chunks:
+        chunk_assembler.add_chunk(a2b_qrint(chunk))
+    assert chunk_assembler.assemble() == blob
@@ -0,0 +1,43 @@
+from chia_base.bls12_381 import BLSSecretExponent
+
+from hsms.cmds.hsm_test_spend import unsigned_spend_for_public_keys
+from hsms.cmds.hsmmerge import check_partial_signatures, create_spend_bundle
+from hsms.util import trace
+
+import pytest
+
+from .generate import partial_signature, secrets_generate
+
+SECRETS = secrets_generate(3)
+
+
+def test_check_partial_signatures():
+    unsigned_spend = unsigned_spend_for_public_keys([_.public_key() for _ in SECRETS])
+    partials = [partial_signature(unsigned_spend, [_]) for _ in SECRETS]
+
+    # good partials cost one check, however many there are
+    trace.enable()
+    try:
+        check_partial_signatures(unsigned_spend, partials)
+        spans = trace.snapshot()["spans"]
+        assert spans["verify_partial_signature"]["calls"] == 1
+    finally:
+        trace.disable()
+        trace.reset()
+    check_partial_signatures(unsigned_spend, partials[::-1])
+    # one `hsms` holding two of the keys
+    two = partial_signature(unsigned_spend, SECRETS[1:])
+    check_partial_signatures(unsigned_spend, [partials[0], two])
+
+    # a bad partial names the signer that should have sent it
+    bad = partial_signature(unsigned_spend, [BLSSecretExponent.from_int(1)])
+    with pytest.raises(ValueError) as ex:
+        create_spend_bundle(unsigned_spend, [partials[0], bad, partials[2]])
+    message = str(ex.value)
+    assert "signature 2 doesn't match any signer" in message
+    assert f"{SECRETS[1].public_key().as_bech32m()} is missing" in message
+    assert SECRETS[0].public_key().as_bech32m() not in message
+
+    with pytest.raises(ValueError) as ex:
+        check_partial_signatures(unsigned_spend, partials + partials[:1])
+    assert "was given 2 times" in str(ex.value)
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from hsms.bench.import_time import import_times, main, parse_importtime
+
+HEAVY_MODULES = [
+    "segno",
+    "chialisp_puzzles",
+    "subprocess",
+    "readline",
+    "zstandard",
+    "concurrent.futures",
+]
+
+
+def loaded_modules(module):
+    return {_[2] for _ in import_times(module)}
+
+
+def test_parse_importtime():
+    text = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   zlib",
+            "import time:       300 |        420 | hsms.cmds.qrint",
+            "unrelated noise",
+        ]
+    )
+    assert parse_importtime(text) == [
+        (120, 120, "zlib"),
+        (300, 420, "hsms.cmds.qrint"),
+    ]
+
+
+def test_lazy_imports():
+    for command in ["hsms", "hsmpk", "qrint", "hsmmerge", "hsm_dump_us"]:
+        modules = loaded_modules(f"hsms.cmds.{command}")
+        assert modules.isdisjoint(HEAVY_MODULES), command
+    modules = loaded_modules("hsms.cmds.qrint")
+    assert "hsms.clvm_serde" not in modules
+    assert "chia_base.bls12_381" not in modules
+
+
+def test_lazy_attributes():
+    from hsms.core import unsigned_spend
+    from hsms.puzzles import p2_delegated_puzzle_or_hidden_puzzle as p2
+
+    assert unsigned_spend.TO_PROGRAM is unsigned_spend.TO_PROGRAM
+    assert p2.MOD is p2.mod()
+    assert p2.MOD_CURRIED_TREE_HASHER is p2.mod_curried_tree_hasher()
+    with pytest.raises(AttributeError):
+        p2.NOT_A_PUZZLE
+
+
+def test_main(tmp_path):
+    path = tmp_path / "imports.json"
+    main(["-c", "qrint", "-n", "2", "-t", "3", "-o", str(path)])
+    with open(path) as f:
+        d = json.load(f)
+    [result] = d["benchmarks"]
+    assert result["name"] == "import qrint"
+    assert len(result["samples"]) == 2
+    assert result["q1"] <= result["median"] <= result["q3"]
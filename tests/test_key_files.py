@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from hsms.process.key_files import load_key_files
+
+from .generate import se_generate
+
+FAKE_GPG = """#!/bin/sh
+# like `gpg -d`, but the "encrypted" file is plain text and takes a while;
+# when and how long each run took is appended to `$FAKE_GPG_LOG`
+start=$(date +%s.%N)
+sleep 0.5
+for path; do :; done
+case "$path" in
+  *bad*) exit 2 ;;
+esac
+cat "$path"
+echo "$start $(date +%s.%N)" >> "$FAKE_GPG_LOG"
+"""
+
+
+def fake_gpg(tmp_path) -> str:
+    path = tmp_path / "fake-gpg"
+    path.write_text(FAKE_GPG)
+    os.chmod(path, 0o755)
+    return str(path)
+
+
+def test_load_key_files(tmp_path, monkeypatch):
+    log_path = tmp_path / "gpg.log"
+    monkeypatch.setenv("FAKE_GPG_LOG", str(log_path))
+    gpg_args = [fake_gpg(tmp_path), "-d"]
+    secrets = [se_generate(_) for _ in range(4)]
+    paths = []
+    for index, secret in enumerate(secrets):
+        path = tmp_path / f"key-{index}.se"
+        if index > 0:
+            path = path.with_suffix(".se.gpg")
+        path.write_text(secret.as_bech32m() + "\n")
+        paths.append(str(path))
+    paths.append(paths[1])
+
+    keystore, loads = load_key_files(paths, gpg_args)
+    # all the decrypts were running at once
+    intervals = [[float(_) for _ in line.split()] for line in open(log_path)]
+    assert len(intervals) == 4
+    assert max(_[0] for _ in intervals) < min(_[1] for _ in intervals)
+    assert keystore.secrets == secrets
+    assert [_.path for _ in loads] == paths
+    assert [_.added for _ in loads] == [1, 1, 1, 1, 0]
+    assert all(_.seconds >= 0.5 for _ in loads[1:])
+
+    bad_path = tmp_path / "bad.se.gpg"
+    bad_path.write_text("")
+    with pytest.raises(ValueError) as ex:
+        load_key_files(paths[:2] + [str(bad_path)], gpg_args)
+    assert str(ex.value) == f"{bad_path}: {gpg_args[0]} exited with status 2"
@@ -0,0 +1,88 @@
+import pytest
+
+from hsms.cmds.hsms import create_parser, parse_private_key_file
+from hsms.process.keystore import Keystore, parse_path_range
+from hsms.process.sign import sign
+from hsms.util import trace
+
+from .generate import se_generate, secrets_generate, unsigned_spend_generate
+
+
+def test_parse_path_range():
+    assert parse_path_range("12381/8444/2:0-1000") == ([12381, 8444, 2], range(1000))
+    assert parse_path_range(":5-7") == ([], range(5, 7))
+    for bad in ["12381/8444/2", "1/2:5", "1/x:0-3", "1:3-3"]:
+        with pytest.raises(ValueError):
+            parse_path_range(bad)
+
+
+def test_keystore_lines():
+    secrets = [se_generate(_) for _ in range(3)]
+    lines = [
+        "# comment",
+        secrets[0].as_bech32m(),
+        "",
+        f"  {secrets[1].as_bech32m()}  ",
+        secrets[0].as_bech32m(),
+    ]
+    keystore = Keystore()
+    assert keystore.add_lines(lines) == 2
+    assert keystore.secrets == secrets[:2]
+    assert keystore.add_lines([secrets[2].as_bech32m()]) == 1
+    assert len(keystore) == 3
+
+    with pytest.raises(ValueError) as ex:
+        keystore.add_lines(["", "not a secret"], "keys.se")
+    assert str(ex.value) == "keys.se:2: not a bech32m secret exponent"
+
+
+def test_keystore_lookup():
+    secret = se_generate(1)
+    public_key = secret.public_key()
+    child = secret.child_for_path([1, 2, 3])
+    keystore = Keystore([secret])
+    assert keystore.secret_for_public_key(public_key) == secret
+    assert keystore.secret_for_public_key(child.public_key()) is None
+    assert (
+        keystore.secret_for_public_key(child.public_key(), public_key, [1, 2, 4])
+        is None
+    )
+    assert (
+        keystore.secret_for_public_key(child.public_key(), public_key, [1, 2, 3])
+        == child
+    )
+    # remembered, so the path is no longer needed
+    assert keystore.secret_for_public_key(child.public_key()) == child
+
+    keystore = Keystore([secret])
+    assert keystore.derive([1, 2], range(5)) == 5
+    assert keystore.secret_for_public_key(child.public_key()) == child
+
+
+def test_sign_with_keystore():
+    secrets = secrets_generate(3)
+    unsigned_spend = unsigned_spend_generate(2, secrets)
+    expected = sign(unsigned_spend, secrets)
+
+    # `hsm_test_spend` uses path `[index, index + 1]` for signer `index`
+    keystore = Keystore(secrets)
+    for index in range(len(secrets)):
+        keystore.derive([index], range(index + 1, index + 2))
+    trace.enable()
+    try:
+        assert sign(unsigned_spend, keystore) == expected
+        assert "derivations" not in trace.snapshot()["counters"]
+    finally:
+        trace.disable()
+        trace.reset()
+
+
+def test_parse_private_key_file(tmp_path):
+    secrets = [se_generate(_) for _ in range(2)]
+    path = tmp_path / "keys.se"
+    path.write_text("".join(_.as_bech32m() + "\n" for _ in secrets + secrets))
+    parser = create_parser()
+    args = parser.parse_args(["-d", "1/2:0-3", str(path)])
+    keystore = parse_private_key_file(args)
+    assert keystore.secrets == secrets
+    assert len(keystore.derived) == 6
@@ -0,0 +1,152 @@
+import argparse
+import io
+import struct
+import zlib
+
+import pytest
+import segno
+
+from hsms.util import trace
+from hsms.util.qr import (
+    MAX_FPS,
+    MIN_FPS,
+    MatrixCache,
+    QRSettings,
+    add_qr_arguments,
+    apng_for_matrices,
+    matrices_for_texts,
+    encode_matrix,
+    padded_matrix,
+    show_cycling,
+    show_qr_sequence,
+    terminal_text,
+)
+
+TEXTS = ["1234567890" * 3, "9" * 200, "1234567890" * 3]
+
+
+def test_matrices_for_texts():
+    cache = MatrixCache(max_size=2)
+    matrices = matrices_for_texts(TEXTS, workers=2, cache=cache)
+    assert matrices[0] == matrices[2]
+    for text, matrix in zip(TEXTS, matrices):
+        assert matrix == tuple(bytes(_) for _ in segno.make_qr(text).matrix)
+    assert len(cache) == 2
+    assert cache.get((TEXTS[0], None, None, None)) == matrices[0]
+
+    # the least recently used is dropped
+    cache.put(("3", None, None, None), matrices[0])
+    assert cache.get((TEXTS[1], None, None, None)) is None
+    assert matrices_for_texts(TEXTS, workers=1, cache=cache) == matrices
+
+
+def test_terminal_text():
+    f = io.StringIO()
+    segno.make_qr(TEXTS[0]).terminal(out=f, compact=True)
+    assert terminal_text(matrices_for_texts(TEXTS[:1])[0]) == f.getvalue()
+
+
+def png_chunks(blob):
+    assert blob[:8] == b"\x89PNG\r\n\x1a\n"
+    index = 8
+    while index < len(blob):
+        (size,) = struct.unpack(">I", blob[index : index + 4])
+        kind = blob[index + 4 : index + 8]
+        data = blob[index + 8 : index + 8 + size]
+        (crc,) = struct.unpack(">I", blob[index + 8 + size : index + 12 + size])
+        assert crc == zlib.crc32(kind + data)
+        yield kind, data
+        index += 12 + size
+
+
+def test_apng():
+    matrices = matrices_for_texts(TEXTS[:2], workers=1)
+    size = len(matrices[1])
+    chunks = list(png_chunks(apng_for_matrices(matrices, fps=4, scale=1, border=0)))
+    assert [_[0] for _ in chunks] == [
+        b"IHDR",
+        b"acTL",
+        b"fcTL",
+        b"IDAT",
+        b"fcTL",
+        b"fdAT",
+        b"IEND",
+    ]
+    assert struct.unpack(">II", chunks[0][1][:8]) == (size, size)
+    assert struct.unpack(">II", chunks[1][1]) == (2, 0)
+    # sequence numbers and a 250 ms delay
+    assert struct.unpack(">I", chunks[4][1][:4]) == (1,)
+    assert struct.unpack(">I", chunks[5][1][:4]) == (2,)
+    assert struct.unpack(">HH", chunks[2][1][20:24]) == (250, 1000)
+
+    # the first frame, a smaller code centered
+    raw = zlib.decompress(chunks[3][1])
+    row_size = 1 + (size + 7) // 8
+    rows = [raw[_ : _ + row_size] for _ in range(0, len(raw), row_size)]
+    pixels = [
+        bytes(1 - (_[1 + x // 8] >> (7 - x % 8)) & 1 for x in range(size)) for _ in rows
+    ]
+    assert tuple(pixels) == padded_matrix(matrices[0], size)
+
+
+def test_show_qr_sequence(tmp_path):
+    matrices = matrices_for_texts(TEXTS[:2], workers=1)
+    f = io.StringIO()
+    show_cycling(matrices, f, fps=1000, loops=2)
+    frames = f.getvalue().split("\x1b[H\x1b[J")[1:]
+    assert [_.splitlines()[-1] for _ in frames] == ["1/2", "2/2"] * 2
+
+    f = io.StringIO()
+    show_qr_sequence(TEXTS[:1], f)
+    assert f.getvalue() == "\n" + terminal_text(matrices[0]) + "\n"
+
+    path = str(tmp_path / "chunks.png")
+    show_qr_sequence(TEXTS[:2], f, apng_path=path)
+    with open(path, "rb") as png:
+        assert png.read() == apng_for_matrices(matrices)
+
+
+def test_qr_settings():
+    text = TEXTS[1]
+    settings = QRSettings(version=20, error="M", mask=3)
+    qr = segno.make_qr(text, version=20, error="M", mask=3, boost_error=False)
+    assert encode_matrix(text, settings) == tuple(bytes(_) for _ in qr.matrix)
+    # too small a version is ignored
+    qr = segno.make_qr(text, error="M", mask=3, boost_error=False)
+    assert encode_matrix(text, QRSettings(1, "M", 3)) == tuple(
+        bytes(_) for _ in qr.matrix
+    )
+
+    cache = MatrixCache()
+    matrices_for_texts([text], cache=cache)
+    matrices_for_texts([text], cache=cache, settings=settings)
+    assert len(cache) == 2
+    assert cache.get((text, 20, "M", 3)) is not None
+
+
+def test_fps_is_checked():
+    parser = argparse.ArgumentParser()
+    add_qr_arguments(parser)
+    assert parser.parse_args(["--fps", "0.5"]).fps == 0.5
+    matrices = matrices_for_texts(TEXTS[:2])
+    for fps in [MIN_FPS, MAX_FPS]:
+        assert parser.parse_args(["--fps", str(fps)]).fps == fps
+        # every fps that's accepted can be written
+        chunks = dict(png_chunks(apng_for_matrices(matrices, fps, scale=1)))
+        numerator, denominator = struct.unpack(">HH", chunks[b"fcTL"][20:24])
+        assert numerator / denominator == pytest.approx(1 / fps)
+    for bad in ["0", "-2", "0.009", "1001", "nan", "inf", "x"]:
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--fps", bad])
+
+
+def test_time_to_display():
+    trace.reset()
+    trace.enable()
+    try:
+        show_qr_sequence(TEXTS[:1], io.StringIO(), settings=QRSettings(mask=0))
+        show_qr_sequence(TEXTS[:2], io.StringIO(), fps=1000, loops=1)
+        assert trace.snapshot()["spans"]["qr_time_to_display"]["calls"] == 2
+    finally:
+        trace.disable()
+        trace.reset()
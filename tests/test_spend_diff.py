@@ -0,0 +1,98 @@
+from chia_base.core import CoinSpend
+
+import pytest
+
+from hsms.cmds.hsms import unsigned_spend_for_request
+from hsms.core.envelope import envelope_for_item
+from hsms.core.spend_diff import (
+    UnsignedSpendDiff,
+    coin_spend_hash,
+    diff_for_unsigned_spend,
+    unsigned_spend_for_diff,
+)
+from hsms.process.sign import sign
+from hsms.process.spend_cache import ReviewedSpendCache
+from hsms.puzzles.conlang import CREATE_COIN
+from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import solution_for_conditions
+from hsms.util import trace
+
+from .generate import secrets_generate, unsigned_spend_generate
+
+
+def fee_bump(unsigned_spend, index):
+    """
+    A copy of `unsigned_spend` with a new solution for one coin spend.
+    """
+    coin_spends = list(unsigned_spend.coin_spends)
+    coin_spend = coin_spends[index]
+    solution = solution_for_conditions([[CREATE_COIN, bytes(32), 1]])
+    coin_spends[index] = CoinSpend(coin_spend.coin, coin_spend.puzzle_reveal, solution)
+    return type(unsigned_spend)(
+        coin_spends,
+        unsigned_spend.sum_hints,
+        unsigned_spend.path_hints,
+        unsigned_spend.agg_sig_me_network_suffix,
+    )
+
+
+def test_diff():
+    secrets = secrets_generate(3)
+    unsigned_spend = unsigned_spend_generate(10, secrets)
+    reviewed = ReviewedSpendCache()
+    reviewed.add(unsigned_spend.coin_spends)
+    assert len(reviewed) == 10
+
+    bumped = fee_bump(unsigned_spend, 3)
+    diff = diff_for_unsigned_spend(
+        bumped, [coin_spend_hash(_) for _ in unsigned_spend.coin_spends]
+    )
+    assert [isinstance(_, tuple) for _ in diff.coin_spends].count(True) == 1
+    assert len(bytes(diff)) * 4 < len(bytes(bumped))
+
+    diff = UnsignedSpendDiff.from_bytes(bytes(diff))
+    resolved = unsigned_spend_for_diff(diff, reviewed.get)
+    assert bytes(resolved) == bytes(bumped)
+
+    # only the changed coin spend's puzzle is run
+    trace.reset()
+    trace.enable()
+    try:
+        sign(resolved, secrets)
+        assert trace.COUNTERS["puzzle_runs"] == 1
+    finally:
+        trace.disable()
+        trace.reset()
+
+    with pytest.raises(ValueError):
+        unsigned_spend_for_diff(diff, ReviewedSpendCache().get)
+
+
+def test_request():
+    secrets = secrets_generate(3)
+    unsigned_spend = unsigned_spend_generate(3, secrets)
+    blob = envelope_for_item(unsigned_spend)
+    reviewed = ReviewedSpendCache()
+    assert bytes(unsigned_spend_for_request(blob, reviewed)) == bytes(unsigned_spend)
+
+    diff = diff_for_unsigned_spend(
+        unsigned_spend, [coin_spend_hash(_) for _ in unsigned_spend.coin_spends]
+    )
+    blob = envelope_for_item(diff)
+    with pytest.raises(ValueError):
+        unsigned_spend_for_request(blob, reviewed)
+    reviewed.add(unsigned_spend.coin_spends)
+    assert bytes(unsigned_spend_for_request(blob, reviewed)) == bytes(unsigned_spend)
+
+
+def test_cache_eviction():
+    unsigned_spend = unsigned_spend_generate(5, secrets_generate(3))
+    reviewed = ReviewedSpendCache(max_size=3)
+    hashes = [bytes(coin_spend_hash(_)) for _ in unsigned_spend.coin_spends]
+    reviewed.add(unsigned_spend.coin_spends[:3])
+    # touching the oldest keeps it
+    assert reviewed.get(hashes[0]) is unsigned_spend.coin_spends[0]
+    reviewed.add(unsigned_spend.coin_spends[3:])
+    assert len(reviewed) == 3
+    assert reviewed.get(hashes[0]) is not None
+    assert reviewed.get(hashes[1]) is None
+    assert reviewed.get(hashes[2]) is None
@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+import io
+
+import pytest
+
+from chia_base.core import Coin, CoinSpend
+
+from clvm_rs import Program  # type: ignore
+
+from hsms.cmds.hsms import create_parser, review_unsigned_spend
+from hsms.core.unsigned_spend import UnsignedSpend
+from hsms.process.summary import (
+    coin_details,
+    summary_for_unsigned_spend,
+    xch_for_mojos,
+)
+from hsms.puzzles.conlang import CREATE_COIN
+from hsms.util.address import address_for_puzzle_hash
+
+from .generate import bytes32_generate
+
+
+def test_xch_for_mojos():
+    for amount in [0, 1, 999999999999, 10**12, 12345678901234567, -4999999999999]:
+        expected = f"{Decimal(amount) / Decimal('1e12'):0.12f}"
+        assert xch_for_mojos(amount) == expected
+
+
+def coin_spend_creating(parent_nonce: int, puzzle_hash, amount, creates):
+    # `(q . conditions)` returns its conditions, whatever the solution
+    conditions = [[CREATE_COIN, ph, a] for ph, a in creates]
+    puzzle = Program.to((1, conditions))
+    coin = Coin(bytes32_generate(parent_nonce), puzzle_hash, amount)
+    return CoinSpend(coin, puzzle, Program.to(0))
+
+
+MINE, THEIRS, OTHER = [bytes32_generate(_, "puzzle_hash") for _ in range(3)]
+
+
+def unsigned_spend_for_test() -> UnsignedSpend:
+    coin_spends = [
+        coin_spend_creating(1, MINE, 1000, [(THEIRS, 300), (MINE, 600)]),
+        coin_spend_creating(2, MINE, 500, [(THEIRS, 200)]),
+        coin_spend_creating(3, OTHER, 50, []),
+    ]
+    return UnsignedSpend(coin_spends, [], [], b"")
+
+
+def test_summary():
+    summary = summary_for_unsigned_spend(unsigned_spend_for_test())
+    assert [(_.address, _.amount, _.coin_count) for _ in summary.inputs] == [
+        (address_for_puzzle_hash(MINE), 1500, 2),
+        (address_for_puzzle_hash(OTHER), 50, 1),
+    ]
+    assert [(_.amount, _.coin_count, _.is_change) for _ in summary.outputs] == [
+        (500, 2, False),
+        (600, 1, True),
+    ]
+    assert summary.total_spent == 1550
+    assert summary.total_created == 1100
+    assert summary.coins_spent == 3
+    assert summary.coins_created == 3
+    assert summary.fee == 450
+    assert summary.change == 600
+
+    lines = summary.lines()
+    # one line for each coin spent
+    assert lines[:3] == [
+        f"COIN SPENT: 0.000000001000 xch at address {address_for_puzzle_hash(MINE)}",
+        f"COIN SPENT: 0.000000000500 xch at address {address_for_puzzle_hash(MINE)}",
+        f"COIN SPENT: 0.000000000050 xch at address {address_for_puzzle_hash(OTHER)}",
+    ]
+    assert lines[5] == (
+        f"COIN CREATED: 0.000000000600 xch to {address_for_puzzle_hash(MINE)} (change)"
+    )
+    assert lines[-3:] == ["CHANGE: 0.000000000600 xch", "FEE: 0.000000000450 xch", ""]
+
+
+def test_outputs_exceed_inputs():
+    coin_spends = [coin_spend_creating(1, MINE, 1, [(THEIRS, 3 * 10**12)])]
+    summary = summary_for_unsigned_spend(UnsignedSpend(coin_spends, [], [], b""))
+    assert summary.fee < 0
+    lines = summary.total_lines()
+    assert lines[-1] == "WARNING: outputs exceed inputs by 2.999999999999 xch"
+    assert not any(_.startswith("FEE") for _ in lines)
+
+
+def test_coin_details():
+    details = coin_details(unsigned_spend_for_test())
+    assert next(details) == [
+        f"COIN 1/3: 0.000000001000 xch at address {address_for_puzzle_hash(MINE)}",
+        f"  CREATES: 0.000000000300 xch to {address_for_puzzle_hash(THEIRS)}",
+        f"  CREATES: 0.000000000600 xch to {address_for_puzzle_hash(MINE)}",
+    ]
+    assert [len(_) for _ in details] == [2, 1]
+
+
+def test_review_unsigned_spend(monkeypatch):
+    unsigned_spend = unsigned_spend_for_test()
+    answers = iter(["d", "d", "d", "ok"])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+    f = io.StringIO()
+    assert review_unsigned_spend(unsigned_spend, 2, f)
+    text = f.getvalue()
+    assert "SPENDING: 0.000000001550 xch in 3 coin(s) from 2 address(es)" in text
+    assert "COIN SPENT" not in text
+    assert text.index("COIN 2/3") < text.index("COIN 3/3")
+    assert text.endswith("no more coins\n")
+
+    # small enough to show in full
+    monkeypatch.setattr("builtins.input", lambda prompt: "no")
+    f = io.StringIO()
+    assert not review_unsigned_spend(unsigned_spend, 3, f)
+    assert "COIN SPENT" in f.getvalue()
+
+
+def test_page_size_is_checked():
+    parser = create_parser()
+    assert parser.parse_args(["--page-size", "1", "keys.se"]).page_size == 1
+    for bad in ["0", "-5", "x"]:
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--page-size", bad, "keys.se"])
@@ -0,0 +1,55 @@
+from chia_base.bls12_381 import BLSPublicKey
+
+from hsms.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    DEFAULT_HIDDEN_PUZZLE_HASH,
+    MAX_COST,
+    SYNTHETIC_MOD,
+    calculate_synthetic_public_key,
+    calculate_synthetic_secret_key,
+    puzzle_for_public_key_and_hidden_puzzle_hash,
+    puzzle_hashes_for_public_keys,
+    synthetic_public_keys_for_public_keys,
+)
+
+from .generate import bytes32_generate, pk_generate, se_generate
+
+
+def synthetic_public_key_clvm(public_key, hidden_puzzle_hash) -> BLSPublicKey:
+    _cost, r = SYNTHETIC_MOD.run_with_cost(
+        [bytes(public_key), hidden_puzzle_hash], max_cost=MAX_COST
+    )
+    return BLSPublicKey.from_bytes(r.atom)
+
+
+def test_synthetic_public_key_matches_clvm():
+    hidden_puzzle_hashes = [DEFAULT_HIDDEN_PUZZLE_HASH] + [
+        bytes32_generate(_, "hidden") for _ in range(3)
+    ]
+    for idx in range(25):
+        public_key = pk_generate(idx)
+        for hidden_puzzle_hash in hidden_puzzle_hashes:
+            native = calculate_synthetic_public_key(public_key, hidden_puzzle_hash)
+            assert native == synthetic_public_key_clvm(public_key, hidden_puzzle_hash)
+
+    se = se_generate(1000)
+    sse = calculate_synthetic_secret_key(se, DEFAULT_HIDDEN_PUZZLE_HASH)
+    spk = calculate_synthetic_public_key(se.public_key(), DEFAULT_HIDDEN_PUZZLE_HASH)
+    assert sse.public_key() == spk
+
+
+def test_synthetic_public_key_batch():
+    public_keys = [pk_generate(_) for _ in range(20)]
+    synthetic_public_keys = synthetic_public_keys_for_public_keys(public_keys)
+    assert synthetic_public_keys == [
+        synthetic_public_key_clvm(_, DEFAULT_HIDDEN_PUZZLE_HASH) for _ in public_keys
+    ]
+
+    hits = calculate_synthetic_public_key.cache_info().hits
+    puzzle_hashes = puzzle_hashes_for_public_keys(public_keys)
+    assert calculate_synthetic_public_key.cache_info().hits == hits + len(public_keys)
+    assert puzzle_hashes == [
+        puzzle_for_public_key_and_hidden_puzzle_hash(
+            _, DEFAULT_HIDDEN_PUZZLE_HASH
+        ).tree_hash()
+        for _ in public_keys
+    ]
@@ -0,0 +1,55 @@
+import json
+
+from hsms.process.sign import sign
+from hsms.util import trace
+
+from .generate import secrets_generate, unsigned_spend_generate
+
+
+def test_trace(tmp_path):
+    @trace.traced()
+    def double(x):
+        return x * 2
+
+    trace.reset()
+    assert double(5) == 10
+    trace.count("things")
+    with trace.span("block"):
+        pass
+    assert trace.snapshot()["spans"] == {}
+    assert trace.snapshot()["counters"] == {}
+
+    path = str(tmp_path / "trace.jsonl")
+    trace.enable(path)
+    try:
+        double(5)
+        double(6)
+        trace.count("things", 3)
+        with trace.span("block"):
+            pass
+        d = trace.snapshot("one")
+        assert d["spans"]["test_trace.<locals>.double"]["calls"] == 2
+        assert d["spans"]["block"]["calls"] == 1
+        assert d["counters"] == {"things": 3}
+        trace.report("one")
+        assert trace.snapshot()["spans"] == {}
+
+        secrets = secrets_generate(3)
+        unsigned_spend = unsigned_spend_generate(3, secrets)
+        sign(unsigned_spend, secrets)
+        sign(unsigned_spend, secrets)
+        trace.report("two")
+        # nothing new, so nothing reported
+        trace.report("three")
+    finally:
+        trace.disable()
+        trace.reset()
+
+    with open(path) as f:
+        reports = [json.loads(_) for _ in f]
+    assert [_["label"] for _ in reports] == ["one", "two"]
+    assert reports[0]["counters"] == {"things": 3}
+    assert reports[1]["spans"]["sign"]["calls"] == 2
+    assert reports[1]["spans"]["run_puzzle"]["calls"] == 3
+    assert reports[1]["counters"]["puzzle_runs"] == 3
+    assert reports[1]["counters"]["conditions_cache_hits"] == 3
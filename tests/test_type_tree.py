@@ -0,0 +1,79 @@
+from dataclasses import dataclass, fields, is_dataclass
+from typing import List, Optional, get_type_hints
+
+import pytest
+
+from hsms.util.type_tree import Forward, Stepped, TypeTree, stepped_or_plain
+
+
+@dataclass
+class Node:
+    value: int
+    children: List["Node"]
+    parent: Optional["Node"] = None
+
+
+def count_for_list(origin, args, type_tree):
+    count_item = type_tree(args[0])
+
+    def count(items):
+        return sum(count_item(_) for _ in items)
+
+    return count
+
+
+def count_for_dataclass(t, type_tree):
+    if not is_dataclass(t):
+        return None
+    hints = get_type_hints(t)
+    # `Optional[Node]` isn't supported, so skip `parent`
+    counters = [(f.name, type_tree(hints[f.name])) for f in fields(t)[:2]]
+
+    def count(item):
+        return sum(c(getattr(item, name)) for name, c in counters)
+
+    return count
+
+
+def test_type_tree_memo_and_recursion():
+    calls = []
+
+    def other_handler(t, type_tree):
+        calls.append(t)
+        return count_for_dataclass(t, type_tree)
+
+    tt = TypeTree({int: lambda x: 1}, {list: count_for_list}, other_handler)
+    count_node = tt(Node)
+    assert tt(Node) is count_node
+    assert calls == [Node]
+
+    tree = Node(1, [Node(2, []), Node(3, [Node(4, []), Node(5, [])])])
+    assert count_node(tree) == 5
+
+    with pytest.raises(ValueError):
+        tt(str)
+    assert str not in tt.memo
+    assert not tt.memo.in_progress
+
+
+def test_stepped():
+    def plus_one(x):
+        return x + 1
+
+    def steps(n):
+        if n == 0:
+            return 0
+        return (yield plus_one, (yield forward, n - 1))
+
+    forward = Forward("depth")
+    depth = stepped_or_plain(steps, [forward])
+    assert isinstance(depth, Stepped)
+    forward.f = depth
+    # far past the recursion limit
+    assert depth(100000) == 100000
+
+    def double(x):
+        return (yield plus_one, x) + x - 1
+
+    assert not isinstance(stepped_or_plain(double, [plus_one]), Stepped)
+    assert stepped_or_plain(double, [plus_one])(5) == 10